@@ -25,7 +25,7 @@ __build__ = "Unused"
 __copyright__ = "Copyright 2017-2020 DaveL17"
 __license__ = "MIT"
 __title__ = "DLFramework"
-__version__ = "0.1.04"
+__version__ = "0.1.05"
 
 
 class Fogbert(object):
@@ -253,6 +253,11 @@ class evalExpr(object):
     The evalExpr method evaluates mathematical expressions that are passed as
     strings and returns a numerical result.
 
+    Expressions may also compare values and combine comparisons (and, or, not).
+    Names are looked up in the dict passed to eval_expr() or eval_(). Use
+    compile_expr() to parse an expression once and evaluate it many times.
+    Strings can only be compared with strings (a TypeError is raised otherwise).
+
     This code is licensed under an MIT-compatible license.
     credit: jfs @ https://stackoverflow.com/a/9558001/2827397
     """
@@ -263,17 +268,66 @@ class evalExpr(object):
 
         # supported operators
         self.operators = {ast.Add: op.add, ast.Sub: op.sub, ast.Mult: op.mul, ast.Div: op.truediv, ast.Pow: op.pow,
-                          ast.BitXor: op.xor, ast.USub: op.neg}
+                          ast.BitXor: op.xor, ast.USub: op.neg, ast.Not: op.not_,
+                          ast.Eq: op.eq, ast.NotEq: op.ne, ast.Lt: op.lt, ast.LtE: op.le, ast.Gt: op.gt, ast.GtE: op.ge}
+
+        # supported nodes (other than the operators)
+        self.nodes = (ast.And, ast.BinOp, ast.BoolOp, ast.Compare, ast.Load, ast.Name, ast.Num, ast.Or, ast.Str, ast.UnaryOp)
+
+    def compile_expr(self, expr):
+        """
+        Returns the parsed expression and the set of names it uses. Raises
+        SyntaxError or TypeError if the expression can't be evaluated. Powers
+        aren't allowed (a large exponent can take a very long time to
+        evaluate.)
+        """
+        node  = ast.parse(expr, mode='eval').body
+        names = set()
+
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name):
+                names.add(child.id)
+            elif isinstance(child, ast.Pow):
+                raise TypeError(child)
+            elif not isinstance(child, self.nodes) and type(child) not in self.operators:
+                raise TypeError(child)
+
+        return node, names
 
-    def eval_expr(self, expr):
-        return self.eval_(ast.parse(expr, mode='eval').body)
+    def eval_expr(self, expr, names=None):
+        return self.eval_(ast.parse(expr, mode='eval').body, names)
 
-    def eval_(self, node):
+    def eval_(self, node, names=None):
         if isinstance(node, ast.Num):  # <number>
             return node.n
+        elif isinstance(node, ast.Str):  # <string>
+            return node.s
+        elif isinstance(node, ast.Name):  # <name> (KeyError if it isn't in names)
+            return (names or {})[node.id]
         elif isinstance(node, ast.BinOp):  # <left> <operator> <right>
-            return self.operators[type(node.op)](self.eval_(node.left), self.eval_(node.right))
+            left, right = self.eval_(node.left, names), self.eval_(node.right, names)
+            if isinstance(left, basestring) or isinstance(right, basestring):
+                raise TypeError(node)
+            return self.operators[type(node.op)](left, right)
         elif isinstance(node, ast.UnaryOp):  # <operator> <operand> e.g., -1
-            return self.operators[type(node.op)](self.eval_(node.operand))
+            operand = self.eval_(node.operand, names)
+            if isinstance(operand, basestring) and not isinstance(node.op, ast.Not):
+                raise TypeError(node)
+            return self.operators[type(node.op)](operand)
+        elif isinstance(node, ast.Compare):  # <left> <operator> <right> ... e.g., 0 < x <= 5
+            left = self.eval_(node.left, names)
+            for operator, comparator in zip(node.ops, node.comparators):
+                right = self.eval_(comparator, names)
+                # Python 2 orders strings after numbers, so u"--" > 40 would be True.
+                if isinstance(left, basestring) != isinstance(right, basestring):
+                    raise TypeError(node)
+                if not self.operators[type(operator)](left, right):
+                    return False
+                left = right
+            return True
+        elif isinstance(node, ast.BoolOp):  # <value> and/or <value>
+            if isinstance(node.op, ast.And):
+                return all(self.eval_(value, names) for value in node.values)
+            return any(self.eval_(value, names) for value in node.values)
         else:
             raise TypeError(node)
@@ -75,18 +75,22 @@ https://github.com/DaveL17/WUnderground7/blob/master/LICENSE
 # ================================== IMPORTS ==================================
 
 # Built-in modules
-import cgi
+import time
+kImportStarted = time.time()  # Imports are timed for the startup report
+
+import array
+import collections
 import datetime as dt
+import hashlib
+import heapq
 import logging
+import math
+import os
+import Queue
 import re
-import requests
-import simplejson
-import socket
 import sys
-import time
+import threading
 import traceback
-import urllib   # (satellite imagery fallback)
-import urllib2  # (weather data fallback)
 
 # Third-party modules
 # from DLFramework import indigoPluginUpdateChecker
@@ -94,14 +98,16 @@ try:
     import indigo
 except ImportError:
     pass
-try:
-    import pydevd
-except ImportError:
-    pass
 
 # My modules
 import DLFramework.DLFramework as Dave
 
+# requests and simplejson are only needed once the plugin downloads (or parses)
+# weather data, so they're imported by the methods that use them. This keeps their
+# import time out of the plugin's start.
+
+kImportSeconds = time.time() - kImportStarted
+
 # =================================== HEADER ==================================
 
 __author__    = Dave.__author__
@@ -109,17 +115,55 @@ __copyright__ = Dave.__copyright__
 __license__   = Dave.__license__
 __build__     = Dave.__build__
 __title__     = "WUnderground7 Plugin for Indigo Home Control"
-__version__   = "7.0.17"
+__version__   = "7.0.18"
 
 # =============================================================================
 
+kNaN = float('nan')  # Missing values in forecast columns
+
+# Numeric weather values are taken from the WU payload once, in metric (the
+# canonical units), and converted to the units of the device's configMenuUnits
+# setting: Metric (M), Mixed SI (MS), Mixed (I) and Standard (S). WU rounds many
+# metric fields to whole numbers, so where the target is an english unit the
+# english field is used instead when WU provides one (see convertUnits).
+kUnitSystems = {
+    'M':  {'distance': 'km', 'precipitation': 'mm', 'pressure': 'mb', 'snow': 'cm', 'temperature': 'C', 'wind': 'kph'},
+    'MS': {'distance': 'km', 'precipitation': 'mm', 'pressure': 'mb', 'snow': 'cm', 'temperature': 'C', 'wind': 'mps'},
+    'I':  {'distance': 'km', 'precipitation': 'in', 'pressure': 'mb', 'snow': 'in', 'temperature': 'C', 'wind': 'mph'},
+    'S':  {'distance': 'mi', 'precipitation': 'in', 'pressure': 'in', 'snow': 'in', 'temperature': 'F', 'wind': 'mph'},
+}
+
+# (quantity, target unit): (multiplier, offset, decimal places). Targets that are
+# not listed are the canonical unit and pass through unchanged. Decimal places
+# follow the precision WU uses for the same value in english units.
+kEnglishUnits = ('F', 'in', 'mi', 'mph')
+kUnitConversions = {
+    ('distance', 'mi'):      (0.621371, 0.0, 1),
+    ('precipitation', 'in'): (0.0393701, 0.0, 2),
+    ('pressure', 'in'):      (0.0295300, 0.0, 2),
+    ('snow', 'in'):          (0.393701, 0.0, 1),
+    ('temperature', 'F'):    (1.8, 32.0, 1),
+    ('wind', 'mph'):         (0.621371, 0.0, 1),
+    ('wind', 'mps'):         (0.277778, 0.0, 1),
+}
+
 kDefaultPluginPrefs = {
     u'alertLogging': "false",           # Write severe weather alerts to the log?
+    u'alertsLaneEnabled': "false",      # Poll alerts between regular polls?
+    u'alertsLaneInterval': "300",       # Frequency of alert polls (seconds).
     u'apiKey': "",                      # WU requires the api key.
+    u'broadcastDeltas': "false",        # Broadcast changes to subscriber plugins?
     u'callCounter': "500",              # WU call limit based on UW plan.
+    u'callsPerMinute': "10",            # WU per minute call limit based on WU plan.
     u'dailyCallCounter': "0",           # Number of API calls today.
     u'dailyCallDay': "1970-01-01",      # API call counter date.
     u'dailyCallLimitReached': "false",  # Has the daily call limit been reached?
+    u'deadbandHumidity': "0",           # Smallest humidity change written to states.
+    u'deadbandMaxStaleness': "60",      # Minutes before a state is written regardless.
+    u'deadbandPrecipitation': "0",      # Smallest precipitation change written to states.
+    u'deadbandPressure': "0",           # Smallest pressure change written to states.
+    u'deadbandTemperature': "0",        # Smallest temperature change written to states.
+    u'deadbandWind': "0",               # Smallest wind change written to states.
     u'downloadInterval': "900",         # Frequency of weather updates.
     u'ignoreEstimated' : False,         # Accept estimated conditions, or not
     u'itemListTempDecimal': "1",        # Precision for Indigo Item List.
@@ -129,6 +173,8 @@ kDefaultPluginPrefs = {
     u'nextPoll': "",                    # Last successful plugin cycle
     u'noAlertLogging': "false",         # Suppresses "no active alerts" logging.
     u'showDebugLevel': "30",            # Logger level.
+    u'snapshotEnabled': "false",        # Write a JSON snapshot of the device data?
+    u'snapshotPath': "",                # Snapshot file (empty for the Indigo web server static folder).
     u'uiDateFormat': "DD-MM-YYYY",     # Preferred date format string.
     u'uiHumidityDecimal': "1",          # Precision for Indigo UI display (humidity).
     u'uiPressureTrend': "text",         # Pressure trend symbology
@@ -136,22 +182,104 @@ kDefaultPluginPrefs = {
     u'uiTimeFormat': "military",       # Preferred time format string.
     u'uiWindDecimal': "1",              # Precision for Indigo UI display (wind).
     u'updaterEmail': "",                # Email to notify of plugin updates.
-    u'updaterEmailsEnabled': "false"  # Notification of plugin updates wanted.
+    u'updaterEmailsEnabled': "false",   # Notification of plugin updates wanted.
+    u'weatherSummaryDigest': "false"   # Send one weather summary email for all devices.
+}
+
+
+# State families that can be held back by the update thresholds (deadbands). The
+# hourly and ten day slots (h01_, d01_) and numbered forecast days (foreHigh1, etc.)
+# hold a different hour or day each time the forecast moves on, so they're never
+# held back.
+kDeadbandStates = {
+    'humidity':      ('relativeHumidity',),
+    'precipitation': ('historyPop', 'precip_1hr', 'precip_today', 'qpf24hr', 'qpf6hr', 'qpfTotal', 'snow24hr', 'snowTotal'),
+    'pressure':      ('pressure',),
+    'temperature':   ('dewpoint', 'feelslike', 'heatIndex', 'historyHigh', 'historyLow', 'temp', 'tempHigh24hr', 'tempHighMax', 'tempLow24hr',
+                      'tempLowMin', 'windchill'),
+    'wind':          ('windGust', 'windSpeed', 'windSpeedMax', 'windSpeedMax24hr'),
+}
+kDeadbandFamily = dict((state, family) for family, states in kDeadbandStates.items() for state in states)
+kDeadbandSlotPattern = re.compile(r'^[hd]\d\d_|\d+$')
+
+# States made from the value of one or more deadband states. They're held back
+# whenever one of their states is, so that the two always agree.
+kDeadbandCompanions = {
+    'pressureIcon':    ('pressure',),
+    'tempIcon':        ('temp',),
+    'windGustIcon':    ('windGust',),
+    'windShortString': ('windSpeed',),
+    'windSpeedIcon':   ('windSpeed',),
+    'windString':      ('windGust', 'windSpeed'),
 }
 
+# Forecast slots (state name prefix and number of slots in Devices.xml) for
+# devices with a forecast horizon setting.
+kForecastHorizons = {'wundergroundHourly': ('h', 24),
+                     'wundergroundTenDay': ('d', 10),
+                     'wundergroundTides':  ('p', 31),
+                     }
+kForecastSlotPattern = re.compile(r'^([hdp])(\d+)_')
+
+# HTML comments and tags in European weather alert attributions.
+kAlertTagPattern = re.compile(r'(<!--.*?-->|<[^>]*>)')
+
+# Change broadcasts to subscriber plugins (see broadcastDeltas). The version is raised
+# whenever the payload format changes.
+kBroadcastMessageType = u"weatherDeltas"
+kBroadcastVersion = 1
+
+# JSON snapshot of the device data for control pages and dashboards (see writeSnapshot).
+# The version is raised whenever the file format changes.
+kSnapshotFileName = u"wunderground.json"
+kSnapshotVersion = 1
+
 
 # Indigo Methods ==============================================================
 class Plugin(indigo.PluginBase):
 
     def __init__(self, pluginId, pluginDisplayName, pluginVersion, pluginPrefs):
+        init_started = time.time()
         indigo.PluginBase.__init__(self, pluginId, pluginDisplayName, pluginVersion, pluginPrefs)
 
         self.pluginIsInitializing = True
         self.pluginIsShuttingDown = False
+        self.startup_stats = {'devicesStarted': 0, 'stateListsRebuilt': 0, 'time': init_started}  # Reported once startup is complete
+        self.startup_timings = collections.OrderedDict([('Imports', kImportSeconds)])  # Reported after the first cycle
 
         self.download_interval = dt.timedelta(seconds=int(self.pluginPrefs.get('downloadInterval', '900')))
+        self.masterDeviceDict = {}  # Parse state for each device (kept between cycles)
+        self.device_registry = {}  # Started devices by id (kept current by deviceUpdated)
+        self.device_index = {'location': {}, 'type': {}}  # Device ids by location and by device type
+        self.masterLocationDict = {}  # Derived data for each location (kept between cycles)
         self.masterWeatherDict = {}
-        self.masterTriggerDict = {}
+        self.masterAlertDict = {}  # All alerts for each location with their expiry times (kept between cycles)
+        self.alert_expiries = []  # Heap of (expiry epoch, location) for the alerts in masterAlertDict
+        self.alert_expiry_index = set()  # (expiry epoch, location) pairs in the heap (each is only pushed once)
+        self.masterTriggerDict = {}  # Started triggers by device id and event type (kept current by triggerStart/StopProcessing)
+        self.offline_deadlines = []  # Heap of (deadline epoch, dev.id) for weather location offline triggers
+        self.offline_deadline_index = {}  # Current deadline for each device (older heap entries are skipped)
+        self.deadline_lock = threading.Lock()  # Guards the offline deadlines (triggers are started on another thread)
+        self.threshold_rules = {}  # Compiled weather threshold expressions by trigger id
+        self.threshold_index = {}  # Weather threshold trigger ids by (dev.id, state name)
+        self.changed_states = {}  # Names of the states written for each device since the last trigger pass
+        self.call_times = collections.deque()  # Times of the API calls made in the last minute
+        self.next_alerts_poll = 0  # Time of the next alerts lane poll
+        self.write_stats = {'bytesSkipped': 0, 'statesDeadband': 0, 'statesSent': 0, 'statesSkipped': 0}  # Device state writes this cycle
+        self.batch_writes = False  # Hold device writes until the end of the cycle
+        self.parse_lock = threading.Lock()  # One refresh, alert poll or re-render parses devices at a time
+        self.pending_writes = {}  # Device writes not yet queued (one batch per device)
+        self.pending_deltas = {}  # Changes not yet broadcast to subscribers (one record per device)
+        self.snapshot_hash = None  # Hash of the last JSON snapshot written (see writeSnapshot)
+        self.snapshot_stale = True  # Device states have been written since the last snapshot
+        self.write_lock = threading.Lock()  # Guards pending_writes, pending_deltas and the written state records (Indigo callbacks run on another thread)
+        self.write_queue = Queue.Queue()  # Device write batches for the writer thread
+        self.write_thread = threading.Thread(target=self.deviceWriterThread, name='deviceWriter')
+        self.write_thread.daemon = True
+        self.pending_summaries = []  # Summary emails built this cycle (see flushSummaryEmails)
+        self.email_queue = Queue.Queue()  # Summary emails for the email thread
+        self.email_thread = threading.Thread(target=self.emailSenderThread, name='emailSender')
+        self.email_thread.daemon = True
         self.wuOnline = True
         self.pluginPrefs['dailyCallLimitReached'] = False
 
@@ -172,17 +300,13 @@ class Plugin(indigo.PluginBase):
 
         self.Fogbert   = Dave.Fogbert(self)
         self.Formatter = Dave.Formatter(self)
+        self.evalExpr  = Dave.evalExpr(self)
 
         self.date_format = self.Formatter.dateFormat()
         self.time_format = self.Formatter.timeFormat()
 
-        # Weather Underground Attribution and disclaimer.
-        indigo.server.log(u"{0:*^130}".format(""))
-        indigo.server.log(u"{0:*^130}".format("  Data are provided by Weather Underground, LLC. This plugin and its author are in no way affiliated with Weather Underground.  "))
-        indigo.server.log(u"{0:*^130}".format(""))
-
-        # Log pluginEnvironment information when plugin is first started
-        self.Fogbert.pluginEnvironment()
+        # The attribution and plugin environment are logged once the devices have been
+        # started (see runConcurrentThread.)
 
         # ================== Initialize Debugging Protocols ===================
 
@@ -208,10 +332,12 @@ class Plugin(indigo.PluginBase):
         # =====================================================================
 
         # try:
+        #     import pydevd
         #     pydevd.settrace('localhost', port=5678, stdoutToServer=True, stderrToServer=True, suspend=False)
         # except:
         #     pass
 
+        self.startup_timings['__init__()'] = time.time() - init_started
         self.pluginIsInitializing = False
 
     def __del__(self):
@@ -238,10 +364,18 @@ class Plugin(indigo.PluginBase):
 
             self.pluginPrefs['nextPoll'] = dt.datetime.strftime(next_poll, '%Y-%m-%d %H:%M:%S')
 
+            # Display preferences may have changed.
+            self.date_format = self.Formatter.dateFormat()
+            self.time_format = self.Formatter.timeFormat()
+
+            # The snapshot settings may have changed, so write it again.
+            self.snapshot_hash  = None
+            self.snapshot_stale = True
+
             # =================== Update Item List Temperature Precision ==================
             # For devices that display the temperature as their main UI state, try to set
             # them to their (potentially changed) ui format.
-            for dev in indigo.devices.itervalues('self'):
+            for dev in self.registeredDevices():
 
                 # For weather device types
                 if dev.model in ['WUnderground Device', 'WUnderground Weather', 'WUnderground Weather Device', 'Weather Underground', 'Weather']:
@@ -260,17 +394,43 @@ class Plugin(indigo.PluginBase):
                         except KeyError:
                             display_value = u""
 
-                        dev.updateStateOnServer('onOffState', value=current_on_off_state, uiValue=display_value)
+                        self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': current_on_off_state, 'uiValue': display_value}])
+
+            # Re-render the devices with the new display preferences from the data we
+            # already have (no API calls.)
+            self.renderCachedData(self.registeredDevices())
 
             self.logger.debug(u"User prefs saved.")
             # indigo.server.log(unicode(values_dict))
 
+    def deviceDeleted(self, dev):
+
+        indigo.PluginBase.deviceDeleted(self, dev)
+        self.unregisterDevice(dev.id)
+
     def deviceStartComm(self, dev):
 
         self.logger.debug(u"Starting Device: {0}".format(dev.name))
 
-        # Check to see if the device profile has changed.
-        dev.stateListOrDisplayStateIdChanged()
+        # The device may have new settings, so parse it again. Its write records are
+        # kept so that only the states that change are written.
+        self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)
+
+        # Check to see if the device profile has changed. Rebuilding the state list is
+        # expensive, so it's only done when the device's schema fingerprint changes.
+        fingerprint = self.deviceSchemaFingerprint(dev)
+
+        if dev.pluginProps.get('schemaFingerprint') != fingerprint:
+            self.logger.debug(u"{0}: device state list has changed. Rebuilding.".format(dev.name))
+            dev.stateListOrDisplayStateIdChanged()
+
+            props = dev.pluginProps
+            props['schemaFingerprint'] = fingerprint
+            dev.replacePluginPropsOnServer(props)
+            self.startup_stats['stateListsRebuilt'] += 1
+
+        self.startup_stats['devicesStarted'] += 1
+        self.registerDevice(dev)
 
         # ========================= Update Temperature Display ========================
         # For devices that display the temperature as their UI state, try to set them
@@ -285,11 +445,15 @@ class Plugin(indigo.PluginBase):
 
         # =========================== Set Device Icon to Off ==========================
         if dev.model in ['WUnderground Device', 'WUnderground Weather', 'WUnderground Weather Device', 'Weather Underground', 'Weather']:
-            dev.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensor)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.TemperatureSensor)
         else:
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
+
+        self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': True, 'uiValue': display_value}])
 
-        dev.updateStateOnServer('onOffState', value=True, uiValue=display_value)
+        # Device settings changes (units, display units, etc.) restart the device, so
+        # render it from the data we already have (no API call.)
+        self.renderCachedData([dev])
 
     def deviceStopComm(self, dev):
 
@@ -297,11 +461,29 @@ class Plugin(indigo.PluginBase):
 
         # =========================== Set Device Icon to Off ==========================
         if dev.model in ['WUnderground Device', 'WUnderground Weather', 'WUnderground Weather Device', 'Weather Underground', 'Weather']:
-            dev.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensor)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.TemperatureSensor)
         else:
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
 
-        dev.updateStateOnServer('onOffState', value=False, uiValue=u"Disabled")
+        self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u"Disabled"}])
+
+        self.unregisterDevice(dev.id)
+
+    def deviceUpdated(self, orig_dev, new_dev):
+
+        indigo.PluginBase.deviceUpdated(self, orig_dev, new_dev)
+
+        # Keep the registry's copy of the device current (props, states, etc.)
+        if new_dev.id in self.device_registry:
+            self.registerDevice(new_dev)
+
+    def didDeviceCommPropertyChange(self, orig_dev, new_dev):
+
+        # Props the plugin keeps for itself don't need the device to be restarted.
+        orig_props = dict((key, value) for key, value in orig_dev.pluginProps.items() if key != 'schemaFingerprint')
+        new_props  = dict((key, value) for key, value in new_dev.pluginProps.items() if key != 'schemaFingerprint')
+
+        return orig_props != new_props
 
     def getDeviceConfigUiValues(self, values_dict, type_id, dev_id):
 
@@ -315,6 +497,28 @@ class Plugin(indigo.PluginBase):
 
         return values_dict
 
+    def getDeviceStateList(self, dev):
+
+        # Forecast devices only carry the forecast slots within the device's
+        # forecast horizon.
+        state_list = indigo.PluginBase.getDeviceStateList(self, dev)
+
+        if dev.deviceTypeId in kForecastHorizons:
+            prefix, slots = kForecastHorizons[dev.deviceTypeId]
+            horizon = self.forecastHorizon(dev)
+
+            if horizon < slots:
+                horizon_list = indigo.List()
+
+                for state in state_list:
+                    slot = kForecastSlotPattern.match(state['Key'])
+                    if not slot or slot.group(1) != prefix or int(slot.group(2)) <= horizon:
+                        horizon_list.append(state)
+
+                state_list = horizon_list
+
+        return state_list
+
     def getPrefsConfigUiValues(self):
 
         return self.pluginPrefs
@@ -323,6 +527,21 @@ class Plugin(indigo.PluginBase):
 
         self.logger.debug(u"Starting main thread.")
 
+        # All devices have been started by now.
+        self.startup_timings['Device starts'] = time.time() - self.startup_stats['startupEnded']
+
+        # Weather Underground Attribution and disclaimer.
+        indigo.server.log(u"{0:*^130}".format(""))
+        indigo.server.log(u"{0:*^130}".format("  Data are provided by Weather Underground, LLC. This plugin and its author are in no way affiliated with Weather Underground.  "))
+        indigo.server.log(u"{0:*^130}".format(""))
+
+        # Log pluginEnvironment information when plugin is first started
+        self.Fogbert.pluginEnvironment()
+
+        self.logger.debug(u"Startup complete in {0:.2f} seconds ({1} devices started, {2} state lists rebuilt.)".format(time.time() - self.startup_stats['time'],
+                                                                                                                      self.startup_stats['devicesStarted'],
+                                                                                                                      self.startup_stats['stateListsRebuilt']))
+
         self.sleep(5)
 
         try:
@@ -342,8 +561,10 @@ class Plugin(indigo.PluginBase):
                     self.last_poll_attempt = dt.datetime.now()
                     self.pluginPrefs['lastSuccessfulPoll'] = dt.datetime.strftime(self.last_poll_attempt, '%Y-%m-%d %H:%M:%S')
 
-                    self.refreshWeatherData()
-                    self.triggerProcessing()
+                    self.refreshWeatherData(process_triggers=True)
+
+                    # The alerts have just been updated.
+                    self.next_alerts_poll = time.time() + int(self.pluginPrefs.get('alertsLaneInterval', '300'))
 
                     # Report results of download timer.
                     plugin_cycle_time = (dt.datetime.now() - self.last_poll_attempt)
@@ -352,8 +573,42 @@ class Plugin(indigo.PluginBase):
                     self.logger.debug(u"[  Plugin execution time: {0} seconds  ]".format(plugin_cycle_time.strftime('%S.%f')))
                     self.logger.debug(u"{0:{1}^40}".format(' Plugin Cycle Complete ', '='))
 
-                # Wait 60 seconds before trying again.
-                self.sleep(30)
+                    if 'First cycle' not in self.startup_timings:
+                        self.startup_timings['First cycle'] = (dt.datetime.now() - self.last_poll_attempt).total_seconds()
+                        self.startupReport()
+
+                # Severe weather alerts can be polled between poll cycles (optional.)
+                alerts_lane = self.pluginPrefs.get('alertsLaneEnabled', False)
+
+                if alerts_lane and time.time() >= self.next_alerts_poll:
+                    self.next_alerts_poll = time.time() + int(self.pluginPrefs.get('alertsLaneInterval', '300'))
+                    self.refreshAlerts()
+
+                # Offline triggers and alert expiry times are checked between poll cycles
+                # (and when polling has been stopped by the call limit.)
+                self.fireOfflineDeadlines()
+                self.expireAlerts()
+
+                # Changes from the poll, alert poll, offline triggers and expired alerts
+                # are sent to subscribers and written to the snapshot together (optional.)
+                self.broadcastDeltas()
+                self.writeSnapshot()
+
+                # Wait 30 seconds before trying again (or until the next offline deadline,
+                # alert expiry or alerts poll if that's sooner.)
+                wait = 30
+
+                with self.deadline_lock:
+                    if self.offline_deadlines:
+                        wait = min(wait, max(self.offline_deadlines[0][0] - time.time(), 0))
+
+                if self.alert_expiries:
+                    wait = min(wait, max(self.alert_expiries[0][0] - time.time(), 0))
+
+                if alerts_lane:
+                    wait = min(wait, max(self.next_alerts_poll - time.time(), 0))
+
+                self.sleep(wait)
 
         except self.StopThread:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
@@ -363,11 +618,27 @@ class Plugin(indigo.PluginBase):
 
         self.pluginIsShuttingDown = True
 
+        # Let the writer finish any queued device writes before we go. The threads
+        # aren't running if startup() didn't get as far as starting them.
+        if self.write_thread.is_alive():
+            self.write_queue.put(None)
+            self.write_thread.join(20)
+
+        # Unsent summary emails are sent again next time (see emailSenderThread.)
+        if self.email_thread.is_alive():
+            self.email_queue.put(None)
+            self.email_thread.join(20)
+
     def startup(self):
 
+        started = time.time()
+
         # =========================== Version Check ===========================
         self.Fogbert.audit_server_version(min_ver=7)
 
+        self.write_thread.start()
+        self.email_thread.start()
+
         for dev in indigo.devices.itervalues("self"):
             props = dev.pluginProps
 
@@ -381,28 +652,46 @@ class Plugin(indigo.PluginBase):
                           'wundergroundTides': True,
                           'wunderground': True,
                           }
-            props['isWeatherDevice'] = props_dict[dev.deviceTypeId]
+            if props.get('isWeatherDevice') != props_dict[dev.deviceTypeId]:
+                props['isWeatherDevice'] = props_dict[dev.deviceTypeId]
+                dev.replacePluginPropsOnServer(props)
+
+        self.startup_stats['startupEnded'] = time.time()
+        self.startup_timings['startup()'] = self.startup_stats['startupEnded'] - started
 
-            dev.replacePluginPropsOnServer(props)
-            
         return
 
     def triggerStartProcessing(self, trigger):
 
         self.logger.debug(u"Starting Trigger: {0}".format(trigger.name))
 
-        dev_id = trigger.pluginProps['listOfDevices']
-        timer  = trigger.pluginProps.get('offlineTimer', '60')
+        # The trigger may have been edited, so drop any entry it already has.
+        self.unindexTrigger(trigger.id)
 
         # ============================= masterTriggerDict =============================
-        # masterTriggerDict contains information on Weather Location Offline triggers.
-        # {dev.id: (timer, trigger.id)}
-        if trigger.configured and trigger.pluginTypeId == 'weatherSiteOffline':
-            self.masterTriggerDict[dev_id] = (timer, trigger.id)
+        # masterTriggerDict indexes started triggers by device and event type so that
+        # triggerProcessing() doesn't have to go to the server for them each cycle.
+        # {dev.id: {trigger.pluginTypeId: {trigger.id: trigger}}}
+        try:
+            dev_id = int(trigger.pluginProps['listOfDevices'])
+
+        except (KeyError, ValueError):
+            self.logger.debug(u"{0} trigger has no weather device.".format(trigger.name))
+            return
+
+        if trigger.configured:
+            self.masterTriggerDict.setdefault(dev_id, {}).setdefault(trigger.pluginTypeId, {})[trigger.id] = trigger
+
+            if trigger.pluginTypeId == 'weatherSiteOffline' and dev_id in self.device_registry:
+                self.scheduleOfflineDeadlines(self.device_registry[dev_id])
+
+            elif trigger.pluginTypeId == 'weatherThreshold':
+                self.compileThresholdRule(trigger, dev_id)
 
     def triggerStopProcessing(self, trigger):
 
         self.logger.debug(u"Stopping {0} trigger.".format(trigger.name))
+        self.unindexTrigger(trigger.id)
 
     def validateDeviceConfigUi(self, values_dict, type_id, dev_id):
 
@@ -541,12 +830,12 @@ class Plugin(indigo.PluginBase):
         # Weather Site Offline trigger
         if type_id == 'weatherSiteOffline':
 
-            self.masterTriggerDict = {trigger.pluginProps['listOfDevices']: (trigger.pluginProps['offlineTimer'], trigger.id) for trigger in indigo.triggers.iter(filter="self.weatherSiteOffline")}
+            # Disabled triggers aren't in masterTriggerDict, so ask the server.
+            offline_triggers = {trigger.pluginProps['listOfDevices']: trigger.id for trigger in indigo.triggers.iter(filter="self.weatherSiteOffline")}
 
             # ======================== Validate Trigger Unique ========================
             # Limit weather location offline triggers to one per device
-            if dev_id in self.masterTriggerDict.keys() and event_id != self.masterTriggerDict[dev_id][1]:
-                existing_trigger_id = int(self.masterTriggerDict[dev_id][1])
+            if dev_id in offline_triggers.keys() and event_id != offline_triggers[dev_id]:
                 values_dict['listOfDevices'] = ''
                 error_msg_dict['listOfDevices'] = u"Please select a weather device without an existing offline trigger."
 
@@ -560,6 +849,23 @@ class Plugin(indigo.PluginBase):
                 error_msg_dict['offlineTimer'] = u"You must enter a valid time value in minutes (positive integer " \
                                                  u"greater than zero)."
 
+        # Weather Threshold trigger
+        elif type_id == 'weatherThreshold':
+
+            # ========================== Validate Expression ==========================
+            try:
+                expression, states = self.evalExpr.compile_expr(values_dict['expression'])
+
+                unknown_states = sorted(state for state in states if state not in indigo.devices[int(dev_id)].states)
+                if unknown_states:
+                    error_msg_dict['expression'] = u"The device doesn't have these states: {0}".format(u", ".join(unknown_states))
+
+            except (SyntaxError, TypeError):
+                error_msg_dict['expression'] = u"Please enter a valid expression (state names, numbers, arithmetic, comparisons, and, or, not)."
+
+            except (KeyError, ValueError):
+                error_msg_dict['listOfDevices'] = u"Please select a device."
+
         if len(error_msg_dict) > 0:
             error_msg_dict['showAlertText'] = u"Configuration Errors\n\nThere are one or more settings that need " \
                                               u"to be corrected. Fields requiring attention will be highlighted."
@@ -598,6 +904,29 @@ class Plugin(indigo.PluginBase):
         elif update_wanted and "@" not in update_email:
             error_msg_dict['updaterEmail'] = u"Valid email addresses have at least one @ symbol in them (foo@bar.com)."
 
+        # Test per minute call limit setting.
+        try:
+            if int(values_dict.get('callsPerMinute', '10')) < 1:
+                raise ValueError
+
+        except ValueError:
+            error_msg_dict['callsPerMinute'] = u"The calls per minute value must be a positive integer."
+
+        # Test snapshot file setting.
+        snapshot_path = values_dict.get('snapshotPath', '').strip()
+
+        if values_dict.get('snapshotEnabled', False) and snapshot_path and not os.path.isdir(os.path.dirname(os.path.expanduser(snapshot_path))):
+            error_msg_dict['snapshotPath'] = u"The snapshot file must be in a folder that exists (leave blank to use the Indigo web server static folder)."
+
+        # Test update threshold settings.
+        for field in ['deadbandHumidity', 'deadbandPrecipitation', 'deadbandPressure', 'deadbandTemperature', 'deadbandWind']:
+            try:
+                if float(values_dict.get(field, '0')) < 0:
+                    error_msg_dict[field] = u"Update thresholds can't be negative."
+
+            except ValueError:
+                error_msg_dict[field] = u"Update thresholds must be numbers (0 to update on every change)."
+
         if len(error_msg_dict) > 0:
             error_msg_dict['showAlertText'] = u"Configuration Errors\n\nThere are one or more settings that need to be corrected. Fields requiring attention will be highlighted."
             return False, values_dict, error_msg_dict
@@ -621,6 +950,141 @@ class Plugin(indigo.PluginBase):
 
         self.refreshWeatherData()
 
+    def activeAlerts(self, location):
+        """
+        Alerts for a location that haven't expired
+
+        The activeAlerts() method returns the alert dicts (as provided by Weather
+        Underground) from the location's alert store, in the order they were
+        provided. All of the location's alerts are kept (not only the five that fit
+        in device states.)
+
+        -----
+
+        :param str location:
+        """
+
+        now = time.time()
+
+        return [alert for expires, alert in self.masterAlertDict.get(location, []) if expires > now]
+
+    def benchmarkSanitizer(self):
+        """
+        Compare per-value and batch data sanitizing
+
+        The benchmarkSanitizer() method gathers every scalar value from the weather
+        data currently held in memory and runs it through fixCorruptedData() one value
+        at a time and through fixCorruptedDataBatch() as a single plan. It confirms
+        that both return identical results and logs the time each approach took. The
+        plugin's logging is muted while the timings run so that debug output doesn't
+        skew the results. No calls are made to Weather Underground.
+
+        -----
+        """
+
+        plan = {}
+
+        def collect(path, obj):
+            if isinstance(obj, dict):
+                for key, value in obj.iteritems():
+                    collect(u"{0}/{1}".format(path, key), value)
+
+            elif isinstance(obj, list):
+                for index, value in enumerate(obj):
+                    collect(u"{0}/{1}".format(path, index), value)
+
+            else:
+                plan[path] = obj
+
+        for location, weather_data in self.masterWeatherDict.iteritems():
+            collect(location, weather_data)
+
+        if not plan:
+            self.logger.info(u"No weather data in memory to benchmark. Refresh data and try again.")
+            return
+
+        passes = 10
+        self.logger.disabled = True
+
+        try:
+            start = time.time()
+            for _ in range(passes):
+                per_value = dict((key, self.fixCorruptedData(state_name=key, val=value)) for key, value in plan.iteritems())
+            per_value_time = (time.time() - start) / passes
+
+            start = time.time()
+            for _ in range(passes):
+                batch = self.fixCorruptedDataBatch(plan=plan)
+            batch_time = (time.time() - start) / passes
+
+        finally:
+            self.logger.disabled = False
+
+        indigo.server.log(u"{0:{1}^80}".format(" Data Sanitizer Benchmark ", "="))
+        indigo.server.log(u"{0:<31} {1} ({2} passes)".format("Values sanitized:", len(plan), passes))
+        indigo.server.log(u"{0:<31} {1:.2f} ms".format("Per-value sanitizer:", per_value_time * 1000))
+        indigo.server.log(u"{0:<31} {1:.2f} ms".format("Batch sanitizer:", batch_time * 1000))
+        indigo.server.log(u"{0:<31} {1}".format("Results identical:", per_value == batch))
+        indigo.server.log(u"{0:{1}^80}".format("", "="))
+
+    def broadcastDeltas(self):
+        """
+        Broadcast changes to subscriber plugins
+
+        The broadcastDeltas() method sends the changes recorded since the last
+        broadcast (see pendingDelta()) to plugins that have subscribed to them, so that
+        they don't have to poll device states. Nothing is sent if nothing has changed.
+        Changes are only recorded while the broadcastDeltas plugin pref is enabled.
+
+        Subscribers call:
+            indigo.server.subscribeToBroadcast(u"com.fogbert.indigoplugin.wunderground", u"weatherDeltas", u"callbackMethod")
+
+        The payload (version 1) is a dict:
+            version: 1 (kBroadcastVersion)
+            time:    broadcast time (epoch seconds)
+            devices: a list with a dict for each device that changed:
+                id:      Indigo device id
+                name:    device name
+                states:  dict of the changed state names and their new values
+                         (only states written to the server are included)
+                alerts:  list of new or changed severe weather alerts, each a dict
+                         with type, description, message and expires (weather
+                         devices only)
+                online:  True if the device has come back online, False if it has
+                         gone offline (no comm, location offline, etc.)
+
+        The states, alerts and online keys are only present when they have something
+        to report.
+
+        -----
+        """
+
+        with self.write_lock:
+            pending, self.pending_deltas = self.pending_deltas, {}
+
+        # Devices with nothing to report (an unchanged onOffState) are left out.
+        pending = dict((dev_id, delta) for dev_id, delta in pending.iteritems() if len(delta) > 2)
+
+        if not pending:
+            return
+
+        # Subscribers may look at the devices, so wait for the writer to finish with them.
+        self.flushDeviceWrites()
+        self.write_queue.join()
+
+        payload = {'version': kBroadcastVersion,
+                   'time': time.time(),
+                   'devices': [pending[dev_id] for dev_id in sorted(pending)],
+                   }
+
+        try:
+            indigo.server.broadcastToSubscribers(kBroadcastMessageType, payload)
+            self.logger.debug(u"Broadcast changes for {0} devices to subscribers.".format(len(pending)))
+
+        except Exception:
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+            self.logger.warning(u"Unable to broadcast weather changes to subscribers.")
+
     def callCount(self):
         """
         Maintain count of calls made to the WU API
@@ -632,6 +1096,9 @@ class Plugin(indigo.PluginBase):
         -----
         """
 
+        # Recent calls are kept for the per minute call limit (see callRateAvailable.)
+        self.call_times.append(time.time())
+
         calls_made             = int(self.pluginPrefs.get('dailyCallCounter', '0'))  # Calls today so far
         calls_max              = int(self.pluginPrefs.get('callCounter', '500'))  # Max calls allowed per day
 
@@ -689,10 +1156,10 @@ class Plugin(indigo.PluginBase):
             self.pluginPrefs['dailyCallDay'] = today_str
 
             # If it's a new day, reset the forecast email sent flags.
-            for dev in indigo.devices.itervalues('self'):
+            for dev in self.registeredDevices():
                 try:
                     if 'weatherSummaryEmailSent' in dev.states:
-                        dev.updateStateOnServer('weatherSummaryEmailSent', value=False)
+                        self.updateDeviceStates(dev, [{'key': 'weatherSummaryEmailSent', 'value': False}])
 
                 except Exception:
                     self.Fogbert.pluginErrorHandler(traceback.format_exc())
@@ -705,6 +1172,29 @@ class Plugin(indigo.PluginBase):
         if call_limit_reached:
             self.logger.info(u"Daily call limit reached. Taking the rest of the day off.")
 
+    def callRateAvailable(self):
+        """
+        Check the per minute call limit
+
+        Returns True if fewer calls than the per minute limit (plugin config) have been
+        made in the last 60 seconds. Calls are recorded by callCount(). Regular polls
+        are counted, but only the alerts lane waits for the limit.
+
+        -----
+        """
+
+        now = time.time()
+
+        while self.call_times and now - self.call_times[0] >= 60:
+            self.call_times.popleft()
+
+        try:
+            calls_per_minute = int(self.pluginPrefs.get('callsPerMinute', '10'))
+        except ValueError:
+            calls_per_minute = 10
+
+        return len(self.call_times) < calls_per_minute
+
     def commsKillAll(self):
         """
         Disable all plugin devices
@@ -714,7 +1204,7 @@ class Plugin(indigo.PluginBase):
         -----
         """
 
-        for dev in indigo.devices.itervalues("self"):
+        for dev in self.registeredDevices():
             try:
                 indigo.device.enable(dev, value=False)
 
@@ -739,6 +1229,161 @@ class Plugin(indigo.PluginBase):
                 self.Fogbert.pluginErrorHandler(traceback.format_exc())
                 self.logger.error(u"Exception when trying to unkill all comms.")
 
+    def compileThresholdRule(self, trigger, dev_id):
+        """
+        Compile a Weather Threshold trigger's expression
+
+        The expression is parsed once (when the trigger is started) and the rule is
+        indexed by the device states it reads. The rule's starting value is taken from
+        the device's current states so that it only fires when its expression becomes
+        true.
+
+        -----
+
+        :param indigo.Trigger trigger:
+        :param int dev_id:
+        """
+
+        try:
+            expression, states = self.evalExpr.compile_expr(trigger.pluginProps.get('expression', ''))
+
+        except (SyntaxError, TypeError):
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+            self.logger.warning(u"{0} trigger expression isn't valid. Skipping.".format(trigger.name))
+            return
+
+        rule = {'dev_id': dev_id, 'expression': expression, 'states': states, 'value': None}
+
+        if dev_id in self.device_registry:
+            rule['value'] = self.thresholdRuleValue(self.device_registry[dev_id], rule)
+
+        self.threshold_rules[trigger.id] = rule
+
+        for state in states:
+            self.threshold_index.setdefault((dev_id, state), set()).add(trigger.id)
+
+    def convertUnits(self, sanitized, quantities, units, english=None):
+        """
+        Convert sanitized canonical values to a unit system
+
+        The convertUnits() method takes a dict of sanitized (value, uiValue) pairs
+        (see fixCorruptedDataBatch()) holding metric values and converts each one
+        named in quantities to the units used by the unit system (see kUnitSystems).
+        Values that were imputed as (-99.0, --) and keys not named in quantities are
+        returned unchanged. Unknown unit systems are treated as Standard, which is
+        what the parsers have always fallen back to.
+
+        WU rounds many metric fields (temperatures, hourly precipitation, pressure in
+        mb) to whole numbers. When the target is an english unit (kEnglishUnits) and
+        english holds a sanitized value for the key, that value is used rather than
+        converting the metric value, so that no precision is lost (an english value
+        imputed as (-99.0, --) stays missing, as it always has for english units.) The
+        metric value is converted for keys that have no english value.
+
+        -----
+
+        :param dict sanitized: {key: (float, unicode string)}
+        :param dict quantities: {key: 'distance', 'precipitation', 'pressure', 'snow', 'temperature' or 'wind'}
+        :param str units: 'M', 'MS', 'I' or 'S'
+        :param dict english: {key: (float, unicode string)} the same values in english units (optional)
+        """
+
+        unit_system = kUnitSystems.get(units, kUnitSystems['S'])
+        result      = dict(sanitized)
+        english     = english or {}
+
+        for key, quantity in quantities.iteritems():
+            conversion = kUnitConversions.get((quantity, unit_system[quantity]))
+
+            if conversion is None:
+                continue
+
+            multiplier, offset, places = conversion
+
+            if unit_system[quantity] in kEnglishUnits and key in english:
+                value, ui_value = english[key]
+                multiplier, offset = 1.0, 0.0
+
+            else:
+                value, ui_value = sanitized[key]
+
+            if ui_value == u"--":
+                result[key] = (value, ui_value)
+                continue
+
+            value = round(value * multiplier + offset, places)
+            result[key] = (value, str(value))
+
+        return result
+
+    def devicesByLocation(self):
+        """
+        Group the started devices by location for a refresh cycle
+
+        Returns (location, devices) pairs. Weather devices are grouped by location
+        (in device id order) and are followed by the image devices, whose location is
+        None.
+
+        -----
+        """
+
+        groups = collections.OrderedDict()
+        image_devices = []
+
+        for dev in self.registeredDevices():
+            if dev.pluginProps.get('isWeatherDevice', False):
+                groups.setdefault(dev.pluginProps.get('location'), []).append(dev)
+            else:
+                image_devices.append(dev)
+
+        if image_devices:
+            groups[None] = image_devices
+
+        return groups.items()
+
+    def deviceSchemaFingerprint(self, dev):
+        """
+        Fingerprint a device's schema
+
+        The deviceSchemaFingerprint() method returns an md5 hash of the device's state
+        list (see getDeviceStateList(), which depends on Devices.xml and the device's
+        forecast horizon), its isWeatherDevice prop and the plugin version. The
+        fingerprint is kept in the device's props so that the state list is only
+        rebuilt when it has changed (see deviceStartComm().)
+
+        -----
+
+        :param indigo.Device dev:
+        """
+
+        state_keys = [state['Key'] for state in self.getDeviceStateList(dev)]
+        schema     = [self.pluginVersion, dev.deviceTypeId, dev.pluginProps.get('isWeatherDevice')] + state_keys
+
+        return hashlib.md5(u"|".join(u"{0}".format(item) for item in schema).encode('utf-8')).hexdigest()
+
+    def deviceWriterThread(self):
+        """
+        Write queued device batches to the server
+
+        The deviceWriterThread() method runs in its own thread (started in startup())
+        and writes each device batch put on the write queue (see flushDeviceWrites())
+        so that parsing doesn't wait on the server. A None batch stops the thread.
+
+        -----
+        """
+
+        while True:
+            batch = self.write_queue.get()
+
+            try:
+                if batch is None:
+                    return
+
+                self.writeDeviceBatch(batch)
+
+            finally:
+                self.write_queue.task_done()
+
     def dumpTheJSON(self):
         """
         Dump copy of weather JSON to file
@@ -776,9 +1421,11 @@ class Plugin(indigo.PluginBase):
         """
         Email forecast information
 
-        The emailForecast() method will construct and send a summary of select weather
-        information to the user based on the email address specified for plugin update
-        notifications.
+        The emailForecast() method will construct a summary of select weather
+        information for the user based on the email address specified for plugin update
+        notifications. The summary values are worked out once per location (see
+        locationSummary()). Messages are held until the end of the refresh cycle and
+        sent from the email thread (see flushSummaryEmails()).
 
         -----
 
@@ -787,7 +1434,7 @@ class Plugin(indigo.PluginBase):
 
         try:
             summary_wanted = dev.pluginProps.get('weatherSummaryEmail', '')
-            summary_sent   = dev.states.get('weatherSummaryEmailSent', False)
+            summary_sent   = self.latestDeviceState(dev, 'weatherSummaryEmailSent', False)
 
             # Get the desired summary email time and convert it for test.
             summary_time = dev.pluginProps.get('weatherSummaryEmailTime', '01:00')
@@ -810,162 +1457,298 @@ class Plugin(indigo.PluginBase):
             if summary_wanted and not summary_sent and dt.datetime.now().hour >= summary_time.hour:
 
                 config_menu_units = dev.pluginProps.get('configMenuUnits', '')
-                email_body        = u""
-                email_list        = []
-                location          = dev.pluginProps['location']
-
-                weather_data = self.masterWeatherDict[location]
-
-                temp_high_record_year        = int(self.nestedLookup(weather_data, keys=('almanac', 'temp_high', 'recordyear')))
-                temp_low_record_year         = int(self.nestedLookup(weather_data, keys=('almanac', 'temp_low', 'recordyear')))
-                today_record_high_metric     = self.nestedLookup(weather_data, keys=('almanac', 'temp_high', 'record', 'C'))
-                today_record_high_standard   = self.nestedLookup(weather_data, keys=('almanac', 'temp_high', 'record', 'F'))
-                today_record_low_metric      = self.nestedLookup(weather_data, keys=('almanac', 'temp_low', 'record', 'C'))
-                today_record_low_standard    = self.nestedLookup(weather_data, keys=('almanac', 'temp_low', 'record', 'F'))
-
-                forecast_today_metric        = self.nestedLookup(weather_data, keys=('forecast', 'txt_forecast', 'forecastday'))[0]['fcttext_metric']
-                forecast_today_standard      = self.nestedLookup(weather_data, keys=('forecast', 'txt_forecast', 'forecastday'))[0]['fcttext']
-                forecast_today_title         = self.nestedLookup(weather_data, keys=('forecast', 'txt_forecast', 'forecastday'))[0]['title']
-                forecast_tomorrow_metric     = self.nestedLookup(weather_data, keys=('forecast', 'txt_forecast', 'forecastday'))[1]['fcttext_metric']
-                forecast_tomorrow_standard   = self.nestedLookup(weather_data, keys=('forecast', 'txt_forecast', 'forecastday'))[1]['fcttext']
-                forecast_tomorrow_title      = self.nestedLookup(weather_data, keys=('forecast', 'txt_forecast', 'forecastday'))[1]['title']
-                max_humidity                 = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday', 'maxhumidity'))
-                today_high_metric            = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday', 'high', 'celsius'))
-                today_high_standard          = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday', 'high', 'fahrenheit'))
-                today_low_metric             = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday', 'low', 'celsius'))
-                today_low_standard           = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday', 'low', 'fahrenheit'))
-                today_qpf_metric             = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday', 'qpf_allday', 'mm'))
-                today_qpf_standard           = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday', 'qpf_allday', 'in'))
-
-                yesterday_high_temp_metric   = self.nestedLookup(weather_data, keys=('history', 'dailysummary', 'maxtempm'))
-                yesterday_high_temp_standard = self.nestedLookup(weather_data, keys=('history', 'dailysummary', 'maxtempi'))
-                yesterday_low_temp_metric    = self.nestedLookup(weather_data, keys=('history', 'dailysummary', 'mintempm'))
-                yesterday_low_temp_standard  = self.nestedLookup(weather_data, keys=('history', 'dailysummary', 'mintempi'))
-                yesterday_total_qpf_metric   = self.nestedLookup(weather_data, keys=('history', 'dailysummary', 'precipm'))
-                yesterday_total_qpf_standard = self.nestedLookup(weather_data, keys=('history', 'dailysummary', 'precipi'))
-
-                max_humidity                 = u"{0}".format(self.floatEverything(state_name="sendMailMaxHumidity", val=max_humidity))
-                today_high_metric            = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailHighC", val=today_high_metric))
-                today_high_standard          = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailHighF", val=today_high_standard))
-                today_low_metric             = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailLowC", val=today_low_metric))
-                today_low_standard           = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailLowF", val=today_low_standard))
-                today_qpf_metric             = u"{0} mm.".format(self.floatEverything(state_name="sendMailQPF", val=today_qpf_metric))
-                today_qpf_standard           = u"{0} in.".format(self.floatEverything(state_name="sendMailQPF", val=today_qpf_standard))
-                today_record_high_metric     = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailRecordHighC", val=today_record_high_metric))
-                today_record_high_standard   = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailRecordHighF", val=today_record_high_standard))
-                today_record_low_metric      = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailRecordLowC", val=today_record_low_metric))
-                today_record_low_standard    = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailRecordLowF", val=today_record_low_standard))
-                yesterday_high_temp_metric   = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailMaxTempM", val=yesterday_high_temp_metric))
-                yesterday_high_temp_standard = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailMaxTempI", val=yesterday_high_temp_standard))
-                yesterday_low_temp_metric    = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailMinTempM", val=yesterday_low_temp_metric))
-                yesterday_low_temp_standard  = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailMinTempI", val=yesterday_low_temp_standard))
-                yesterday_total_qpf_metric   = u"{0} mm.".format(self.floatEverything(state_name="sendMailPrecipM", val=yesterday_total_qpf_metric))
-                yesterday_total_qpf_standard = u"{0} in.".format(self.floatEverything(state_name="sendMailPrecipM", val=yesterday_total_qpf_standard))
-
-                email_list.append(u"{0}".format(dev.name))
+                summary           = self.locationSummary(dev.pluginProps['location'])
 
                 if config_menu_units in ['M', 'MS']:
-                    for element in [forecast_today_title, forecast_today_metric, forecast_tomorrow_title, forecast_tomorrow_metric, today_high_metric, today_low_metric, max_humidity,
-                                    today_qpf_metric, today_record_high_metric, temp_high_record_year, today_record_low_metric, temp_low_record_year, yesterday_high_temp_metric,
-                                    yesterday_low_temp_metric, yesterday_total_qpf_metric]:
-                        try:
-                            email_list.append(element)
-                        except KeyError:
-                            email_list.append(u"Not provided")
+                    elements = summary['M']
 
                 elif config_menu_units in 'I':
-                    for element in [forecast_today_title, forecast_today_metric, forecast_tomorrow_title, forecast_tomorrow_metric, today_high_metric, today_low_metric, max_humidity,
-                                    today_qpf_standard, today_record_high_metric, temp_high_record_year, today_record_low_metric, temp_low_record_year, yesterday_high_temp_metric,
-                                    yesterday_low_temp_metric, yesterday_total_qpf_standard]:
-                        try:
-                            email_list.append(element)
-                        except KeyError:
-                            email_list.append(u"Not provided")
+                    elements = summary['I']
 
                 elif config_menu_units in 'S':
-                    for element in [forecast_today_title, forecast_today_standard, forecast_tomorrow_title, forecast_tomorrow_standard, today_high_standard, today_low_standard,
-                                    max_humidity, today_qpf_standard, today_record_high_standard, temp_high_record_year, today_record_low_standard, temp_low_record_year,
-                                    yesterday_high_temp_standard, yesterday_low_temp_standard, yesterday_total_qpf_standard]:
-                        try:
-                            email_list.append(element)
-                        except KeyError:
-                            email_list.append(u"Not provided")
-
-                email_list = tuple([u"--" if x == "" else x for x in email_list])  # Set value to u"--" if an empty string.
-
-                email_body += u"{d[0]}\n" \
-                              u"-------------------------------------------\n\n" \
-                              u"{d[1]}:\n" \
-                              u"{d[2]}\n\n" \
-                              u"{d[3]}:\n" \
-                              u"{d[4]}\n\n" \
-                              u"Today:\n" \
-                              u"-------------------------\n" \
-                              u"High: {d[5]}\n" \
-                              u"Low: {d[6]}\n" \
-                              u"Humidity: {d[7]}%\n" \
-                              u"Precipitation total: {d[8]}\n\n" \
-                              u"Record:\n" \
-                              u"-------------------------\n" \
-                              u"High: {d[9]} ({d[10]})\n" \
-                              u"Low: {d[11]} ({d[12]})\n\n" \
-                              u"Yesterday:\n" \
-                              u"-------------------------\n" \
-                              u"High: {d[13]}\n" \
-                              u"Low: {d[14]}\n" \
-                              u"Precipitation: {d[15]}\n\n".format(d=email_list)
-
-                indigo.server.sendEmailTo(self.pluginPrefs['updaterEmail'], subject=u"Daily Weather Summary", body=email_body)
-                dev.updateStateOnServer('weatherSummaryEmailSent', value=True)
+                    elements = summary['S']
+
+                email_list = tuple([u"--" if x == "" else x for x in [u"{0}".format(dev.name)] + elements])  # Set value to u"--" if an empty string.
+
+                email_body = u"{d[0]}\n" \
+                             u"-------------------------------------------\n\n" \
+                             u"{d[1]}:\n" \
+                             u"{d[2]}\n\n" \
+                             u"{d[3]}:\n" \
+                             u"{d[4]}\n\n" \
+                             u"Today:\n" \
+                             u"-------------------------\n" \
+                             u"High: {d[5]}\n" \
+                             u"Low: {d[6]}\n" \
+                             u"Humidity: {d[7]}%\n" \
+                             u"Precipitation total: {d[8]}\n\n" \
+                             u"Record:\n" \
+                             u"-------------------------\n" \
+                             u"High: {d[9]} ({d[10]})\n" \
+                             u"Low: {d[11]} ({d[12]})\n\n" \
+                             u"Yesterday:\n" \
+                             u"-------------------------\n" \
+                             u"High: {d[13]}\n" \
+                             u"Low: {d[14]}\n" \
+                             u"Precipitation: {d[15]}\n\n".format(d=email_list)
+
+                # Marked as sent now so that it isn't sent again next cycle. The email thread
+                # clears the flag if the message can't be sent.
+                self.pending_summaries.append((dev, email_body))
+                self.updateDeviceStates(dev, [{'key': 'weatherSummaryEmailSent', 'value': True}])
             else:
                 pass
 
         except (KeyError, IndexError):
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
-            dev.updateStateOnServer('weatherSummaryEmailSent', value=True, uiValue=u"Err")
+            self.updateDeviceStates(dev, [{'key': 'weatherSummaryEmailSent', 'value': True, 'uiValue': u"Err"}])
             self.logger.debug(u"Unable to compile forecast data for {0}.".format(dev.name))
 
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.warning(u"Unable to send forecast email message. Will keep trying.")
 
-    def fixCorruptedData(self, state_name, val):
+    def emailSenderThread(self):
         """
-        Format corrupted and missing data
+        Send queued summary emails
 
-        Sometimes WU receives corrupted data from personal weather stations. Could be
-        zero, positive value or "--" or "-999.0" or "-9999.0". This method tries to
-        "fix" these values for proper display.
+        The emailSenderThread() method runs in its own thread (started in startup())
+        and sends each message put on the email queue (see flushSummaryEmails()) so
+        that refresh cycles don't wait on the mail server. If a message can't be sent,
+        its devices are marked as not sent so that it's tried again next cycle. A None
+        message stops the thread.
 
         -----
-
-        :param str state_name:
-        :param str or float val:
         """
 
-        try:
-            val = float(val)
+        while True:
+            message = self.email_queue.get()
 
-            if val < -55.728:  # -99 F = -55.728 C
-                self.logger.debug(u"Formatted {0} data. Got: {1} Returning: (-99.0, --)".format(state_name, val))
-                return -99.0, u"--"
+            try:
+                if message is None:
+                    return
 
-            else:
-                return val, str(val)
+                indigo.server.sendEmailTo(self.pluginPrefs['updaterEmail'], subject=u"Daily Weather Summary", body=message['body'])
 
-        except (ValueError, TypeError):
-            self.Fogbert.pluginErrorHandler(traceback.format_exc())
-            self.logger.debug(u"Imputing {0} data. Got: {1} Returning: (-99.0, --)".format(state_name, val))
-            return -99.0, u"--"
+            except Exception:
+                self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                self.logger.warning(u"Unable to send forecast email message. Will keep trying.")
 
-    def floatEverything(self, state_name, val):
-        """
-        Take value and return float
+                for dev in message['devices']:
+                    self.updateDeviceStates(dev, [{'key': 'weatherSummaryEmailSent', 'value': False}])
 
-        This doesn't actually float everything. Select values are sent here to see if
-        they float. If they do, a float is returned. Otherwise, a Unicode string is
-        returned. This is necessary because Weather Underground will send values that
-        won't float even when they're supposed to.
+            finally:
+                self.email_queue.task_done()
+
+    def expireAlerts(self):
+        """
+        Clear alerts that have expired
+
+        The expireAlerts() method is called from the main thread each time it wakes.
+        It removes expired alerts from the alert store and updates the alert states
+        of the locations' weather devices. No API call is made, so alerts expire on
+        time while polling is paused (call limit, Weather Underground offline.)
+
+        -----
+        """
+
+        now = time.time()
+        locations = set()
+
+        # Alerts are stored (see storeAlerts) under the same lock.
+        with self.parse_lock:
+            while self.alert_expiries and self.alert_expiries[0][0] <= now:
+                expiry = heapq.heappop(self.alert_expiries)
+                self.alert_expiry_index.discard(expiry)
+                locations.add(expiry[1])
+
+            for location in sorted(locations):
+                alerts = self.masterAlertDict.get(location, [])
+                active = [(expires, alert) for expires, alert in alerts if expires > now]
+
+                if len(active) == len(alerts):
+                    continue
+
+                self.logger.debug(u"{0} alert(s) for {1} expired.".format(len(alerts) - len(active), location))
+                self.masterAlertDict[location] = active
+
+                # Devices that haven't been parsed since the plugin started are left to the next poll.
+                for dev in self.registeredDevices(type_id='wunderground', location=location):
+                    if 'alertFingerprints' in self.masterDeviceDict.get(dev.id, {}):
+                        self.parseAlertsData(dev)
+
+    def fireAlertTriggers(self, dev, new_alerts):
+        """
+        Fire a weather device's Severe Weather Alert triggers
+
+        The fireAlertTriggers() method is called by triggerProcessing() and by the
+        alerts lane (see refreshAlerts), which only fires the alert triggers.
+
+        -----
+
+        :param indigo.Device dev:
+        :param int new_alerts: number of new (or changed) alerts (see parseAlertsData)
+        """
+
+        if not new_alerts:
+            return
+
+        for trigger in self.masterTriggerDict.get(dev.id, {}).get('weatherAlert', {}).values():
+
+            if trigger.enabled:
+
+                self.logger.warning(u"{0} location has at least one new severe weather alert.".format(dev.name))
+                indigo.trigger.execute(trigger.id)
+
+    def fireOfflineDeadlines(self):
+        """
+        Fire weather location offline triggers whose deadlines have passed
+
+        The fireOfflineDeadlines() method is called from the main thread after each
+        poll cycle and each time it wakes. Deadlines that have been replaced (fresh
+        data, trigger restarted) are skipped. A device may have updated without a
+        trigger pass (Refresh Data menu item), so each deadline is worked out again
+        before its trigger is fired.
+
+        -----
+        """
+
+        now = time.time()
+        due = []
+
+        with self.deadline_lock:
+            while self.offline_deadlines and self.offline_deadlines[0][0] <= now:
+                deadline, dev_id = heapq.heappop(self.offline_deadlines)
+
+                if self.offline_deadline_index.get(dev_id) == deadline:
+                    del self.offline_deadline_index[dev_id]
+                    due.append(dev_id)
+
+        for dev_id in due:
+            dev = self.device_registry.get(dev_id)
+
+            if dev is None or not dev.enabled:
+                continue
+
+            for trigger in self.masterTriggerDict.get(dev_id, {}).get('weatherSiteOffline', {}).values():
+                deadline = self.offlineDeadline(dev, trigger)
+
+                if deadline > now:
+                    self.scheduleOfflineDeadlines(dev)
+                    continue
+
+                total_seconds = int(now - deadline) + int(trigger.pluginProps.get('offlineTimer', '60')) * 60
+                days, remainder = divmod(total_seconds, 60 * 60 * 24)
+                hours, remainder = divmod(remainder, 60 * 60)
+                minutes, seconds = divmod(remainder, 60)
+
+                # Note that we leave seconds off, but it could easily be added if needed.
+                diff_msg = u'{} days, {} hrs, {} mins'.format(days, hours, minutes)
+
+                self.fireOfflineTrigger(dev, trigger, u"for {0}".format(diff_msg))
+
+    def fireOfflineTrigger(self, dev, trigger, reason):
+        """
+        Mark a weather location offline and fire its trigger
+
+        -----
+
+        :param indigo.Device dev:
+        :param indigo.Trigger trigger:
+        :param unicode reason: the end of the log message
+        """
+
+        self.updateDeviceImage(dev, indigo.kStateImageSel.TemperatureSensor)
+        self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': 'offline'}])
+
+        if trigger.enabled:
+            self.logger.warning(u"{0} location appears to be offline {1}".format(dev.name, reason))
+            indigo.trigger.execute(trigger.id)
+
+    def fixCorruptedData(self, state_name, val):
+        """
+        Format corrupted and missing data
+
+        Sometimes WU receives corrupted data from personal weather stations. Could be
+        zero, positive value or "--" or "-999.0" or "-9999.0". This method tries to
+        "fix" these values for proper display.
+
+        -----
+
+        :param str state_name:
+        :param str or float val:
+        """
+
+        try:
+            val = float(val)
+
+            if val < -55.728:  # -99 F = -55.728 C
+                self.logger.debug(u"Formatted {0} data. Got: {1} Returning: (-99.0, --)".format(state_name, val))
+                return -99.0, u"--"
+
+            else:
+                return val, str(val)
+
+        except (ValueError, TypeError):
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+            self.logger.debug(u"Imputing {0} data. Got: {1} Returning: (-99.0, --)".format(state_name, val))
+            return -99.0, u"--"
+
+    def fixCorruptedDataBatch(self, plan):
+        """
+        Format corrupted and missing data for a full payload
+
+        The fixCorruptedDataBatch() method applies the same rules as fixCorruptedData()
+        to every value in a parse plan at once. Each value is converted to float a
+        single time into an array('d') column (unparseable values are stored as NaN,
+        as forecastColumns() does), the mask of bad values (NaN or below -99 F) is
+        built from the column, and the (value, uiValue) pairs are returned keyed the
+        same way as the plan. Unparseable values go to the error handler, as they do
+        in fixCorruptedData(), but rather than logging each imputed value separately,
+        one debug line summarizes the values that were masked.
+
+        -----
+
+        :param dict plan: {state_name: raw value}
+        """
+
+        names  = list(plan)
+        column = array.array('d')
+
+        for name in names:
+            try:
+                column.append(float(plan[name]))
+
+            except (ValueError, TypeError):
+                self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                column.append(kNaN)
+
+        # NaN != NaN, and -99 F = -55.728 C
+        mask = [val != val or val < -55.728 for val in column]
+
+        result = {}
+        masked = []
+
+        for name, val, bad in zip(names, column, mask):
+            if bad:
+                result[name] = (-99.0, u"--")
+                masked.append(name)
+            else:
+                result[name] = (val, str(val))
+
+        if masked:
+            self.logger.debug(u"Imputed {0} of {1} values as (-99.0, --): {2}".format(len(masked), len(names), u", ".join(sorted(masked))))
+
+        return result
+
+    def floatEverything(self, state_name, val):
+        """
+        Take value and return float
+
+        This doesn't actually float everything. Select values are sent here to see if
+        they float. If they do, a float is returned. Otherwise, a Unicode string is
+        returned. This is necessary because Weather Underground will send values that
+        won't float even when they're supposed to.
 
         -----
 
@@ -981,6 +1764,260 @@ class Plugin(indigo.PluginBase):
             self.logger.debug(u"Error floating {0} (val = {1})".format(state_name, val))
             return -99.0
 
+    def flushDeviceWrites(self):
+        """
+        Queue pending device writes for the writer thread
+
+        The flushDeviceWrites() method puts each device's pending write batch (see
+        pendingDeviceWrites()) on the write queue, and counts the states sent.
+
+        -----
+        """
+
+        with self.write_lock:
+            pending, self.pending_writes = self.pending_writes, {}
+
+        for batch in pending.itervalues():
+            self.write_stats['statesSent'] += len(batch['states'])
+            self.write_queue.put(batch)
+
+    def flushSummaryEmails(self):
+        """
+        Queue pending summary emails for the email thread
+
+        The flushSummaryEmails() method puts the summary emails built this cycle (see
+        emailForecast()) on the email queue; one message per device, or one digest
+        for every device if the plugin is set to combine them.
+
+        -----
+        """
+
+        pending, self.pending_summaries = self.pending_summaries, []
+
+        if not pending:
+            return
+
+        if self.pluginPrefs.get('weatherSummaryDigest', False):
+            self.email_queue.put({'body': u"".join(body for dev, body in pending), 'devices': [dev for dev, body in pending]})
+
+        else:
+            for dev, body in pending:
+                self.email_queue.put({'body': body, 'devices': [dev]})
+
+    def forecastColumns(self, weather_data):
+        """
+        Convert forecast data to columns
+
+        The forecastColumns() method converts the hourly and ten day forecast lists
+        into compact typed columns (one array of doubles per field) once per fetch.
+        Values are stored in metric (see kUnitSystems), along with the english values
+        WU provides (columns ending in _e, see convertUnits()). Values that are missing
+        or corrupted are stored as NaN so that statistics computed from the columns can
+        skip them. The columns are saved with the location record.
+
+        -----
+
+        :param dict weather_data:
+        """
+
+        hourly_fields = {'epoch':    ('FCTTIME', 'epoch'),
+                         'humidity': ('humidity',),
+                         'pop':      ('pop',),
+                         'qpf':      ('qpf', 'metric'),
+                         'qpf_e':    ('qpf', 'english'),
+                         'snow':     ('snow', 'metric'),
+                         'snow_e':   ('snow', 'english'),
+                         'temp':     ('temp', 'metric'),
+                         'temp_e':   ('temp', 'english'),
+                         'wdir':     ('wdir', 'degrees'),
+                         'wspd':     ('wspd', 'metric'),
+                         'wspd_e':   ('wspd', 'english'),
+                         }
+
+        ten_day_fields = {'epoch':      ('date', 'epoch'),
+                          'high':       ('high', 'celsius'),
+                          'high_e':     ('high', 'fahrenheit'),
+                          'humidity':   ('maxhumidity',),
+                          'low':        ('low', 'celsius'),
+                          'low_e':      ('low', 'fahrenheit'),
+                          'pop':        ('pop',),
+                          'qpf':        ('qpf_allday', 'mm'),
+                          'qpf_e':      ('qpf_allday', 'in'),
+                          'snow':       ('snow_allday', 'cm'),
+                          'snow_e':     ('snow_allday', 'in'),
+                          'wdir':       ('avewind', 'degrees'),
+                          'wspd':       ('avewind', 'kph'),
+                          'wspd_e':     ('avewind', 'mph'),
+                          'wspd_max':   ('maxwind', 'kph'),
+                          'wspd_max_e': ('maxwind', 'mph'),
+                          }
+
+        try:
+            hourly_data = weather_data.get('hourly_forecast', [])
+        except AttributeError:
+            hourly_data = []
+
+        try:
+            ten_day_data = weather_data['forecast']['simpleforecast']['forecastday']
+        except (KeyError, TypeError):
+            ten_day_data = []
+
+        columns = {}
+        for feature, fields, data in (('hourly', hourly_fields, hourly_data), ('tenDay', ten_day_fields, ten_day_data)):
+            columns[feature] = {}
+
+            for column, keys in fields.iteritems():
+                values = []
+
+                for entry in data:
+                    val = entry
+                    for key in keys:
+                        try:
+                            val = val[key]
+                        except (KeyError, IndexError, TypeError):
+                            val = None
+                            break
+
+                    # Same rule as fixCorruptedData(), but without the per-value logging.
+                    try:
+                        val = float(val)
+                        if val < -55.728:
+                            val = kNaN
+                    except (ValueError, TypeError):
+                        val = kNaN
+
+                    values.append(val)
+
+                columns[feature][column] = array.array('d', values)
+
+        return columns
+
+    def forecastHorizon(self, dev):
+        """
+        Number of forecast slots used by a device
+
+        The forecastHorizon() method returns the number of forecast slots (hours, days
+        or tide events) the device is set to show. Devices saved before the setting
+        existed use all of them.
+
+        -----
+
+        :param indigo.Device dev:
+        """
+
+        slots = kForecastHorizons[dev.deviceTypeId][1]
+
+        try:
+            return max(1, min(slots, int(dev.pluginProps.get('forecastHorizon', slots))))
+
+        except ValueError:
+            return slots
+
+    def forecastSummaryStates(self, dev, feature):
+        """
+        Compute derived forecast states from forecast columns
+
+        The forecastSummaryStates() method computes forecast summary states (rain in
+        the next 6 hours, max wind, hours until freezing, etc.) for hourly and ten day
+        devices. Each statistic is a single pass over a slice of one of the location's
+        forecast columns (see forecastColumns()), so no additional lookups in the raw
+        JSON are needed. Returns a list of state dicts ready for updateStatesOnServer.
+
+        -----
+
+        :param indigo.Device dev:
+        :param str feature: 'hourly' or 'tenDay'
+        """
+
+        config_menu_units = dev.pluginProps.get('configMenuUnits', '')
+        location          = dev.pluginProps['location']
+        summary_list      = []
+
+        columns = self.masterLocationDict.get(location, {}).get('columns', {}).get(feature)
+
+        if not columns:
+            return summary_list
+
+        formatters = {'percentage':    self.uiFormatPercentage,
+                      'precipitation': self.uiFormatRain,
+                      'snow':          self.uiFormatSnow,
+                      'temperature':   self.uiFormatTemperature,
+                      'wind':          self.uiFormatWind,
+                      }
+
+        # (state, column, first slot, last slot, reducer, quantity)
+        if feature == 'hourly':
+            summary_spec = (('qpf6hr',           'qpf',  0, 6,  sum, 'precipitation'),
+                            ('qpf24hr',          'qpf',  0, 24, sum, 'precipitation'),
+                            ('snow24hr',         'snow', 0, 24, sum, 'snow'),
+                            ('popMax24hr',       'pop',  0, 24, max, 'percentage'),
+                            ('tempHigh24hr',     'temp', 0, 24, max, 'temperature'),
+                            ('tempLow24hr',      'temp', 0, 24, min, 'temperature'),
+                            ('windSpeedMax24hr', 'wspd', 0, 24, max, 'wind'),
+                            )
+        else:
+            summary_spec = (('qpfTotal',     'qpf',      0, 10, sum, 'precipitation'),
+                            ('snowTotal',    'snow',     0, 10, sum, 'snow'),
+                            ('tempHighMax',  'high',     0, 10, max, 'temperature'),
+                            ('tempLowMin',   'low',      0, 10, min, 'temperature'),
+                            ('windSpeedMax', 'wspd_max', 0, 10, max, 'wind'),
+                            )
+
+        # Reduce each column slice in metric (and english, where there is an english
+        # column), then convert the results in one batch.
+        summaries  = {}
+        english    = {}
+        quantities = {}
+
+        for state_name, column, start, stop, reducer, quantity in summary_spec:
+            for target, source in ((summaries, column), (english, u"{0}_e".format(column))):
+                values = [val for val in columns.get(source, [])[start:stop] if val == val]  # NaN != NaN
+
+                if values:
+                    value = round(reducer(values), 2)
+                    target[state_name] = (value, str(value))
+                else:
+                    target[state_name] = (-99.0, u"--")
+
+            if quantity != 'percentage':
+                quantities[state_name] = quantity
+
+        summaries = self.convertUnits(sanitized=summaries, quantities=quantities, units=config_menu_units, english=english)
+
+        for state_name, column, start, stop, reducer, quantity in summary_spec:
+            value, ui_value = summaries[state_name]
+
+            if ui_value != u"--":
+                ui_value = formatters[quantity](dev=dev, state_name=state_name, val=ui_value)
+
+            summary_list.append({'key': state_name, 'value': value, 'uiValue': ui_value})
+
+        if feature == 'hourly':
+            # Hours until the forecast temperature first reaches freezing (-1 if not within the forecast.)
+            hours_until_freezing = -1
+            epochs = columns['epoch']
+
+            for slot, temp_c in enumerate(columns['temp'][:24]):
+                if temp_c <= 0.0:
+                    # The slots are whole hours starting with the next hour, so a slot without
+                    # a usable epoch (NaN) is counted from its position.
+                    if epochs[slot] == epochs[slot]:
+                        hours_until_freezing = max(0, int(math.ceil((epochs[slot] - time.time()) / 3600.0)))
+                    else:
+                        hours_until_freezing = slot + 1
+                    break
+
+            ui_value = u"{0}".format(hours_until_freezing) if hours_until_freezing >= 0 else u"--"
+            summary_list.append({'key': 'hoursUntilFreezing', 'value': hours_until_freezing, 'uiValue': ui_value})
+
+        else:
+            # Number of forecast days with measurable precipitation (in either unit; small
+            # amounts can round to 0 mm.)
+            qpf_days = len([val for val, val_e in zip(columns['qpf'][:10], columns['qpf_e'][:10]) if val > 0.0 or val_e > 0.0])
+            summary_list.append({'key': 'qpfDays', 'value': qpf_days, 'uiValue': u"{0}".format(qpf_days)})
+
+        return summary_list
+
     def generatorTime(self, filter="", values_dict=None, type_id="", target_id=0):
         """
         List of hours generator
@@ -1030,6 +2067,8 @@ class Plugin(indigo.PluginBase):
         :param indigo.Device dev:
         """
 
+        import requests
+
         destination = unicode(dev.pluginProps['imageDestinationLocation'])
         source      = unicode(dev.pluginProps['imageSourceLocation'])
 
@@ -1051,17 +2090,18 @@ class Plugin(indigo.PluginBase):
                 except requests.exceptions.ConnectionError:
                     self.Fogbert.pluginErrorHandler(traceback.format_exc())
                     self.logger.warning(u"Error downloading satellite image. (No comm.)")
-                    dev.updateStateOnServer('onOffState', value=False, uiValue=u"No comm")
-                    dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+                    self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u"No comm"}])
+                    self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
                     return
 
                 # Requests not installed
                 except NameError:
                     self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                    import urllib  # (satellite imagery fallback)
                     urllib.urlretrieve(source, destination)
 
-                dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
-                dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
+                self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': True, 'uiValue': u" "}])
+                self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOn)
 
                 # Report results of download timer.
                 data_cycle_time = (dt.datetime.now() - get_data_time)
@@ -1073,15 +2113,15 @@ class Plugin(indigo.PluginBase):
 
             else:
                 self.logger.error(u"The image destination must include one of the approved types (.gif, .jpg, .jpeg, .png)")
-                dev.updateStateOnServer('onOffState', value=False, uiValue=u"Bad Type")
-                dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+                self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u"Bad Type"}])
+                self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
                 return False
 
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"[{0}] Error downloading satellite image.")
-            dev.updateStateOnServer('onOffState', value=False, uiValue=u"No comm")
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+            self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u"No comm"}])
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
 
     def getWUradar(self, dev):
         """
@@ -1096,6 +2136,8 @@ class Plugin(indigo.PluginBase):
         :param indigo.Device dev:
         """
 
+        import requests
+
         location    = u''
         name        = unicode(dev.pluginProps['imagename'])
         parms       = u''
@@ -1186,8 +2228,8 @@ class Plugin(indigo.PluginBase):
                         for chunk in r.iter_content(1024):
                             img.write(chunk)
 
-                    dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
-                    dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
+                    self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': True, 'uiValue': u" "}])
+                    self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOn)
 
                     # Report results of download timer.
                     data_cycle_time = (dt.datetime.now() - get_data_time)
@@ -1202,13 +2244,14 @@ class Plugin(indigo.PluginBase):
             except requests.exceptions.ConnectionError:
                 self.Fogbert.pluginErrorHandler(traceback.format_exc())
                 self.logger.warning(u"Error downloading satellite image. (No comm.)")
-                dev.updateStateOnServer('onOffState', value=False, uiValue=u"No comm")
-                dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+                self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u"No comm"}])
+                self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
                 return
 
             # Requests not installed
             except NameError:
                 self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                import urllib  # (radar imagery fallback)
                 urllib.urlretrieve(source, destination)
 
             # Since this uses the API, go increment the call counter.
@@ -1217,8 +2260,8 @@ class Plugin(indigo.PluginBase):
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Error downloading satellite image.")
-            dev.updateStateOnServer('onOffState', value=False, uiValue=u"No comm")
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+            self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u"No comm"}])
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
 
     def getWeatherData(self, dev):
         """
@@ -1232,6 +2275,9 @@ class Plugin(indigo.PluginBase):
         :param indigo.Device dev:
         """
 
+        import requests
+        import simplejson
+
         try:
 
             location = dev.pluginProps.get('location', 'autoip')
@@ -1261,6 +2307,9 @@ class Plugin(indigo.PluginBase):
                 except NameError:
                     self.Fogbert.pluginErrorHandler(traceback.format_exc())
                     try:
+                        import socket
+                        import urllib2  # (weather data fallback)
+
                         # Connect to Weather Underground and retrieve data.
                         socket.setdefaulttimeout(20)
                         f = urllib2.urlopen(url)
@@ -1270,9 +2319,9 @@ class Plugin(indigo.PluginBase):
                         self.Fogbert.pluginErrorHandler(traceback.format_exc())
                         self.logger.warning(u"Unable to reach Weather Underground. Sleeping until next scheduled poll.")
                         self.logger.debug(u"Unable to reach Weather Underground after 20 seconds.")
-                        for dev in indigo.devices.itervalues("self"):
-                            dev.updateStateOnServer("onOffState", value=False, uiValue=u" ")
-                            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+                        for dev in self.registeredDevices():
+                            self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u" "}])
+                            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
                         return
 
                 # Report results of download timer.
@@ -1294,11 +2343,27 @@ class Plugin(indigo.PluginBase):
                 self.logger.debug(u"Adding weather data for {0} to Master Weather Dictionary.".format(location))
                 self.masterWeatherDict[location] = parsed_simplejson
 
+                # Alerts are kept until they expire or a later download drops them.
+                if 'alerts' in parsed_simplejson:
+                    self.storeAlerts(location, parsed_simplejson['alerts'])
+
+                # Convert the forecast lists to columns once per fetch so that derived
+                # forecast states don't have to walk the raw JSON for each device.
+                self.masterLocationDict.setdefault(location, {})['columns'] = self.forecastColumns(parsed_simplejson)
+
+                # Fingerprint the response and each feature so that unchanged data can be skipped.
+                self.masterLocationDict[location]['hashes'] = self.payloadHashes(simplejson_string, parsed_simplejson)
+
+                # Observation and summary values shared by the location's devices are worked out again from the new data.
+                self.masterLocationDict[location].pop('observation', None)
+                self.masterLocationDict[location].pop('summary', None)
+
                 # Increment (or reset) the call counter.
                 self.callCount()
 
                 # We've been successful, mark device online
-                dev.updateStateOnServer('onOffState', value=True)
+                if not dev.states.get('onOffState', False):
+                    self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': True}])
 
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
@@ -1306,11 +2371,11 @@ class Plugin(indigo.PluginBase):
             self.logger.debug(u"Unable to reach Weather Underground after 20 seconds.")
 
             # Unable to fetch the JSON. Mark all devices as 'false'.
-            for dev in indigo.devices.itervalues("self"):
+            for dev in self.registeredDevices():
                 if dev.enabled:
                     # Mark device as off and dim the icon.
-                    dev.updateStateOnServer('onOffState', value=False, uiValue=u"No comm")
-                    dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+                    self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u"No comm"}])
+                    self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
 
             self.wuOnline = False
 
@@ -1318,6 +2383,29 @@ class Plugin(indigo.PluginBase):
         self.wuOnline = True
         return self.masterWeatherDict
 
+    def latestDeviceState(self, dev, state_name, default=None):
+        """
+        Latest value of a device state
+
+        The latestDeviceState() method returns the value the plugin last wrote to the
+        device state (which may still be waiting in the device's write batch), or the
+        server's value if the plugin hasn't written the state since the device was
+        started. Use it instead of dev.states for states written earlier in the cycle.
+
+        -----
+
+        :param indigo.Device dev:
+        :param str state_name:
+        :param default: returned if the device doesn't have the state
+        """
+
+        written = self.masterDeviceDict.get(dev.id, {}).get('writtenStates', {})
+
+        if state_name in written:
+            return written[state_name]['value']
+
+        return dev.states.get(state_name, default)
+
     def listOfDevices(self, filter, values_dict, target_id, trigger_id):
         """
         Generate list of devices for offline trigger
@@ -1353,6 +2441,130 @@ class Plugin(indigo.PluginBase):
 
         return self.Fogbert.deviceList(filter='self.wunderground')
 
+    def locationObservation(self, location):
+        """
+        Observation values shared by the devices at a location
+
+        The locationObservation() method returns the location's observation epoch,
+        time and station ID along with the observation time as a datetime and as a
+        string in the plugin's date and time formats. The values are worked out once
+        per download (getWeatherData() discards them when new data arrive) and kept
+        with the location, so every device at the location uses the same ones. Raises
+        ValueError if the observation epoch isn't a number.
+
+        -----
+
+        :param str location:
+        """
+
+        location_dict = self.masterLocationDict.setdefault(location, {})
+        time_format   = u"{0} {1}".format(self.date_format, self.time_format)
+        observation   = location_dict.get('observation')
+
+        if observation is None or observation['format'] != time_format:
+            weather_data = self.masterWeatherDict.get(location, {})
+            epoch        = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
+            observed     = dt.datetime.fromtimestamp(float(epoch))
+
+            observation = {'datetime':   observed,
+                           'epoch':      epoch,
+                           'format':     time_format,
+                           'station_id': self.nestedLookup(weather_data, keys=('current_observation', 'station_id')),
+                           'time':       self.nestedLookup(weather_data, keys=('current_observation', 'observation_time')),
+                           'time24':     observed.strftime(time_format),
+                           }
+            location_dict['observation'] = observation
+
+        return observation
+
+    def locationSummary(self, location):
+        """
+        Daily weather summary values for a location
+
+        The locationSummary() method returns the values used in the daily weather
+        summary email, formatted for each units setting ('M', 'I' and 'S'). The values
+        are worked out once per download (getWeatherData() discards them when new
+        data arrive) and kept with the location, so every summary for the location
+        uses the same ones. Raises KeyError or IndexError if the forecast text isn't
+        available.
+
+        -----
+
+        :param str location:
+        """
+
+        location_dict = self.masterLocationDict.setdefault(location, {})
+        summary       = location_dict.get('summary')
+
+        if summary is None:
+            weather_data = self.masterWeatherDict[location]
+
+            almanac       = self.nestedLookup(weather_data, keys=('almanac',))
+            forecast_text = self.nestedLookup(weather_data, keys=('forecast', 'txt_forecast', 'forecastday'))
+            today         = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday'))
+            yesterday     = self.nestedLookup(weather_data, keys=('history', 'dailysummary'))
+
+            temp_high_record_year        = int(self.nestedLookup(almanac, keys=('temp_high', 'recordyear')))
+            temp_low_record_year         = int(self.nestedLookup(almanac, keys=('temp_low', 'recordyear')))
+            today_record_high_metric     = self.nestedLookup(almanac, keys=('temp_high', 'record', 'C'))
+            today_record_high_standard   = self.nestedLookup(almanac, keys=('temp_high', 'record', 'F'))
+            today_record_low_metric      = self.nestedLookup(almanac, keys=('temp_low', 'record', 'C'))
+            today_record_low_standard    = self.nestedLookup(almanac, keys=('temp_low', 'record', 'F'))
+
+            forecast_today_metric        = forecast_text[0]['fcttext_metric']
+            forecast_today_standard      = forecast_text[0]['fcttext']
+            forecast_today_title         = forecast_text[0]['title']
+            forecast_tomorrow_metric     = forecast_text[1]['fcttext_metric']
+            forecast_tomorrow_standard   = forecast_text[1]['fcttext']
+            forecast_tomorrow_title      = forecast_text[1]['title']
+            max_humidity                 = self.nestedLookup(today, keys=('maxhumidity',))
+            today_high_metric            = self.nestedLookup(today, keys=('high', 'celsius'))
+            today_high_standard          = self.nestedLookup(today, keys=('high', 'fahrenheit'))
+            today_low_metric             = self.nestedLookup(today, keys=('low', 'celsius'))
+            today_low_standard           = self.nestedLookup(today, keys=('low', 'fahrenheit'))
+            today_qpf_metric             = self.nestedLookup(today, keys=('qpf_allday', 'mm'))
+            today_qpf_standard           = self.nestedLookup(today, keys=('qpf_allday', 'in'))
+
+            yesterday_high_temp_metric   = self.nestedLookup(yesterday, keys=('maxtempm',))
+            yesterday_high_temp_standard = self.nestedLookup(yesterday, keys=('maxtempi',))
+            yesterday_low_temp_metric    = self.nestedLookup(yesterday, keys=('mintempm',))
+            yesterday_low_temp_standard  = self.nestedLookup(yesterday, keys=('mintempi',))
+            yesterday_total_qpf_metric   = self.nestedLookup(yesterday, keys=('precipm',))
+            yesterday_total_qpf_standard = self.nestedLookup(yesterday, keys=('precipi',))
+
+            max_humidity                 = u"{0}".format(self.floatEverything(state_name="sendMailMaxHumidity", val=max_humidity))
+            today_high_metric            = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailHighC", val=today_high_metric))
+            today_high_standard          = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailHighF", val=today_high_standard))
+            today_low_metric             = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailLowC", val=today_low_metric))
+            today_low_standard           = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailLowF", val=today_low_standard))
+            today_qpf_metric             = u"{0} mm.".format(self.floatEverything(state_name="sendMailQPF", val=today_qpf_metric))
+            today_qpf_standard           = u"{0} in.".format(self.floatEverything(state_name="sendMailQPF", val=today_qpf_standard))
+            today_record_high_metric     = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailRecordHighC", val=today_record_high_metric))
+            today_record_high_standard   = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailRecordHighF", val=today_record_high_standard))
+            today_record_low_metric      = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailRecordLowC", val=today_record_low_metric))
+            today_record_low_standard    = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailRecordLowF", val=today_record_low_standard))
+            yesterday_high_temp_metric   = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailMaxTempM", val=yesterday_high_temp_metric))
+            yesterday_high_temp_standard = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailMaxTempI", val=yesterday_high_temp_standard))
+            yesterday_low_temp_metric    = u"{0:.0f}C".format(self.floatEverything(state_name="sendMailMinTempM", val=yesterday_low_temp_metric))
+            yesterday_low_temp_standard  = u"{0:.0f}F".format(self.floatEverything(state_name="sendMailMinTempI", val=yesterday_low_temp_standard))
+            yesterday_total_qpf_metric   = u"{0} mm.".format(self.floatEverything(state_name="sendMailPrecipM", val=yesterday_total_qpf_metric))
+            yesterday_total_qpf_standard = u"{0} in.".format(self.floatEverything(state_name="sendMailPrecipM", val=yesterday_total_qpf_standard))
+
+            summary = {'M': [forecast_today_title, forecast_today_metric, forecast_tomorrow_title, forecast_tomorrow_metric, today_high_metric, today_low_metric,
+                             max_humidity, today_qpf_metric, today_record_high_metric, temp_high_record_year, today_record_low_metric, temp_low_record_year,
+                             yesterday_high_temp_metric, yesterday_low_temp_metric, yesterday_total_qpf_metric],
+                       'I': [forecast_today_title, forecast_today_metric, forecast_tomorrow_title, forecast_tomorrow_metric, today_high_metric, today_low_metric,
+                             max_humidity, today_qpf_standard, today_record_high_metric, temp_high_record_year, today_record_low_metric, temp_low_record_year,
+                             yesterday_high_temp_metric, yesterday_low_temp_metric, yesterday_total_qpf_standard],
+                       'S': [forecast_today_title, forecast_today_standard, forecast_tomorrow_title, forecast_tomorrow_standard, today_high_standard,
+                             today_low_standard, max_humidity, today_qpf_standard, today_record_high_standard, temp_high_record_year,
+                             today_record_low_standard, temp_low_record_year, yesterday_high_temp_standard, yesterday_low_temp_standard,
+                             yesterday_total_qpf_standard],
+                       }
+            location_dict['summary'] = summary
+
+        return summary
+
     def nestedLookup(self, obj, keys, default=u"Not available"):
         """
         Do a nested lookup of the WU JSON
@@ -1386,6 +2598,27 @@ class Plugin(indigo.PluginBase):
 
         return current
 
+    def offlineDeadline(self, dev, trigger):
+        """
+        Work out when a weather location offline trigger is due
+
+        The deadline is the device's latest observation epoch plus the trigger's
+        offline timer (in seconds since the epoch.) Devices without a usable
+        observation epoch are never due.
+
+        -----
+
+        :param indigo.Device dev:
+        :param indigo.Trigger trigger:
+        """
+
+        try:
+            epoch = float(self.latestDeviceState(dev, 'currentObservationEpoch'))
+            return epoch + int(trigger.pluginProps.get('offlineTimer', '60')) * 60
+
+        except (TypeError, ValueError):
+            return float('inf')
+
     def parseAlmanacData(self, dev):
         """
         Parse almanac data to devices
@@ -1404,9 +2637,10 @@ class Plugin(indigo.PluginBase):
             weather_data         = self.masterWeatherDict[location]
 
             airport_code              = self.nestedLookup(weather_data, keys=('almanac', 'airport_code'))
-            current_observation       = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-            current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-            station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id'))
+            observation               = self.locationObservation(location)
+            current_observation       = observation['time']
+            current_observation_epoch = observation['epoch']
+            station_id                = observation['station_id']
 
             no_ui_format = {'tempHighRecordYear': self.nestedLookup(weather_data, keys=('almanac', 'temp_high', 'recordyear')),
                             'tempLowRecordYear':  self.nestedLookup(weather_data, keys=('almanac', 'temp_low', 'recordyear'))
@@ -1427,30 +2661,31 @@ class Plugin(indigo.PluginBase):
             almanac_states_list.append({'key': 'currentObservationEpoch', 'value': current_observation_epoch, 'uiValue': current_observation_epoch})
 
             # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(int(current_observation_epoch)))
+            current_observation_24hr = observation['time24']
             almanac_states_list.append({'key': 'currentObservation24hr', 'value': current_observation_24hr, 'uiValue': current_observation_24hr})
 
-            for key, value in no_ui_format.iteritems():
-                value, ui_value = self.fixCorruptedData(state_name=key, val=value)  # fixCorruptedData() returns float, unicode string
+            sanitized = self.fixCorruptedDataBatch(plan=dict(no_ui_format, **ui_format_temp))  # returns {key: (float, unicode string)}
+
+            for key in no_ui_format:
+                value, ui_value = sanitized[key]
                 almanac_states_list.append({'key': key, 'value': int(value), 'uiValue': ui_value})
 
-            for key, value in ui_format_temp.iteritems():
-                value, ui_value = self.fixCorruptedData(state_name=key, val=value)
+            for key in ui_format_temp:
+                value, ui_value = sanitized[key]
                 ui_value = self.uiFormatTemperature(dev=dev, state_name=key, val=ui_value)  # uiFormatTemperature() returns unicode string
                 almanac_states_list.append({'key': key, 'value': value, 'uiValue': ui_value})
 
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
+            self.updateDeviceAddress(dev, station_id)
             almanac_states_list.append({'key': 'onOffState', 'value': True, 'uiValue': u" "})
-            dev.updateStatesOnServer(almanac_states_list)
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
+            self.updateDeviceStates(dev, almanac_states_list)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOn)
 
         except (KeyError, ValueError):
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Problem parsing almanac data.")
-            dev.updateStateOnServer('onOffState', value=False, uiValue=u" ")
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+            self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)  # Parse again next cycle.
+            self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u" "}])
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
 
     def parseAlertsData(self, dev):
         """
@@ -1459,6 +2694,15 @@ class Plugin(indigo.PluginBase):
         The parseAlertsData() method takes weather alert data and parses it to device
         states.
 
+        Alerts come from the location's alert store (see storeAlerts), so alerts that
+        have expired since the last download are left out.
+
+        Each alert is fingerprinted by its type, description, expiry and a hash of
+        its message. The fingerprints are kept between cycles, and only alerts that
+        are new (or have changed) are logged and have their attributions cleaned
+        up. Alerts that have expired are noted in the log. Severe Weather Alert
+        triggers are only fired when there are new alerts (see triggerProcessing.)
+
         -----
 
         :param indigo.Device dev:
@@ -1469,111 +2713,146 @@ class Plugin(indigo.PluginBase):
 
         alerts_suppressed = dev.pluginProps.get('suppressWeatherAlerts', False)
         location          = dev.pluginProps['location']
-        weather_data      = self.masterWeatherDict[location]
+        weather_data      = self.masterWeatherDict.get(location, {})  # Not there if alerts expire during an outage
+        device_dict       = self.masterDeviceDict.setdefault(dev.id, {})
 
         alert_logging    = self.pluginPrefs.get('alertLogging', True)
         no_alert_logging = self.pluginPrefs.get('noAlertLogging', False)
 
-        alerts_data   = self.nestedLookup(weather_data, keys=('alerts',))
-        location_city = self.nestedLookup(weather_data, keys=('location', 'city'))
-
-        current_observation       = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-        current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
+        alerts_data   = self.activeAlerts(location)
+        location_city = self.nestedLookup(weather_data, keys=('location', 'city')) if weather_data else location
 
         try:
+            observation               = self.locationObservation(location)
+            current_observation       = observation['time']
+            current_observation_epoch = observation['epoch']
+
             alerts_states_list.append({'key': 'currentObservation', 'value': current_observation, 'uiValue': current_observation})
             alerts_states_list.append({'key': 'currentObservationEpoch', 'value': current_observation_epoch, 'uiValue': current_observation_epoch})
 
             # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(int(current_observation_epoch)))
+            current_observation_24hr = observation['time24']
             alerts_states_list.append({'key': 'currentObservation24hr', 'value': current_observation_24hr})
 
-            # Alerts: This segment iterates through all available alert information. It retains only the first five alerts. We set all alerts to an empty string each time, and then
-            # repopulate (this clears out alerts that may have expired.) If there are no alerts, set alert status to false.
+            # Alerts: This segment iterates through all available alert information. It retains only the first five alerts. Slots without an alert are set to an
+            # empty string (this clears out alerts that may have expired.) If there are no alerts, set alert status to false.
+            previous_fingerprints = device_dict.get('alertFingerprints')
+            alert_array           = []
+            fingerprints          = []
+            new_alerts            = []
 
-            # Reset alert states (1-5).
-            for alert_counter in range(1, 6):
-                alerts_states_list.append({'key': 'alertDescription{0}'.format(alert_counter), 'value': u" ", 'uiValue': u" "})
-                alerts_states_list.append({'key': 'alertExpires{0}'.format(alert_counter), 'value': u" ", 'uiValue': u" "})
-                alerts_states_list.append({'key': 'alertMessage{0}'.format(alert_counter), 'value': u" ", 'uiValue': u" "})
-                alerts_states_list.append({'key': 'alertType{0}'.format(alert_counter), 'value': u" ", 'uiValue': u" "})
+            for item in alerts_data or []:
 
-            # If there are no alerts (the list is empty):
-            if not alerts_data:
-                alerts_states_list.append({'key': 'alertStatus', 'value': "false", 'uiValue': u"False"})
+                # Strip whitespace from the ends.
+                alert_text = u"{0}".format(item['message'].strip())
 
-                if alert_logging and not no_alert_logging and not alerts_suppressed:
-                    self.logger.info(u"There are no severe weather alerts for the {0} location.".format(location_city))
+                # Create a tuple of each alert within the master dict and add it to the array. alert_tuple = (type, description, alert text, expires)
+                alert_tuple = (u"{0}".format(item['type']),
+                               u"{0}".format(item['description']),
+                               u"{0}".format(alert_text),
+                               u"{0}".format(item['expires'])
+                               )
 
-            # If there is at least one alert (the list is not empty):
-            else:
-                alert_array = []
-                alerts_states_list.append({'key': 'alertStatus', 'value': "true", 'uiValue': u"True"})
-
-                for item in alerts_data:
+                alert_array.append(alert_tuple)
 
-                    # Strip whitespace from the ends.
-                    alert_text = u"{0}".format(item['message'].strip())
+                fingerprint = (alert_tuple[0], alert_tuple[1], alert_tuple[3], hashlib.md5(alert_text.encode('utf-8')).hexdigest())
+                fingerprints.append(fingerprint)
 
-                    # Create a tuple of each alert within the master dict and add it to the array. alert_tuple = (type, description, alert text, expires)
-                    alert_tuple = (u"{0}".format(item['type']),
-                                   u"{0}".format(item['description']),
-                                   u"{0}".format(alert_text),
-                                   u"{0}".format(item['expires'])
-                                   )
+                if previous_fingerprints is not None and fingerprint in previous_fingerprints:
+                    continue
 
-                    alert_array.append(alert_tuple)
+                new_alerts.append(alert_tuple)
 
-                    # Per Weather Underground TOS, attribution must be provided for European weather alert source. If appropriate, write it to the log.
+                # Per Weather Underground TOS, attribution must be provided for European weather alert source. If appropriate, write it to the log.
+                if 'attribution' in item:
                     try:
+                        import cgi  # Only European alerts carry an attribution
+
                         # Attempt to clean out HTML tags.
-                        tag_re      = re.compile(r'(<!--.*?-->|<[^>]*>)')
-                        no_tags     = tag_re.sub('', item['attribution'])  # Remove well-formed tags
+                        no_tags     = kAlertTagPattern.sub('', item['attribution'])  # Remove well-formed tags
                         clean       = cgi.escape(no_tags)  # Clean up anything else by escaping
                         attribution = u"European weather alert {0}".format(clean)
 
-                    except (KeyError, Exception):
+                    except Exception:
                         self.Fogbert.pluginErrorHandler(traceback.format_exc())
                         attribution = u""
 
-                if len(alert_array) == 1:
-                    # If user has enabled alert logging, write alert message to the Indigo log.
-                    if alert_logging and not alerts_suppressed:
-                        self.logger.info(u"There is 1 severe weather alert for the {0} location:".format(location_city))
-                else:
-                    # If user has enabled alert logging, write alert message to the Indigo log.
-                    if alert_logging and not alerts_suppressed:
-                        self.logger.info(u"There are {0} severe weather alerts for the {1} location:".format(len(alert_array), u"{0}".format(location_city)))
+            expired_count = len(set(previous_fingerprints or ()) - set(fingerprints))
+
+            for alert_counter in range(1, 6):
+                try:
+                    alert = alert_array[alert_counter - 1]
+                    alerts_states_list.append({'key': u"alertType{0}".format(alert_counter), 'value': u"{0}".format(alert[0])})
+                    alerts_states_list.append({'key': u"alertDescription{0}".format(alert_counter), 'value': u"{0}".format(alert[1])})
+                    alerts_states_list.append({'key': u"alertMessage{0}".format(alert_counter), 'value': u"{0}".format(alert[2])})
+                    alerts_states_list.append({'key': u"alertExpires{0}".format(alert_counter), 'value': u"{0}".format(alert[3])})
+
+                except IndexError:
+                    alerts_states_list.append({'key': 'alertDescription{0}'.format(alert_counter), 'value': u" ", 'uiValue': u" "})
+                    alerts_states_list.append({'key': 'alertExpires{0}'.format(alert_counter), 'value': u" ", 'uiValue': u" "})
+                    alerts_states_list.append({'key': 'alertMessage{0}'.format(alert_counter), 'value': u" ", 'uiValue': u" "})
+                    alerts_states_list.append({'key': 'alertType{0}'.format(alert_counter), 'value': u" ", 'uiValue': u" "})
+
+            # If there are no alerts (the list is empty):
+            if not alert_array:
+                alerts_states_list.append({'key': 'alertStatus', 'value': "false", 'uiValue': u"False"})
+
+                # Only when the alerts have cleared (or the device has just started.)
+                if previous_fingerprints != [] and alert_logging and not no_alert_logging and not alerts_suppressed:
+                    self.logger.info(u"There are no severe weather alerts for the {0} location.".format(location_city))
+
+            # If there is at least one alert (the list is not empty):
+            else:
+                alerts_states_list.append({'key': 'alertStatus', 'value': "true", 'uiValue': u"True"})
+
+                if new_alerts:
+                    if len(alert_array) == 1:
+                        # If user has enabled alert logging, write alert message to the Indigo log.
+                        if alert_logging and not alerts_suppressed:
+                            self.logger.info(u"There is 1 severe weather alert for the {0} location:".format(location_city))
+                    else:
+                        # If user has enabled alert logging, write alert message to the Indigo log.
+                        if alert_logging and not alerts_suppressed:
+                            self.logger.info(u"There are {0} severe weather alerts for the {1} location ({2} new):".format(len(alert_array), u"{0}".format(location_city), len(new_alerts)))
 
-                    # If user has enabled alert logging, write alert message to the Indigo log.
-                    if alert_logging and not alerts_suppressed and len(alert_array) > 4:
-                        self.logger.info(u"The plugin only retains information for the first 5 alerts.")
+                        # If user has enabled alert logging, write alert message to the Indigo log.
+                        if alert_logging and not alerts_suppressed and len(alert_array) > 4:
+                            self.logger.info(u"The plugin only retains information for the first 5 alerts.")
 
-                # Debug output can contain sensitive data.
-                self.logger.debug(u"{0}".format(alert_array))
+                    # Debug output can contain sensitive data.
+                    self.logger.debug(u"{0}".format(new_alerts))
 
-                alert_counter = 1
-                for alert in range(len(alert_array)):
-                    if alert_counter < 6:
-                        alerts_states_list.append({'key': u"alertType{0}".format(alert_counter), 'value': u"{0}".format(alert_array[alert][0])})
-                        alerts_states_list.append({'key': u"alertDescription{0}".format(alert_counter), 'value': u"{0}".format(alert_array[alert][1])})
-                        alerts_states_list.append({'key': u"alertMessage{0}".format(alert_counter), 'value': u"{0}".format(alert_array[alert][2])})
-                        alerts_states_list.append({'key': u"alertExpires{0}".format(alert_counter), 'value': u"{0}".format(alert_array[alert][3])})
-                        alert_counter += 1
+                    for alert in new_alerts:
+                        if alert_logging and not alerts_suppressed:
+                            self.logger.info(u"\n{0}".format(alert[2]))
 
-                    if alert_logging and not alerts_suppressed:
-                        self.logger.info(u"\n{0}".format(alert_array[alert][2]))
+            if expired_count and alert_array and alert_logging and not alerts_suppressed:
+                self.logger.info(u"{0} severe weather alert(s) for the {1} location expired.".format(expired_count, location_city))
 
             if attribution != u"":
                 self.logger.info(attribution)
 
-            dev.updateStatesOnServer(alerts_states_list)
+            self.updateDeviceStates(dev, alerts_states_list)
+
+            # Recorded once the states have been written. New alerts can fire triggers.
+            device_dict['alertFingerprints'] = fingerprints
+
+            if new_alerts:
+                device_dict['newAlerts'] = len(new_alerts)
+
+                with self.write_lock:
+                    delta = self.pendingDelta(dev)
+
+                    if delta is not None:
+                        delta.setdefault('alerts', []).extend({'type': alert[0], 'description': alert[1], 'message': alert[2], 'expires': alert[3]}
+                                                              for alert in new_alerts)
 
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Problem parsing weather alert data:")
+            self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)  # Parse again next cycle.
             alerts_states_list.append({'key': 'onOffState', 'value': False, 'uiValue': u" "})
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
 
     def parseAstronomyData(self, dev):
         """
@@ -1611,10 +2890,7 @@ class Plugin(indigo.PluginBase):
 
         weather_data = self.masterWeatherDict[location]
 
-        current_observation       = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-        current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-        percent_illuminated       = self.nestedLookup(weather_data, keys=('moon_phase', 'percentIlluminated'))
-        station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id'))
+        percent_illuminated = self.nestedLookup(weather_data, keys=('moon_phase', 'percentIlluminated'))
 
         astronomy_dict = {'ageOfMoon':              self.nestedLookup(weather_data, keys=('moon_phase', 'ageOfMoon')),
                           'currentTimeHour':        self.nestedLookup(weather_data, keys=('moon_phase', 'current_time', 'hour')),
@@ -1632,11 +2908,16 @@ class Plugin(indigo.PluginBase):
                           }
 
         try:
+            observation               = self.locationObservation(location)
+            current_observation       = observation['time']
+            current_observation_epoch = observation['epoch']
+            station_id                = observation['station_id']
+
             astronomy_states_list.append({'key': 'currentObservation', 'value': current_observation, 'uiValue': current_observation})
             astronomy_states_list.append({'key': 'currentObservationEpoch', 'value': current_observation_epoch, 'uiValue': current_observation_epoch})
 
             # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(int(current_observation_epoch)))
+            current_observation_24hr = observation['time24']
             astronomy_states_list.append({'key': 'currentObservation24hr', 'value': current_observation_24hr, 'uiValue': current_observation_24hr})
 
             for key, value in astronomy_dict.iteritems():
@@ -1673,232 +2954,202 @@ class Plugin(indigo.PluginBase):
             sunset_epoch = int(time.mktime(sunset.timetuple()))
             astronomy_states_list.append({'key': 'sunsetEpoch', 'value': sunset_epoch})
 
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
+            self.updateDeviceAddress(dev, station_id)
             astronomy_states_list.append({'key': 'onOffState', 'value': True, 'uiValue': u" "})
-            dev.updateStatesOnServer(astronomy_states_list)
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
+            self.updateDeviceStates(dev, astronomy_states_list)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOn)
 
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Problem parsing astronomy data.")
-            dev.updateStateOnServer('onOffState', value=False, uiValue=u" ")
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+            self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)  # Parse again next cycle.
+            self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u" "}])
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
 
-    def parseForecastData(self, dev):
+    def parseDeviceData(self, dev, rerender=False):
         """
-        Parse forecast data to devices
+        Parse weather data to a device if its source data have changed
 
-        The parseForecastData() method takes weather forecast data and parses it to
-        device states. (Note that this is only for the weather device and not for the
-        hourly or 10 day forecast devices which have their own methods.) Note that we
-        round most of the values because some PWSs report decimal precision (even
-        though that doesn't make sense since it's unlikely that a site would forecast
-        with that level of precision.
+        The parseDeviceData() method sends the location's weather data to the parsers
+        for the device's model. Before parsing, the hashes of the features the device
+        uses (see payloadHashes()) are compared with the hashes recorded at the
+        device's last successful parse. If none have changed, parsing and state
+        writes are skipped. Parsers discard the recorded hashes when they fail so that
+        the device is parsed again next cycle. Returns True if the device was parsed.
+
+        When re-rendering (see renderCachedData()) the device is always parsed, but
+        alerts are left alone; they aren't affected by display settings and parsing
+        them logs them again.
 
         -----
 
         :param indigo.Device dev:
+        :param bool rerender: True to parse the cached data again with new settings
         """
 
-        forecast_states_list = []
-        config_menu_units    = dev.pluginProps.get('configMenuUnits', '')
-        location             = dev.pluginProps['location']
-        wind_units           = dev.pluginProps.get('windUnits', '')
-
-        weather_data = self.masterWeatherDict[location]
-
-        forecast_data_text   = self.nestedLookup(weather_data, keys=('forecast', 'txt_forecast', 'forecastday'))
-        forecast_data_simple = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday'))
-
-        try:
-            # Metric:
-            if config_menu_units in ['M', 'MS']:
-
-                fore_counter = 1
-                for day in forecast_data_text:
-
-                    if fore_counter <= 8:
-                        fore_text = self.nestedLookup(day, keys=('fcttext_metric',)).lstrip('\n')
-                        icon      = self.nestedLookup(day, keys=('icon',))
-                        title     = self.nestedLookup(day, keys=('title',))
-
-                        forecast_states_list.append({'key': u"foreText{0}".format(fore_counter), 'value': fore_text, 'uiValue': fore_text})
-                        forecast_states_list.append({'key': u"icon{0}".format(fore_counter), 'value': icon, 'uiValue': icon})
-                        forecast_states_list.append({'key': u"foreTitle{0}".format(fore_counter), 'value': title, 'uiValue': title})
-                        fore_counter += 1
-
-                fore_counter = 1
-                for day in forecast_data_simple:
-
-                    if fore_counter <= 4:
-                        average_wind = self.nestedLookup(day, keys=('avewind', 'kph'))
-                        conditions   = self.nestedLookup(day, keys=('conditions',))
-                        fore_day     = self.nestedLookup(day, keys=('date', 'weekday'))
-                        fore_high    = self.nestedLookup(day, keys=('high', 'celsius'))
-                        fore_low     = self.nestedLookup(day, keys=('low', 'celsius'))
-                        icon         = self.nestedLookup(day, keys=('icon',))
-                        max_humidity = self.nestedLookup(day, keys=('maxhumidity',))
-                        pop          = self.nestedLookup(day, keys=('pop',))
-
-                        # Wind in KPH or MPS?
-                        value, ui_value = self.fixCorruptedData(state_name="foreWind{0}".format(fore_counter), val=average_wind)  # fixCorruptedData() returns float, unicode string
-                        if config_menu_units == 'MS':
-                            value = value / 3.6
-                            ui_value = self.uiFormatWind(dev=dev, state_name="foreWind{0}".format(fore_counter), val=value)
-                            forecast_states_list.append({'key': u"foreWind{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
-
-                        else:
-                            ui_value = self.uiFormatWind(dev=dev, state_name="foreWind{0}".format(fore_counter), val=ui_value)
-                            forecast_states_list.append({'key': u"foreWind{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
-
-                        forecast_states_list.append({'key': u"conditions{0}".format(fore_counter), 'value': conditions, 'uiValue': conditions})
-                        forecast_states_list.append({'key': u"foreDay{0}".format(fore_counter), 'value': fore_day, 'uiValue': fore_day})
-
-                        value, ui_value = self.fixCorruptedData(state_name="foreHigh{0}".format(fore_counter), val=fore_high)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="foreHigh{0}".format(fore_counter), val=ui_value)  # uiFormatTemperature() returns unicode string
-                        forecast_states_list.append({'key': u"foreHigh{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
-
-                        value, ui_value = self.fixCorruptedData(state_name="foreLow{0}".format(fore_counter), val=fore_low)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="foreLow{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"foreLow{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
-
-                        value, ui_value = self.fixCorruptedData(state_name="foreHum{0}".format(fore_counter), val=max_humidity)
-                        ui_value = self.uiFormatPercentage(dev=dev, state_name="foreHum{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"foreHum{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+        # Almanac devices.
+        if dev.model in ['Almanac', 'WUnderground Almanac']:
+            parsers  = (self.parseAlmanacData,)
+            features = ('almanac', 'current_observation')
 
-                        forecast_states_list.append({'key': u"foreIcon{0}".format(fore_counter), 'value': icon, 'uiValue': icon})
+        # Astronomy devices.
+        elif dev.model in ['Astronomy', 'WUnderground Astronomy']:
+            parsers  = (self.parseAstronomyData,)
+            features = ('current_observation', 'moon_phase', 'sun_phase')
 
-                        value, ui_value = self.fixCorruptedData(state_name="forePop{0}".format(fore_counter), val=pop)
-                        ui_value = self.uiFormatPercentage(dev=dev, state_name="forePop{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"forePop{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+        # Hourly Forecast devices.
+        elif dev.model in ['WUnderground Hourly Forecast', 'Hourly Forecast']:
+            parsers  = (self.parseHourlyData,)
+            features = ('current_observation', 'hourly_forecast')
 
-                        fore_counter += 1
+        # Ten Day Forecast devices.
+        elif dev.model in ['Ten Day Forecast', 'WUnderground Ten Day Forecast']:
+            parsers  = (self.parseTenDayData,)
+            features = ('current_observation', 'forecast')
 
-            # Mixed:
-            elif config_menu_units == 'I':
+        # Tide devices.
+        elif dev.model in ['WUnderground Tides', 'Tides']:
+            parsers  = (self.parseTidesData,)
+            features = ('current_observation', 'tide')
 
-                fore_counter = 1
-                for day in forecast_data_text:
+        # Weather devices.
+        elif dev.model in ['WUnderground Device', 'WUnderground Weather', 'WUnderground Weather Device', 'Weather Underground', 'Weather']:
+            parsers  = (self.parseWeatherData, self.parseAlertsData, self.parseForecastData)
+            features = ('alerts', 'almanac', 'current_observation', 'forecast', 'history', 'location')
 
-                    if fore_counter <= 8:
-                        fore_text = self.nestedLookup(day, keys=('fcttext_metric',)).lstrip('\n')
-                        icon      = self.nestedLookup(day, keys=('icon',))
-                        title     = self.nestedLookup(day, keys=('title',))
-
-                        forecast_states_list.append({'key': u"foreText{0}".format(fore_counter), 'value': fore_text, 'uiValue': fore_text})
-                        forecast_states_list.append({'key': u"icon{0}".format(fore_counter), 'value': icon, 'uiValue': icon})
-                        forecast_states_list.append({'key': u"foreTitle{0}".format(fore_counter), 'value': title, 'uiValue': title})
-                        fore_counter += 1
+        else:
+            return False
 
-                fore_counter = 1
-                for day in forecast_data_simple:
+        if rerender:
+            parsers = tuple(parser for parser in parsers if parser != self.parseAlertsData)
 
-                    if fore_counter <= 4:
+        location = dev.pluginProps['location']
+        hashes   = self.masterLocationDict.get(location, {}).get('hashes', {})
+        feature_hashes = tuple(hashes.get(feature) for feature in features)
 
-                        average_wind = self.nestedLookup(day, keys=('avewind', 'mph'))
-                        conditions   = self.nestedLookup(day, keys=('conditions',))
-                        fore_day     = self.nestedLookup(day, keys=('date', 'weekday'))
-                        fore_high    = self.nestedLookup(day, keys=('high', 'celsius'))
-                        fore_low     = self.nestedLookup(day, keys=('low', 'celsius'))
-                        icon         = self.nestedLookup(day, keys=('icon',))
-                        max_humidity = self.nestedLookup(day, keys=('maxhumidity',))
-                        pop          = self.nestedLookup(day, keys=('pop',))
+        device_dict = self.masterDeviceDict.setdefault(dev.id, {})
 
-                        value, ui_value = self.fixCorruptedData(state_name="foreWind{0}".format(fore_counter), val=average_wind)
-                        ui_value = self.uiFormatWind(dev=dev, state_name="foreWind{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"foreWind{0}".format(fore_counter), 'value': round(value), 'uiValue': u"{0}".format(ui_value, wind_units)})
+        if not rerender and hashes and device_dict.get('featureHashes') == feature_hashes:
+            self.logger.debug(u"{0}: source data unchanged. Skipping.".format(dev.name))
+            return False
 
-                        forecast_states_list.append({'key': u"conditions{0}".format(fore_counter), 'value': conditions, 'uiValue': conditions})
-                        forecast_states_list.append({'key': u"foreDay{0}".format(fore_counter), 'value': fore_day, 'uiValue': fore_day})
+        # Recorded before parsing; the parsers remove it if they fail.
+        device_dict['featureHashes'] = feature_hashes
 
-                        value, ui_value = self.fixCorruptedData(state_name="foreHigh{0}".format(fore_counter), val=fore_high)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="foreHigh{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"foreHigh{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+        for parser in parsers:
+            parser(dev)
 
-                        value, ui_value = self.fixCorruptedData(state_name="foreLow{0}".format(fore_counter), val=fore_low)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="foreLow{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"foreLow{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+        return True
 
-                        value, ui_value = self.fixCorruptedData(state_name="foreHum{0}".format(fore_counter), val=max_humidity)
-                        ui_value = self.uiFormatPercentage(dev=dev, state_name="foreHum{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"foreHum{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+    def parseForecastData(self, dev):
+        """
+        Parse forecast data to devices
 
-                        forecast_states_list.append({'key': u"foreIcon{0}".format(fore_counter), 'value': icon, 'uiValue': icon})
+        The parseForecastData() method takes weather forecast data and parses it to
+        device states. (Note that this is only for the weather device and not for the
+        hourly or 10 day forecast devices which have their own methods.) Note that we
+        round most of the values because some PWSs report decimal precision (even
+        though that doesn't make sense since it's unlikely that a site would forecast
+        with that level of precision.
 
-                        value, ui_value = self.fixCorruptedData(state_name="forePop{0}".format(fore_counter), val=pop)
-                        ui_value = self.uiFormatPercentage(dev=dev, state_name="forePop{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"forePop{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+        -----
 
-                        fore_counter += 1
+        :param indigo.Device dev:
+        """
 
-            # Standard:
-            else:
+        forecast_states_list = []
+        config_menu_units    = dev.pluginProps.get('configMenuUnits', '')
+        location             = dev.pluginProps['location']
+        unit_system          = kUnitSystems.get(config_menu_units, kUnitSystems['S'])
 
-                fore_counter = 1
-                for day in forecast_data_text:
+        weather_data = self.masterWeatherDict[location]
 
-                    if fore_counter <= 8:
-                        fore_text = self.nestedLookup(day, keys=('fcttext',)).lstrip('\n')
-                        icon      = self.nestedLookup(day, keys=('icon',))
-                        title     = self.nestedLookup(day, keys=('title',))
+        forecast_data_text   = self.nestedLookup(weather_data, keys=('forecast', 'txt_forecast', 'forecastday'))
+        forecast_data_simple = self.nestedLookup(weather_data, keys=('forecast', 'simpleforecast', 'forecastday'))
 
-                        forecast_states_list.append({'key': u"foreText{0}".format(fore_counter), 'value': fore_text, 'uiValue': fore_text})
-                        forecast_states_list.append({'key': u"icon{0}".format(fore_counter), 'value': icon, 'uiValue': icon})
-                        forecast_states_list.append({'key': u"foreTitle{0}".format(fore_counter), 'value': title, 'uiValue': title})
-                        fore_counter += 1
+        # Forecast text is only offered in metric or standard wording.
+        text_key = 'fcttext' if unit_system['temperature'] == 'F' else 'fcttext_metric'
 
-                fore_counter = 1
-                for day in forecast_data_simple:
+        try:
+            fore_counter = 1
+            for day in forecast_data_text:
 
-                    if fore_counter <= 4:
-                        average_wind = self.nestedLookup(day, keys=('avewind', 'mph'))
-                        conditions   = self.nestedLookup(day, keys=('conditions',))
-                        fore_day     = self.nestedLookup(day, keys=('date', 'weekday'))
-                        fore_high    = self.nestedLookup(day, keys=('high', 'fahrenheit'))
-                        fore_low     = self.nestedLookup(day, keys=('low', 'fahrenheit'))
-                        max_humidity = self.nestedLookup(day, keys=('maxhumidity',))
-                        icon         = self.nestedLookup(day, keys=('icon',))
-                        pop          = self.nestedLookup(day, keys=('pop',))
+                if fore_counter <= 8:
+                    fore_text = self.nestedLookup(day, keys=(text_key,)).lstrip('\n')
+                    icon      = self.nestedLookup(day, keys=('icon',))
+                    title     = self.nestedLookup(day, keys=('title',))
 
-                        value, ui_value = self.fixCorruptedData(state_name="foreWind{0}".format(fore_counter), val=average_wind)
-                        ui_value = self.uiFormatWind(dev=dev, state_name="foreWind{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"foreWind{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+                    forecast_states_list.append({'key': u"foreText{0}".format(fore_counter), 'value': fore_text, 'uiValue': fore_text})
+                    forecast_states_list.append({'key': u"icon{0}".format(fore_counter), 'value': icon, 'uiValue': icon})
+                    forecast_states_list.append({'key': u"foreTitle{0}".format(fore_counter), 'value': title, 'uiValue': title})
+                    fore_counter += 1
 
-                        forecast_states_list.append({'key': u"conditions{0}".format(fore_counter), 'value': conditions, 'uiValue': conditions})
-                        forecast_states_list.append({'key': u"foreDay{0}".format(fore_counter), 'value': fore_day, 'uiValue': fore_day})
+            # Collect the raw values for each forecast day, then sanitize and convert every numeric value in one pass.
+            forecast_plan = []
+            numeric_plan  = {}
+            english_plan  = {}
+            quantities    = {}
 
-                        value, ui_value = self.fixCorruptedData(state_name="foreHigh{0}".format(fore_counter), val=fore_high)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="foreHigh{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"foreHigh{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+            fore_counter = 1
+            for day in forecast_data_simple:
+
+                if fore_counter <= 4:
+                    forecast_plan.append((fore_counter, {'conditions': self.nestedLookup(day, keys=('conditions',)),
+                                                         'fore_day':   self.nestedLookup(day, keys=('date', 'weekday')),
+                                                         'icon':       self.nestedLookup(day, keys=('icon',)),
+                                                         }))
+
+                    numeric_plan[u"foreWind{0}".format(fore_counter)] = self.nestedLookup(day, keys=('avewind', 'kph'))
+                    numeric_plan[u"foreHigh{0}".format(fore_counter)] = self.nestedLookup(day, keys=('high', 'celsius'))
+                    numeric_plan[u"foreLow{0}".format(fore_counter)]  = self.nestedLookup(day, keys=('low', 'celsius'))
+                    numeric_plan[u"foreHum{0}".format(fore_counter)]  = self.nestedLookup(day, keys=('maxhumidity',))
+                    numeric_plan[u"forePop{0}".format(fore_counter)]  = self.nestedLookup(day, keys=('pop',))
+
+                    english_plan[u"foreWind{0}".format(fore_counter)] = self.nestedLookup(day, keys=('avewind', 'mph'))
+                    english_plan[u"foreHigh{0}".format(fore_counter)] = self.nestedLookup(day, keys=('high', 'fahrenheit'))
+                    english_plan[u"foreLow{0}".format(fore_counter)]  = self.nestedLookup(day, keys=('low', 'fahrenheit'))
+
+                    quantities[u"foreWind{0}".format(fore_counter)] = 'wind'
+                    quantities[u"foreHigh{0}".format(fore_counter)] = 'temperature'
+                    quantities[u"foreLow{0}".format(fore_counter)]  = 'temperature'
+                    fore_counter += 1
 
-                        value, ui_value = self.fixCorruptedData(state_name="foreLow{0}".format(fore_counter), val=fore_low)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="foreLow{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"foreLow{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+            sanitized = self.convertUnits(sanitized=self.fixCorruptedDataBatch(plan=numeric_plan),
+                                          quantities=quantities,
+                                          units=config_menu_units,
+                                          english=self.fixCorruptedDataBatch(plan=english_plan))
 
-                        value, ui_value = self.fixCorruptedData(state_name="foreHum{0}".format(fore_counter), val=max_humidity)
-                        ui_value = self.uiFormatPercentage(dev=dev, state_name="foreHum{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"foreHum{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+            formatters = ((u"foreWind", self.uiFormatWind),
+                          (u"foreHigh", self.uiFormatTemperature),
+                          (u"foreLow", self.uiFormatTemperature),
+                          (u"foreHum", self.uiFormatPercentage),
+                          (u"forePop", self.uiFormatPercentage),
+                          )
 
-                        forecast_states_list.append({'key': u"foreIcon{0}".format(fore_counter), 'value': icon, 'uiValue': icon})
+            for fore_counter, day in forecast_plan:
 
-                        value, ui_value = self.fixCorruptedData(state_name="forePop{0}".format(fore_counter), val=pop)
-                        ui_value = self.uiFormatPercentage(dev=dev, state_name="forePop{0}".format(fore_counter), val=ui_value)
-                        forecast_states_list.append({'key': u"forePop{0}".format(fore_counter), 'value': round(value), 'uiValue': ui_value})
+                forecast_states_list.append({'key': u"conditions{0}".format(fore_counter), 'value': day['conditions'], 'uiValue': day['conditions']})
+                forecast_states_list.append({'key': u"foreDay{0}".format(fore_counter), 'value': day['fore_day'], 'uiValue': day['fore_day']})
+                forecast_states_list.append({'key': u"foreIcon{0}".format(fore_counter), 'value': day['icon'], 'uiValue': day['icon']})
 
-                        fore_counter += 1
+                # We round these values because some PWSs report decimal precision.
+                for state_prefix, formatter in formatters:
+                    state_name = u"{0}{1}".format(state_prefix, fore_counter)
+                    value, ui_value = sanitized[state_name]  # float, unicode string
+                    ui_value = formatter(dev=dev, state_name=state_name, val=ui_value)
+                    forecast_states_list.append({'key': state_name, 'value': round(value), 'uiValue': ui_value})
 
         except (KeyError, Exception):
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Problem parsing weather forecast data.")
+            self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)  # Parse again next cycle.
 
         # Determine how today's forecast compares to yesterday.
         try:
             diff_text = u""
 
             try:
-                difference = float(dev.states['foreHigh1']) - float(dev.states['historyHigh'])
+                difference = float(self.latestDeviceState(dev, 'foreHigh1')) - float(self.latestDeviceState(dev, 'historyHigh'))
 
             except ValueError:
                 difference = -99
@@ -1929,16 +3180,17 @@ class Plugin(indigo.PluginBase):
             else:
                 forecast_states_list.append({'key': 'foreTextLong', 'value': u"Unable to compare today's forecast with yesterday's high temperature."})
 
-            dev.updateStatesOnServer(forecast_states_list)
+            self.updateDeviceStates(dev, forecast_states_list)
 
         except (KeyError, Exception):
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Problem comparing forecast and history data.")
+            self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)  # Parse again next cycle.
 
             for state in ['foreTextShort', 'foreTextLong']:
                 forecast_states_list.append({'key': state, 'value': u"Unknown", 'uiValue': u"Unknown"})
 
-            dev.updateStatesOnServer(forecast_states_list)
+            self.updateDeviceStates(dev, forecast_states_list)
 
     def parseHourlyData(self, dev):
         """
@@ -1954,151 +3206,190 @@ class Plugin(indigo.PluginBase):
 
         hourly_forecast_states_list = []
         config_menu_units           = dev.pluginProps.get('configMenuUnits', '')
+        horizon                     = self.forecastHorizon(dev)
         location                    = dev.pluginProps['location']
 
         weather_data  = self.masterWeatherDict[location]
         forecast_data = self.nestedLookup(weather_data, keys=('hourly_forecast',))
 
-        current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-        current_observation_time  = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-        station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id'))
-
         try:
+            observation               = self.locationObservation(location)
+            current_observation_epoch = observation['epoch']
+            current_observation_time  = observation['time']
+            station_id                = observation['station_id']
+
             hourly_forecast_states_list.append({'key': 'currentObservation', 'value': current_observation_time, 'uiValue': current_observation_time})
             hourly_forecast_states_list.append({'key': 'currentObservationEpoch', 'value': current_observation_epoch, 'uiValue': current_observation_epoch})
 
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(int(current_observation_epoch)))
+            current_observation_24hr = observation['time24']
             hourly_forecast_states_list.append({'key': 'currentObservation24hr', 'value': u"{0}".format(current_observation_24hr)})
 
+            # Hours rendered last cycle are kept by forecast epoch. Between polls most of the
+            # 24 hours are the same forecast hours shifted up one or more slots, so an hour
+            # is only rendered again if it is new or WU has changed it. Anything that
+            # changes how values are displayed starts the cache over.
+            render_context = (tuple(dev.pluginProps.get(prop, '') for prop in ('configMenuUnits', 'configWindDirUnits', 'percentageUnits', 'rainAmountUnits',
+                                                                                'rainUnits', 'snowAmountUnits', 'temperatureUnits', 'windUnits')),
+                              tuple(self.pluginPrefs.get(pref, '') for pref in ('uiHumidityDecimal', 'uiTempDecimal', 'uiWindDecimal')))
+
+            render_cache = self.masterDeviceDict.setdefault(dev.id, {}).get('hourlyRender', {})
+            cached_hours = render_cache.get('hours', {}) if render_cache.get('context') == render_context else {}
+
+            # Collect the raw values for each new or changed forecast hour, then sanitize
+            # every numeric value the device needs in one pass.
+            hourly_plan    = []
+            numeric_plan   = {}
+            english_plan   = {}
+            quantities     = {}
+            rendered_hours = {}
+            slots          = []
+
             fore_counter = 1
             for observation in forecast_data:
 
-                if fore_counter <= 24:
+                # Hours beyond the device's forecast horizon aren't used.
+                if fore_counter > horizon:
+                    break
 
-                    civil_time          = self.nestedLookup(observation, keys=('FCTTIME', 'civil'))
-                    condition           = self.nestedLookup(observation, keys=('condition',))
-                    day                 = self.nestedLookup(observation, keys=('FCTTIME', 'mday_padded'))
-                    fore_humidity       = self.nestedLookup(observation, keys=('humidity',))
-                    fore_pop            = self.nestedLookup(observation, keys=('pop',))
-                    fore_qpf_metric     = self.nestedLookup(observation, keys=('qpf', 'metric'))
-                    fore_qpf_standard   = self.nestedLookup(observation, keys=('qpf', 'english'))
-                    fore_snow_metric    = self.nestedLookup(observation, keys=('snow', 'metric'))
-                    fore_snow_standard  = self.nestedLookup(observation, keys=('snow', 'english'))
-                    fore_temp_metric    = self.nestedLookup(observation, keys=('temp', 'metric'))
-                    fore_temp_standard  = self.nestedLookup(observation, keys=('temp', 'english'))
-                    hour                = self.nestedLookup(observation, keys=('FCTTIME', 'hour_padded'))
-                    icon                = self.nestedLookup(observation, keys=('icon',))
-                    minute              = self.nestedLookup(observation, keys=('FCTTIME', 'min'))
-                    month               = self.nestedLookup(observation, keys=('FCTTIME', 'mon_padded'))
-                    wind_degrees        = self.nestedLookup(observation, keys=('wdir', 'degrees'))
-                    wind_dir            = self.nestedLookup(observation, keys=('wdir', 'dir'))
-                    wind_speed_metric   = self.nestedLookup(observation, keys=('wspd', 'metric'))
-                    wind_speed_standard = self.nestedLookup(observation, keys=('wspd', 'english'))
-                    year                = self.nestedLookup(observation, keys=('FCTTIME', 'year'))
-
-                    wind_speed_mps = "{0}".format(float(wind_speed_metric) * 0.277778)
+                if fore_counter <= 24:
 
                     # Add leading zero to counter value for device state names 1-9.
-                    if fore_counter < 10:
-                        fore_counter_text = u"0{0}".format(fore_counter)
-                    else:
-                        fore_counter_text = fore_counter
-
-                    # Values that are set regardless of unit setting:
-                    hourly_forecast_states_list.append({'key': u"h{0}_cond".format(fore_counter_text), 'value': condition, 'uiValue': condition})
-                    hourly_forecast_states_list.append({'key': u"h{0}_icon".format(fore_counter_text), 'value': icon, 'uiValue': icon})
-                    hourly_forecast_states_list.append({'key': u"h{0}_proper_icon".format(fore_counter_text), 'value': icon, 'uiValue': icon})
-                    hourly_forecast_states_list.append({'key': u"h{0}_time".format(fore_counter_text), 'value': civil_time, 'uiValue': civil_time})
-                    hourly_forecast_states_list.append({'key': u"h{0}_windDirLong".format(fore_counter_text),
-                                                        'value': self.verboseWindNames("h{0}_windDirLong".format(fore_counter_text), wind_dir)})
-                    hourly_forecast_states_list.append({'key': u"h{0}_windDegrees".format(fore_counter_text), 'value': int(wind_degrees), 'uiValue': str(int(wind_degrees))})
-
-                    time_long = u"{0}-{1}-{2} {3}:{4}".format(year, month, day, hour, minute)
-                    hourly_forecast_states_list.append({'key': u"h{0}_timeLong".format(fore_counter_text), 'value': time_long, 'uiValue': time_long})
-
-                    value, ui_value = self.fixCorruptedData(state_name="h{0}_humidity".format(fore_counter_text), val=fore_humidity)
-                    ui_value = self.uiFormatPercentage(dev=dev, state_name="h{0}_humidity".format(fore_counter_text), val=ui_value)
-                    hourly_forecast_states_list.append({'key': u"h{0}_humidity".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-
-                    value, ui_value = self.fixCorruptedData(state_name="h{0}_precip".format(fore_counter_text), val=fore_pop)
-                    ui_value = self.uiFormatPercentage(dev=dev, state_name="h{0}_precip".format(fore_counter_text), val=ui_value)
-                    hourly_forecast_states_list.append({'key': u"h{0}_precip".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-
-                    # Metric temperature (°C)
-                    if config_menu_units in ("M", "MS", "I"):
-                        value, ui_value = self.fixCorruptedData(state_name="h{0}_temp".format(fore_counter_text), val=fore_temp_metric)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="h{0}_temp".format(fore_counter_text), val=ui_value)
-                        hourly_forecast_states_list.append({'key': u"h{0}_temp".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-
-                    # Standard temperature (°F):
-                    if config_menu_units == "S":
-                        value, ui_value = self.fixCorruptedData(state_name="h{0}_temp".format(fore_counter_text), val=fore_temp_standard)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="h{0}_temp".format(fore_counter_text), val=ui_value)
-                        hourly_forecast_states_list.append({'key': u"h{0}_temp".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-
-                    # KPH Wind:
-                    if config_menu_units == "M":
-
-                        value, ui_value = self.fixCorruptedData(state_name="h{0}_windSpeed".format(fore_counter_text), val=wind_speed_metric)
-                        ui_value = self.uiFormatWind(dev=dev, state_name="h{0}_windSpeed".format(fore_counter_text), val=ui_value)
-                        hourly_forecast_states_list.append({'key': u"h{0}_windSpeed".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-                        hourly_forecast_states_list.append({'key': u"h{0}_windSpeedIcon".format(fore_counter_text), 'value': "{0}".format(wind_speed_metric).replace('.', '')})
-
-                    # MPS Wind:
-                    if config_menu_units == "MS":
-
-                        value, ui_value = self.fixCorruptedData(state_name="h{0}_windSpeed".format(fore_counter_text), val=wind_speed_mps)
-                        ui_value = self.uiFormatWind(dev=dev, state_name="h{0}_windSpeed".format(fore_counter_text), val=ui_value)
-                        hourly_forecast_states_list.append({'key': u"h{0}_windSpeed".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-                        hourly_forecast_states_list.append({'key': u"h{0}_windSpeedIcon".format(fore_counter_text), 'value': u"{0}".format(wind_speed_mps).replace('.', '')})
-
-                    # Metric QPF and Snow:
-                    if config_menu_units in ("M", "MS"):
-                        value, ui_value = self.fixCorruptedData(state_name="h{0}_qpf".format(fore_counter_text), val=fore_qpf_metric)
-                        ui_value = self.uiFormatRain(dev=dev, state_name="h{0}_qpf".format(fore_counter_text), val=ui_value)
-                        hourly_forecast_states_list.append({'key': u"h{0}_qpf".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-
-                        value, ui_value = self.fixCorruptedData(state_name="h{0}_snow".format(fore_counter_text), val=fore_snow_metric)
-                        ui_value = self.uiFormatSnow(dev=dev, state_name="h{0}_snow".format(fore_counter_text), val=ui_value)
-                        hourly_forecast_states_list.append({'key': u"h{0}_snow".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-
-                    # Standard QPF, Snow and Wind:
-                    if config_menu_units in ("I", "S"):
-
-                        value, ui_value = self.fixCorruptedData(state_name="h{0}_qpf".format(fore_counter_text), val=fore_qpf_standard)
-                        ui_value = self.uiFormatRain(dev=dev, state_name="h{0}_qpf".format(fore_counter_text), val=ui_value)
-                        hourly_forecast_states_list.append({'key': u"h{0}_qpf".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-
-                        value, ui_value = self.fixCorruptedData(state_name="h{0}_snow".format(fore_counter_text), val=fore_snow_standard)
-                        ui_value = self.uiFormatSnow(dev=dev, state_name="h{0}_snow".format(fore_counter_text), val=ui_value)
-                        hourly_forecast_states_list.append({'key': u"h{0}_snow".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-
-                        value, ui_value = self.fixCorruptedData(state_name="h{0}_windSpeed".format(fore_counter_text), val=wind_speed_standard)
-                        ui_value = self.uiFormatWind(dev=dev, state_name="h{0}_windSpeed".format(fore_counter_text), val=ui_value)
-                        hourly_forecast_states_list.append({'key': u"h{0}_windSpeed".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-                        hourly_forecast_states_list.append({'key': u"h{0}_windSpeedIcon".format(fore_counter_text), 'value': u"{0}".format(wind_speed_standard).replace('.', '')})
-
-                    if dev.pluginProps.get('configWindDirUnits', '') == "DIR":
-                        hourly_forecast_states_list.append({'key': u"h{0}_windDir".format(fore_counter_text), 'value': wind_dir, 'uiValue': wind_dir})
+                    fore_counter_text = u"{0:02d}".format(fore_counter)
 
-                    else:
-                        hourly_forecast_states_list.append({'key': u"h{0}_windDir".format(fore_counter_text), 'value': wind_degrees, 'uiValue': wind_degrees})
+                    hour_key = u"{0}".format(self.nestedLookup(observation, keys=('FCTTIME', 'epoch')))
+                    if hour_key in [slot[1] for slot in slots]:
+                        hour_key = u"{0}/{1}".format(hour_key, fore_counter_text)
 
+                    slots.append((fore_counter_text, hour_key))
                     fore_counter += 1
 
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
+                    cached = cached_hours.get(hour_key)
+                    if cached and cached[0] == observation:
+                        rendered_hours[hour_key] = cached
+                        continue
+
+                    hour = {'civil_time':   self.nestedLookup(observation, keys=('FCTTIME', 'civil')),
+                            'condition':    self.nestedLookup(observation, keys=('condition',)),
+                            'day':          self.nestedLookup(observation, keys=('FCTTIME', 'mday_padded')),
+                            'hour':         self.nestedLookup(observation, keys=('FCTTIME', 'hour_padded')),
+                            'icon':         self.nestedLookup(observation, keys=('icon',)),
+                            'minute':       self.nestedLookup(observation, keys=('FCTTIME', 'min')),
+                            'month':        self.nestedLookup(observation, keys=('FCTTIME', 'mon_padded')),
+                            'wind_degrees': self.nestedLookup(observation, keys=('wdir', 'degrees')),
+                            'wind_dir':     self.nestedLookup(observation, keys=('wdir', 'dir')),
+                            'year':         self.nestedLookup(observation, keys=('FCTTIME', 'year')),
+                            }
+
+                    # Numeric values are taken in metric and converted below (english
+                    # targets use the english values.)
+                    numeric_fields = {'humidity': self.nestedLookup(observation, keys=('humidity',)),
+                                      'precip':   self.nestedLookup(observation, keys=('pop',)),
+                                      'qpf':      self.nestedLookup(observation, keys=('qpf', 'metric')),
+                                      'snow':     self.nestedLookup(observation, keys=('snow', 'metric')),
+                                      'temp':     self.nestedLookup(observation, keys=('temp', 'metric')),
+                                      'wind':     self.nestedLookup(observation, keys=('wspd', 'metric')),
+                                      }
+
+                    english_fields = {'qpf':  self.nestedLookup(observation, keys=('qpf', 'english')),
+                                      'snow': self.nestedLookup(observation, keys=('snow', 'english')),
+                                      'temp': self.nestedLookup(observation, keys=('temp', 'english')),
+                                      'wind': self.nestedLookup(observation, keys=('wspd', 'english')),
+                                      }
+
+                    for field, val in numeric_fields.iteritems():
+                        numeric_plan[u"{0}_{1}".format(hour_key, field)] = val
+
+                    for field, val in english_fields.iteritems():
+                        english_plan[u"{0}_{1}".format(hour_key, field)] = val
+
+                    for field, quantity in (('qpf', 'precipitation'), ('snow', 'snow'), ('temp', 'temperature'), ('wind', 'wind')):
+                        quantities[u"{0}_{1}".format(hour_key, field)] = quantity
+
+                    hourly_plan.append((hour_key, observation, hour))
+
+            sanitized = self.convertUnits(sanitized=self.fixCorruptedDataBatch(plan=numeric_plan),
+                                          quantities=quantities,
+                                          units=config_menu_units,
+                                          english=self.fixCorruptedDataBatch(plan=english_plan))
+
+            # Render each new or changed hour as (state suffix, value, uiValue) so that it can
+            # be written to whichever slot the hour occupies this cycle or next.
+            for hour_key, observation, hour in hourly_plan:
+
+                civil_time   = hour['civil_time']
+                condition    = hour['condition']
+                icon         = hour['icon']
+                wind_degrees = hour['wind_degrees']
+                wind_dir     = hour['wind_dir']
+                rendered     = []
+
+                # Values that are set regardless of unit setting:
+                rendered.append(('cond', condition, condition))
+                rendered.append(('icon', icon, icon))
+                rendered.append(('proper_icon', icon, icon))
+                rendered.append(('time', civil_time, civil_time))
+                rendered.append(('windDirLong', self.verboseWindNames("h{0}_windDirLong".format(hour_key), wind_dir), None))
+                rendered.append(('windDegrees', int(wind_degrees), str(int(wind_degrees))))
+
+                time_long = u"{0}-{1}-{2} {3}:{4}".format(hour['year'], hour['month'], hour['day'], hour['hour'], hour['minute'])
+                rendered.append(('timeLong', time_long, time_long))
+
+                value, ui_value = sanitized[u"{0}_humidity".format(hour_key)]
+                rendered.append(('humidity', value, self.uiFormatPercentage(dev=dev, state_name="h{0}_humidity".format(hour_key), val=ui_value)))
+
+                value, ui_value = sanitized[u"{0}_precip".format(hour_key)]
+                rendered.append(('precip', value, self.uiFormatPercentage(dev=dev, state_name="h{0}_precip".format(hour_key), val=ui_value)))
+
+                # Temperature, QPF, snow and wind (already converted to the device's units.)
+                value, ui_value = sanitized[u"{0}_temp".format(hour_key)]
+                rendered.append(('temp', value, self.uiFormatTemperature(dev=dev, state_name="h{0}_temp".format(hour_key), val=ui_value)))
+
+                value, ui_value = sanitized[u"{0}_qpf".format(hour_key)]
+                rendered.append(('qpf', value, self.uiFormatRain(dev=dev, state_name="h{0}_qpf".format(hour_key), val=ui_value)))
+
+                value, ui_value = sanitized[u"{0}_snow".format(hour_key)]
+                rendered.append(('snow', value, self.uiFormatSnow(dev=dev, state_name="h{0}_snow".format(hour_key), val=ui_value)))
+
+                value, ui_value = sanitized[u"{0}_wind".format(hour_key)]
+                rendered.append(('windSpeed', value, self.uiFormatWind(dev=dev, state_name="h{0}_windSpeed".format(hour_key), val=ui_value)))
+                rendered.append(('windSpeedIcon', u"{0}".format(int(round(value))), None))
+
+                if dev.pluginProps.get('configWindDirUnits', '') == "DIR":
+                    rendered.append(('windDir', wind_dir, wind_dir))
+
+                else:
+                    rendered.append(('windDir', wind_degrees, wind_degrees))
+
+                rendered_hours[hour_key] = (observation, rendered)
+
+            self.logger.debug(u"{0}: rendered {1} of {2} forecast hours.".format(dev.name, len(hourly_plan), len(slots)))
+
+            # Write each hour to its slot for this cycle.
+            for fore_counter_text, hour_key in slots:
+                for suffix, value, ui_value in rendered_hours[hour_key][1]:
+                    if ui_value is None:
+                        hourly_forecast_states_list.append({'key': u"h{0}_{1}".format(fore_counter_text, suffix), 'value': value})
+                    else:
+                        hourly_forecast_states_list.append({'key': u"h{0}_{1}".format(fore_counter_text, suffix), 'value': value, 'uiValue': ui_value})
+
+            # Forecast summary states (computed from the location's forecast columns.)
+            hourly_forecast_states_list.extend(self.forecastSummaryStates(dev=dev, feature='hourly'))
+
+            self.updateDeviceAddress(dev, station_id)
             hourly_forecast_states_list.append({'key': 'onOffState', 'value': True, 'uiValue': u" "})
-            dev.updateStatesOnServer(hourly_forecast_states_list)
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
+            self.updateDeviceStates(dev, hourly_forecast_states_list)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOn)
+
+            # Keep this cycle's rendered hours for the next one.
+            self.masterDeviceDict[dev.id]['hourlyRender'] = {'context': render_context, 'hours': rendered_hours}
 
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Problem parsing hourly forecast data.")
+            self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)  # Parse again next cycle.
             hourly_forecast_states_list.append({'key': 'onOffState', 'value': False, 'uiValue': u" "})
-            dev.updateStatesOnServer(hourly_forecast_states_list)
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+            self.updateDeviceStates(dev, hourly_forecast_states_list)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
 
     def parseTenDayData(self, dev):
         """
@@ -2114,189 +3405,163 @@ class Plugin(indigo.PluginBase):
 
         ten_day_forecast_states_list = []
         config_menu_units           = dev.pluginProps.get('configMenuUnits', '')
+        horizon                     = self.forecastHorizon(dev)
         location                    = dev.pluginProps['location']
         wind_speed_units            = dev.pluginProps.get('configWindSpdUnits', '')
 
         weather_data = self.masterWeatherDict[location]
         forecast_day = self.masterWeatherDict[location].get('forecast', {}).get('simpleforecast', {}).get('forecastday', {})
 
-        current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-        current_observation_time  = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-        station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id'))
-
         try:
+            observation               = self.locationObservation(location)
+            current_observation_epoch = observation['epoch']
+            current_observation_time  = observation['time']
+            station_id                = observation['station_id']
 
             ten_day_forecast_states_list.append({'key': 'currentObservation', 'value': current_observation_time, 'uiValue': current_observation_time})
             ten_day_forecast_states_list.append({'key': 'currentObservationEpoch', 'value': current_observation_epoch, 'uiValue': current_observation_epoch})
 
             # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(float(current_observation_epoch)))
+            current_observation_24hr = observation['time24']
             ten_day_forecast_states_list.append({'key': 'currentObservation24hr', 'value': current_observation_24hr})
 
-            fore_counter = 1
+            # Collect the raw values for each forecast day, then sanitize every numeric
+            # value the device needs in one pass.
+            ten_day_plan = []
+            numeric_plan = {}
+            english_plan = {}
+            quantities   = {}
 
+            fore_counter = 1
             for observation in forecast_day:
 
-                conditions         = self.nestedLookup(observation, keys=('conditions',))
-                forecast_date      = self.nestedLookup(observation, keys=('date', 'epoch'))
-                fore_pop           = self.nestedLookup(observation, keys=('pop',))
-                fore_qpf_metric    = self.nestedLookup(observation, keys=('qpf_allday', 'mm'))
-                fore_qpf_standard  = self.nestedLookup(observation, keys=('qpf_allday', 'in'))
-                fore_snow_metric   = self.nestedLookup(observation, keys=('snow_allday', 'cm'))
-                fore_snow_standard = self.nestedLookup(observation, keys=('snow_allday', 'in'))
-                high_temp_metric   = self.nestedLookup(observation, keys=('high', 'celsius'))
-                high_temp_standard = self.nestedLookup(observation, keys=('high', 'fahrenheit'))
-                icon               = self.nestedLookup(observation, keys=('icon',))
-                low_temp_metric    = self.nestedLookup(observation, keys=('low', 'celsius'))
-                low_temp_standard  = self.nestedLookup(observation, keys=('low', 'fahrenheit'))
-                max_humidity       = self.nestedLookup(observation, keys=('maxhumidity',))
-                weekday            = self.nestedLookup(observation, keys=('date', 'weekday'))
-                wind_avg_degrees   = self.nestedLookup(observation, keys=('avewind', 'degrees'))
-                wind_avg_dir       = self.nestedLookup(observation, keys=('avewind', 'dir'))
-                wind_avg_metric    = self.nestedLookup(observation, keys=('avewind', 'kph'))
-                wind_avg_standard  = self.nestedLookup(observation, keys=('avewind', 'mph'))
-                wind_max_degrees   = self.nestedLookup(observation, keys=('maxwind', 'degrees'))
-                wind_max_dir       = self.nestedLookup(observation, keys=('maxwind', 'dir'))
-                wind_max_metric    = self.nestedLookup(observation, keys=('maxwind', 'kph'))
-                wind_max_standard  = self.nestedLookup(observation, keys=('maxwind', 'mph'))
+                # Days beyond the device's forecast horizon aren't used.
+                if fore_counter > horizon:
+                    break
 
                 if fore_counter <= 10:
 
                     # Add leading zero to counter value for device state names 1-9.
-                    if fore_counter < 10:
-                        fore_counter_text = "0{0}".format(fore_counter)
-                    else:
-                        fore_counter_text = fore_counter
-
-                    ten_day_forecast_states_list.append({'key': u"d{0}_conditions".format(fore_counter_text), 'value': conditions, 'uiValue': conditions})
-                    ten_day_forecast_states_list.append({'key': u"d{0}_day".format(fore_counter_text), 'value': weekday, 'uiValue': weekday})
-
-                    # Forecast day
-                    forecast_date = time.strftime('%Y-%m-%d', time.localtime(float(forecast_date)))
-                    ten_day_forecast_states_list.append({'key': u"d{0}_date".format(fore_counter_text), 'value': forecast_date, 'uiValue': forecast_date})
+                    fore_counter_text = u"{0:02d}".format(fore_counter)
 
-                    # Pop
-                    value, ui_value = self.fixCorruptedData(state_name="d{0}_pop".format(fore_counter_text), val=fore_pop)
-                    ui_value = self.uiFormatPercentage(dev=dev, state_name="d{0}_pop".format(fore_counter_text), val=ui_value)
-                    ten_day_forecast_states_list.append({'key': u"d{0}_pop".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-
-                    # Forecast humidity (all day).
-                    value, ui_value = self.fixCorruptedData(state_name="d{0}_humidity".format(fore_counter_text), val=max_humidity)
-                    ui_value = self.uiFormatPercentage(dev=dev, state_name="d{0}_humidity".format(fore_counter_text), val=ui_value)
-                    ten_day_forecast_states_list.append({'key': u"d{0}_humidity".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-
-                    # Forecast icon (all day).
-                    ten_day_forecast_states_list.append({'key': u"d{0}_icon".format(fore_counter_text), 'value': u"{0}".format(icon)})
+                    day = {'conditions':    self.nestedLookup(observation, keys=('conditions',)),
+                           'forecast_date': self.nestedLookup(observation, keys=('date', 'epoch')),
+                           'icon':          self.nestedLookup(observation, keys=('icon',)),
+                           'weekday':       self.nestedLookup(observation, keys=('date', 'weekday')),
+                           }
 
                     # Wind. This can be impacted by whether the user wants average wind or max wind.
                     # Three states are affected by this setting: _windDegrees, _windDir, and _windDirLong.
-                    if wind_speed_units == "AVG":
-                        wind_degrees = wind_avg_degrees
-                        wind_dir = wind_avg_dir
-                    else:
-                        wind_degrees = wind_max_degrees
-                        wind_dir = wind_max_dir
-
-                    value, ui_value = self.fixCorruptedData(state_name="d{0}_windDegrees".format(fore_counter_text), val=wind_degrees)
-                    ten_day_forecast_states_list.append({'key': u"d{0}_windDegrees".format(fore_counter_text), 'value': int(value), 'uiValue': str(int(value))})
-
-                    ten_day_forecast_states_list.append({'key': u"d{0}_windDir".format(fore_counter_text), 'value': wind_dir, 'uiValue': wind_dir})
-
-                    wind_long_name = self.verboseWindNames(state_name="d{0}_windDirLong".format(fore_counter_text), val=wind_dir)
-                    ten_day_forecast_states_list.append({'key': u"d{0}_windDirLong".format(fore_counter_text), 'value': wind_long_name, 'uiValue': wind_long_name})
-
-                    if config_menu_units in ["I", "M", "MS"]:
-
-                        # High Temperature (Metric)
-                        value, ui_value = self.fixCorruptedData(state_name="d{0}_high".format(fore_counter_text), val=high_temp_metric)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="d{0}_high".format(fore_counter_text), val=ui_value)
-                        ten_day_forecast_states_list.append({'key': u"d{0}_high".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
+                    wind = 'avewind' if wind_speed_units == "AVG" else 'maxwind'
+                    day['wind_dir'] = self.nestedLookup(observation, keys=(wind, 'dir'))
+
+                    # Numeric values are taken in metric and converted below (english
+                    # targets use the english values.)
+                    numeric_fields = {'high':         self.nestedLookup(observation, keys=('high', 'celsius')),
+                                      'humidity':     self.nestedLookup(observation, keys=('maxhumidity',)),
+                                      'low':          self.nestedLookup(observation, keys=('low', 'celsius')),
+                                      'pop':          self.nestedLookup(observation, keys=('pop',)),
+                                      'qpf':          self.nestedLookup(observation, keys=('qpf_allday', 'mm')),
+                                      'snow':         self.nestedLookup(observation, keys=('snow_allday', 'cm')),
+                                      'wind':         self.nestedLookup(observation, keys=(wind, 'kph')),
+                                      'wind_degrees': self.nestedLookup(observation, keys=(wind, 'degrees')),
+                                      }
+
+                    english_fields = {'high': self.nestedLookup(observation, keys=('high', 'fahrenheit')),
+                                      'low':  self.nestedLookup(observation, keys=('low', 'fahrenheit')),
+                                      'qpf':  self.nestedLookup(observation, keys=('qpf_allday', 'in')),
+                                      'snow': self.nestedLookup(observation, keys=('snow_allday', 'in')),
+                                      'wind': self.nestedLookup(observation, keys=(wind, 'mph')),
+                                      }
+
+                    for field, val in numeric_fields.iteritems():
+                        numeric_plan[u"d{0}_{1}".format(fore_counter_text, field)] = val
+
+                    for field, val in english_fields.iteritems():
+                        english_plan[u"d{0}_{1}".format(fore_counter_text, field)] = val
+
+                    for field, quantity in (('high', 'temperature'), ('low', 'temperature'), ('qpf', 'precipitation'), ('snow', 'snow'), ('wind', 'wind')):
+                        quantities[u"d{0}_{1}".format(fore_counter_text, field)] = quantity
+
+                    ten_day_plan.append((fore_counter_text, day))
+                    fore_counter += 1
 
-                        # Low Temperature (Metric)
-                        value, ui_value = self.fixCorruptedData(state_name="d{0}_low".format(fore_counter_text), val=low_temp_metric)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="d{0}_low".format(fore_counter_text), val=ui_value)
-                        ten_day_forecast_states_list.append({'key': u"d{0}_low".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
+            sanitized = self.convertUnits(sanitized=self.fixCorruptedDataBatch(plan=numeric_plan),
+                                          quantities=quantities,
+                                          units=config_menu_units,
+                                          english=self.fixCorruptedDataBatch(plan=english_plan))
 
-                    # User preference is Metric.
-                    if config_menu_units in ["M", "MS"]:
+            for fore_counter_text, day in ten_day_plan:
 
-                        # QPF Amount
-                        value, ui_value = self.fixCorruptedData(state_name="d{0}_qpf".format(fore_counter_text), val=fore_qpf_metric)
-                        ui_value = self.uiFormatRain(dev=dev, state_name="d{0}_qpf".format(fore_counter_text), val=ui_value)
-                        ten_day_forecast_states_list.append({'key': u"d{0}_qpf".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
+                conditions = day['conditions']
+                weekday    = day['weekday']
+                wind_dir   = day['wind_dir']
 
-                        # Snow Value
-                        value, ui_value = self.fixCorruptedData(state_name="d{0}_snow".format(fore_counter_text), val=fore_snow_metric)
-                        ui_value = self.uiFormatSnow(dev=dev, state_name="d{0}_snow".format(fore_counter_text), val=ui_value)
-                        ten_day_forecast_states_list.append({'key': u"d{0}_snow".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
+                ten_day_forecast_states_list.append({'key': u"d{0}_conditions".format(fore_counter_text), 'value': conditions, 'uiValue': conditions})
+                ten_day_forecast_states_list.append({'key': u"d{0}_day".format(fore_counter_text), 'value': weekday, 'uiValue': weekday})
 
-                        # Wind speed
-                        if wind_speed_units == "AVG":
-                            wind_value = wind_avg_metric
-                        else:
-                            wind_value = wind_max_metric
+                # Forecast day
+                forecast_date = time.strftime('%Y-%m-%d', time.localtime(float(day['forecast_date'])))
+                ten_day_forecast_states_list.append({'key': u"d{0}_date".format(fore_counter_text), 'value': forecast_date, 'uiValue': forecast_date})
 
-                        if config_menu_units == 'MS':
-                            wind_value *= 0.277778
+                # Pop
+                value, ui_value = sanitized[u"d{0}_pop".format(fore_counter_text)]
+                ui_value = self.uiFormatPercentage(dev=dev, state_name="d{0}_pop".format(fore_counter_text), val=ui_value)
+                ten_day_forecast_states_list.append({'key': u"d{0}_pop".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
 
-                        value, ui_value = self.fixCorruptedData(state_name="d{0}_windSpeed".format(fore_counter_text), val=wind_value)
-                        ui_value = self.uiFormatWind(dev=dev, state_name="d{0}_windSpeed".format(fore_counter_text), val=ui_value)
-                        ten_day_forecast_states_list.append({'key': u"d{0}_windSpeed".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
-                        ten_day_forecast_states_list.append({'key': u"d{0}_windSpeedIcon".format(fore_counter_text), 'value': unicode(wind_value).replace('.', '')})
+                # Forecast humidity (all day).
+                value, ui_value = sanitized[u"d{0}_humidity".format(fore_counter_text)]
+                ui_value = self.uiFormatPercentage(dev=dev, state_name="d{0}_humidity".format(fore_counter_text), val=ui_value)
+                ten_day_forecast_states_list.append({'key': u"d{0}_humidity".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
 
-                    # User preference is Mixed.
-                    if config_menu_units in ["I", "S"]:
+                # Forecast icon (all day).
+                ten_day_forecast_states_list.append({'key': u"d{0}_icon".format(fore_counter_text), 'value': u"{0}".format(day['icon'])})
 
-                        # QPF Amount
-                        value, ui_value = self.fixCorruptedData(state_name="d{0}_qpf".format(fore_counter_text), val=fore_qpf_standard)
-                        ui_value = self.uiFormatRain(dev=dev, state_name="d{0}_qpf".format(fore_counter_text), val=ui_value)
-                        ten_day_forecast_states_list.append({'key': u"d{0}_qpf".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
+                value, ui_value = sanitized[u"d{0}_wind_degrees".format(fore_counter_text)]
+                ten_day_forecast_states_list.append({'key': u"d{0}_windDegrees".format(fore_counter_text), 'value': int(value), 'uiValue': str(int(value))})
 
-                        # Snow Value
-                        value, ui_value = self.fixCorruptedData(state_name="d{0}_snow".format(fore_counter_text), val=fore_snow_standard)
-                        ui_value = self.uiFormatSnow(dev=dev, state_name="d{0}_snow".format(fore_counter_text), val=ui_value)
-                        ten_day_forecast_states_list.append({'key': u"d{0}_snow".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
+                ten_day_forecast_states_list.append({'key': u"d{0}_windDir".format(fore_counter_text), 'value': wind_dir, 'uiValue': wind_dir})
 
-                        # Wind speed
-                        if wind_speed_units == "AVG":
-                            wind_value = wind_avg_standard
-                        else:
-                            wind_value = wind_max_standard
+                wind_long_name = self.verboseWindNames(state_name="d{0}_windDirLong".format(fore_counter_text), val=wind_dir)
+                ten_day_forecast_states_list.append({'key': u"d{0}_windDirLong".format(fore_counter_text), 'value': wind_long_name, 'uiValue': wind_long_name})
 
-                        value, ui_value = self.fixCorruptedData(state_name="d{0}_windSpeed".format(fore_counter_text), val=wind_value)
-                        ui_value = self.uiFormatWind(dev=dev, state_name="d{0}_windSpeed".format(fore_counter_text), val=ui_value)
-                        ten_day_forecast_states_list.append({'key': u"d{0}_windSpeed".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
+                # Temperature, QPF, snow and wind (already converted to the device's units.)
+                value, ui_value = sanitized[u"d{0}_high".format(fore_counter_text)]
+                ui_value = self.uiFormatTemperature(dev=dev, state_name="d{0}_high".format(fore_counter_text), val=ui_value)
+                ten_day_forecast_states_list.append({'key': u"d{0}_high".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
 
-                        ten_day_forecast_states_list.append({'key': u"d{0}_windSpeedIcon".format(fore_counter_text), 'value': unicode(wind_value).replace('.', '')})
+                value, ui_value = sanitized[u"d{0}_low".format(fore_counter_text)]
+                ui_value = self.uiFormatTemperature(dev=dev, state_name="d{0}_low".format(fore_counter_text), val=ui_value)
+                ten_day_forecast_states_list.append({'key': u"d{0}_low".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
 
-                    # User preference is Standard.
-                    if config_menu_units == "S":
+                value, ui_value = sanitized[u"d{0}_qpf".format(fore_counter_text)]
+                ui_value = self.uiFormatRain(dev=dev, state_name="d{0}_qpf".format(fore_counter_text), val=ui_value)
+                ten_day_forecast_states_list.append({'key': u"d{0}_qpf".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
 
-                        # High Temperature (Standard)
-                        value, ui_value = self.fixCorruptedData(state_name="d{0}_high".format(fore_counter_text), val=high_temp_standard)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="d{0}_high".format(fore_counter_text), val=ui_value)
-                        ten_day_forecast_states_list.append({'key': u"d{0}_high".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
+                value, ui_value = sanitized[u"d{0}_snow".format(fore_counter_text)]
+                ui_value = self.uiFormatSnow(dev=dev, state_name="d{0}_snow".format(fore_counter_text), val=ui_value)
+                ten_day_forecast_states_list.append({'key': u"d{0}_snow".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
 
-                        # Low Temperature Standard
-                        value, ui_value = self.fixCorruptedData(state_name="d{0}_low".format(fore_counter_text), val=low_temp_standard)
-                        ui_value = self.uiFormatTemperature(dev=dev, state_name="d{0}_low".format(fore_counter_text), val=ui_value)
-                        ten_day_forecast_states_list.append({'key': u"d{0}_low".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
+                value, ui_value = sanitized[u"d{0}_wind".format(fore_counter_text)]
+                ui_value = self.uiFormatWind(dev=dev, state_name="d{0}_windSpeed".format(fore_counter_text), val=ui_value)
+                ten_day_forecast_states_list.append({'key': u"d{0}_windSpeed".format(fore_counter_text), 'value': value, 'uiValue': ui_value})
+                ten_day_forecast_states_list.append({'key': u"d{0}_windSpeedIcon".format(fore_counter_text), 'value': u"{0}".format(int(round(value)))})
 
-                    fore_counter += 1
+            # Forecast summary states (computed from the location's forecast columns.)
+            ten_day_forecast_states_list.extend(self.forecastSummaryStates(dev=dev, feature='tenDay'))
 
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
+            self.updateDeviceAddress(dev, station_id)
             ten_day_forecast_states_list.append({'key': 'onOffState', 'value': True, 'uiValue': u" "})
-            dev.updateStatesOnServer(ten_day_forecast_states_list)
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
+            self.updateDeviceStates(dev, ten_day_forecast_states_list)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOn)
 
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Problem parsing 10-day forecast data.")
+            self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)  # Parse again next cycle.
             ten_day_forecast_states_list.append({'key': 'onOffState', 'value': False, 'uiValue': u" "})
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
-            dev.updateStatesOnServer(ten_day_forecast_states_list)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
+            self.updateDeviceStates(dev, ten_day_forecast_states_list)
 
     def parseTidesData(self, dev):
         """
@@ -2310,25 +3575,27 @@ class Plugin(indigo.PluginBase):
         """
 
         tide_states_list = []
+        horizon          = self.forecastHorizon(dev)
         location         = dev.pluginProps['location']
 
         weather_data = self.masterWeatherDict[location]
 
-        current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-        current_observation_time  = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-        station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id'))
         tide_min_height           = self.nestedLookup(weather_data, keys=('tide', 'tideSummaryStats', 'minheight'))
         tide_max_height           = self.nestedLookup(weather_data, keys=('tide', 'tideSummaryStats', 'maxheight'))
         tide_site                 = self.nestedLookup(weather_data, keys=('tide', 'tideInfo', 'tideSite'))
         tide_summary              = self.nestedLookup(weather_data, keys=('tide', 'tideSummary'))
 
         try:
+            observation               = self.locationObservation(location)
+            current_observation_epoch = observation['epoch']
+            current_observation_time  = observation['time']
+            station_id                = observation['station_id']
 
             tide_states_list.append({'key': 'currentObservation', 'value': current_observation_time, 'uiValue': current_observation_time})
             tide_states_list.append({'key': 'currentObservationEpoch', 'value': current_observation_epoch, 'uiValue': current_observation_epoch})
 
             # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(float(current_observation_epoch)))
+            current_observation_24hr = observation['time24']
             tide_states_list.append({'key': 'currentObservation24hr', 'value': current_observation_24hr})
 
             # Tide location information. This is only appropriate for some locations.
@@ -2357,6 +3624,10 @@ class Plugin(indigo.PluginBase):
 
                 for observation in tide_summary:
 
+                    # Tide events beyond the device's forecast horizon aren't used.
+                    if tide_counter > horizon:
+                        break
+
                     if tide_counter < 32:
 
                         pretty      = self.nestedLookup(observation, keys=('date', 'pretty'))
@@ -2369,22 +3640,21 @@ class Plugin(indigo.PluginBase):
 
                         tide_counter += 1
 
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
+            self.updateDeviceAddress(dev, station_id)
 
             tide_states_list.append({'key': 'onOffState', 'value': True, 'uiValue': u" "})
-            dev.updateStatesOnServer(tide_states_list)
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOn)
+            self.updateDeviceStates(dev, tide_states_list)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOn)
 
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Problem parsing tide data.")
             self.logger.error(u"Note: Tide information may not be available in your area. Check Weather Underground for more information.")
+            self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)  # Parse again next cycle.
 
             tide_states_list.append({'key': 'onOffState', 'value': False, 'uiValue': u" "})
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
-            dev.updateStatesOnServer(tide_states_list)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
+            self.updateDeviceStates(dev, tide_states_list)
 
     def parseWeatherData(self, dev):
         """
@@ -2416,58 +3686,85 @@ class Plugin(indigo.PluginBase):
             weather_data = self.masterWeatherDict[location]
             history_data = self.nestedLookup(weather_data, keys=('history', 'dailysummary'))
 
-            current_observation_epoch = self.nestedLookup(weather_data, keys=('current_observation', 'observation_epoch'))
-            current_observation_time  = self.nestedLookup(weather_data, keys=('current_observation', 'observation_time'))
-            current_temp_c            = self.nestedLookup(weather_data, keys=('current_observation', 'temp_c',))
-            current_temp_f            = self.nestedLookup(weather_data, keys=('current_observation', 'temp_f',))
+            observation               = self.locationObservation(location)
+            current_observation_epoch = observation['epoch']
+            current_observation_time  = observation['time']
             current_weather           = self.nestedLookup(weather_data, keys=('current_observation', 'weather',))
-            dew_point_c               = self.nestedLookup(weather_data, keys=('current_observation', 'dewpoint_c',))
-            dew_point_f               = self.nestedLookup(weather_data, keys=('current_observation', 'dewpoint_f',))
-            feels_like_c              = self.nestedLookup(weather_data, keys=('current_observation', 'feelslike_c',))
-            feels_like_f              = self.nestedLookup(weather_data, keys=('current_observation', 'feelslike_f',))
-            heat_index_c              = self.nestedLookup(weather_data, keys=('current_observation', 'heat_index_c',))
-            heat_index_f              = self.nestedLookup(weather_data, keys=('current_observation', 'heat_index_f',))
             icon                      = self.nestedLookup(weather_data, keys=('current_observation', 'icon',))
             location_city             = self.nestedLookup(weather_data, keys=('location', 'city',))
             nearby_stations           = self.nestedLookup(weather_data, keys=('location', 'nearby_weather_stations', 'pws', 'station'))
-            precip_1hr_m              = self.nestedLookup(weather_data, keys=('current_observation', 'precip_1hr_metric',))
-            precip_1hr_in             = self.nestedLookup(weather_data, keys=('current_observation', 'precip_1hr_in',))
-            precip_today_m            = self.nestedLookup(weather_data, keys=('current_observation', 'precip_today_metric',))
-            precip_today_in           = self.nestedLookup(weather_data, keys=('current_observation', 'precip_today_in',))
-            pressure_mb               = self.nestedLookup(weather_data, keys=('current_observation', 'pressure_mb',))
-            pressure_in               = self.nestedLookup(weather_data, keys=('current_observation', 'pressure_in',))
             pressure_trend            = self.nestedLookup(weather_data, keys=('current_observation', 'pressure_trend',))
             relative_humidity         = self.nestedLookup(weather_data, keys=('current_observation', 'relative_humidity',))
-            solar_radiation           = self.nestedLookup(weather_data, keys=('current_observation', 'solarradiation',))
-            station_id                = self.nestedLookup(weather_data, keys=('current_observation', 'station_id',))
-            uv_index                  = self.nestedLookup(weather_data, keys=('current_observation', 'UV',))
-            visibility_km             = self.nestedLookup(weather_data, keys=('current_observation', 'visibility_km',))
-            visibility_mi             = self.nestedLookup(weather_data, keys=('current_observation', 'visibility_mi',))
-            wind_chill_c              = self.nestedLookup(weather_data, keys=('current_observation', 'windchill_c',))
-            wind_chill_f              = self.nestedLookup(weather_data, keys=('current_observation', 'windchill_f',))
-            wind_degrees              = self.nestedLookup(weather_data, keys=('current_observation', 'wind_degrees',))
+            station_id                = observation['station_id']
             wind_dir                  = self.nestedLookup(weather_data, keys=('current_observation', 'wind_dir',))
-            wind_gust_kph             = self.nestedLookup(weather_data, keys=('current_observation', 'wind_gust_kph',))
-            wind_gust_mph             = self.nestedLookup(weather_data, keys=('current_observation', 'wind_gust_mph',))
-            wind_speed_kph            = self.nestedLookup(weather_data, keys=('current_observation', 'wind_kph',))
-            wind_speed_mph            = self.nestedLookup(weather_data, keys=('current_observation', 'wind_mph',))
-
-            temp_c, temp_c_ui = self.fixCorruptedData(state_name="temp_c", val=current_temp_c)
-            temp_c_ui = self.uiFormatTemperature(dev=dev, state_name="tempC (M, MS, I)", val=temp_c_ui)
-
-            temp_f, temp_f_ui = self.fixCorruptedData(state_name="temp_f", val=current_temp_f)
-            temp_f_ui = self.uiFormatTemperature(dev=dev, state_name="tempF (S)", val=temp_f_ui)
-
-            # We want these written to the server right away so we use the legacy method.
-            if config_menu_units in ['M', 'MS', 'I']:
-                dev.updateStateOnServer('temp', value=temp_c, uiValue=temp_c_ui)
-                icon_value = u"{0}".format(str(round(temp_c, 0)).replace('.', ''))
-                dev.updateStateOnServer('tempIcon', value=icon_value)
-
-            else:
-                dev.updateStateOnServer('temp', value=temp_f, uiValue=temp_f_ui)
-                icon_value = u"{0}".format(str(round(temp_f, 0)).replace('.', ''))
-                dev.updateStateOnServer('tempIcon', value=icon_value)
+            unit_system               = kUnitSystems.get(config_menu_units, kUnitSystems['S'])
+
+            # Sanitize every numeric value the device needs in one pass. Values with units are taken in metric and
+            # converted to the device's units (english targets use WU's english values where they're given.)
+            sanitized = self.fixCorruptedDataBatch(plan={'dewpoint':          self.nestedLookup(weather_data, keys=('current_observation', 'dewpoint_c',)),
+                                                         'feelslike':         self.nestedLookup(weather_data, keys=('current_observation', 'feelslike_c',)),
+                                                         'heat_index':        self.nestedLookup(weather_data, keys=('current_observation', 'heat_index_c',)),
+                                                         'history_high':      self.nestedLookup(history_data, keys=('maxtempm',)),
+                                                         'history_low':       self.nestedLookup(history_data, keys=('mintempm',)),
+                                                         'history_pop':       self.nestedLookup(history_data, keys=('precipm',)),
+                                                         'precip_1hr':        self.nestedLookup(weather_data, keys=('current_observation', 'precip_1hr_metric',)),
+                                                         'precip_today':      self.nestedLookup(weather_data, keys=('current_observation', 'precip_today_metric',)),
+                                                         'pressure':          self.nestedLookup(weather_data, keys=('current_observation', 'pressure_mb',)),
+                                                         'relative_humidity': str(relative_humidity).strip('%'),
+                                                         'solar_radiation':   self.nestedLookup(weather_data, keys=('current_observation', 'solarradiation',)),
+                                                         'temp':              self.nestedLookup(weather_data, keys=('current_observation', 'temp_c',)),
+                                                         'uv_index':          self.nestedLookup(weather_data, keys=('current_observation', 'UV',)),
+                                                         'visibility':        self.nestedLookup(weather_data, keys=('current_observation', 'visibility_km',)),
+                                                         'wind_degrees':      self.nestedLookup(weather_data, keys=('current_observation', 'wind_degrees',)),
+                                                         'wind_gust':         self.nestedLookup(weather_data, keys=('current_observation', 'wind_gust_kph',)),
+                                                         'wind_speed':        self.nestedLookup(weather_data, keys=('current_observation', 'wind_kph',)),
+                                                         'windchill':         self.nestedLookup(weather_data, keys=('current_observation', 'windchill_c',)),
+                                                         })
+
+            english = self.fixCorruptedDataBatch(plan={'dewpoint':     self.nestedLookup(weather_data, keys=('current_observation', 'dewpoint_f',)),
+                                                       'feelslike':    self.nestedLookup(weather_data, keys=('current_observation', 'feelslike_f',)),
+                                                       'heat_index':   self.nestedLookup(weather_data, keys=('current_observation', 'heat_index_f',)),
+                                                       'history_high': self.nestedLookup(history_data, keys=('maxtempi',)),
+                                                       'history_low':  self.nestedLookup(history_data, keys=('mintempi',)),
+                                                       'history_pop':  self.nestedLookup(history_data, keys=('precipi',)),
+                                                       'precip_1hr':   self.nestedLookup(weather_data, keys=('current_observation', 'precip_1hr_in',)),
+                                                       'precip_today': self.nestedLookup(weather_data, keys=('current_observation', 'precip_today_in',)),
+                                                       'pressure':     self.nestedLookup(weather_data, keys=('current_observation', 'pressure_in',)),
+                                                       'temp':         self.nestedLookup(weather_data, keys=('current_observation', 'temp_f',)),
+                                                       'visibility':   self.nestedLookup(weather_data, keys=('current_observation', 'visibility_mi',)),
+                                                       'wind_gust':    self.nestedLookup(weather_data, keys=('current_observation', 'wind_gust_mph',)),
+                                                       'wind_speed':   self.nestedLookup(weather_data, keys=('current_observation', 'wind_mph',)),
+                                                       'windchill':    self.nestedLookup(weather_data, keys=('current_observation', 'windchill_f',)),
+                                                       })
+
+            # The Indigo Item List display can show both temperature scales regardless of the device's units.
+            temp_c, temp_c_ui = sanitized['temp']
+            temp_f, temp_f_ui = self.convertUnits(sanitized=sanitized, quantities={'temp': 'temperature'}, units='S', english=english)['temp']
+
+            sanitized = self.convertUnits(sanitized=sanitized,
+                                          quantities={'dewpoint':     'temperature',
+                                                      'feelslike':    'temperature',
+                                                      'heat_index':   'temperature',
+                                                      'history_high': 'temperature',
+                                                      'history_low':  'temperature',
+                                                      'history_pop':  'precipitation',
+                                                      'precip_1hr':   'precipitation',
+                                                      'precip_today': 'precipitation',
+                                                      'pressure':     'pressure',
+                                                      'temp':         'temperature',
+                                                      'visibility':   'distance',
+                                                      'wind_gust':    'wind',
+                                                      'wind_speed':   'wind',
+                                                      'windchill':    'temperature',
+                                                      },
+                                          units=config_menu_units,
+                                          english=english)
+
+            # Temperature leads the device's write batch (ahead of the other weather states.)
+            temp, temp_ui = sanitized['temp']
+            temp_ui = self.uiFormatTemperature(dev=dev, state_name="temp", val=temp_ui)
+            icon_value = u"{0}".format(str(round(temp, 0)).replace('.', ''))
+            self.updateDeviceStates(dev, [{'key': 'temp', 'value': temp, 'uiValue': temp_ui}, {'key': 'tempIcon', 'value': icon_value}])
 
             # Set the display of temperature in the Indigo Item List display, and set the value of onOffState to true since we were able to get the data.
             # This only affects what is displayed in the Indigo UI.
@@ -2489,7 +3786,7 @@ class Plugin(indigo.PluginBase):
             else:  # Displays F no units
                 display_value = self.uiFormatItemListTemperature(temp_f)
 
-            dev.updateStateOnServer('onOffState', value=True, uiValue=display_value)
+            self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': True, 'uiValue': display_value}])
 
             weather_states_list.append({'key': 'locationCity', 'value': location_city, 'uiValue': location_city})
             weather_states_list.append({'key': 'stationID', 'value': station_id, 'uiValue': station_id})
@@ -2520,7 +3817,7 @@ class Plugin(indigo.PluginBase):
             weather_states_list.append({'key': 'currentObservation', 'value': current_observation_time, 'uiValue': current_observation_time})
 
             # Current Observation Time 24 Hour (string)
-            current_observation_24hr = time.strftime("{0} {1}".format(self.date_format, self.time_format), time.localtime(float(current_observation_epoch)))
+            current_observation_24hr = observation['time24']
             weather_states_list.append({'key': 'currentObservation24hr', 'value': current_observation_24hr})
 
             # Current Observation Time Epoch (string)
@@ -2535,12 +3832,12 @@ class Plugin(indigo.PluginBase):
 
             # Solar Radiation (string: "0" or greater. Not always provided as a value that can float (sometimes = "").
             # Some sites don't report it.)
-            s_rad, s_rad_ui = self.fixCorruptedData(state_name="Solar Radiation", val=solar_radiation)
+            s_rad, s_rad_ui = sanitized['solar_radiation']
             weather_states_list.append({'key': 'solarradiation', 'value': s_rad, 'uiValue': s_rad_ui})
 
             # Ultraviolet light (string: 0 or greater. Not always provided as a value that can float (sometimes = "").
             # Some sites don't report it.)
-            uv, uv_ui = self.fixCorruptedData(state_name="Solar Radiation", val=uv_index)
+            uv, uv_ui = sanitized['uv_index']
             weather_states_list.append({'key': 'uv', 'value': uv, 'uiValue': uv_ui})
 
             # Short Wind direction in alpha (string: N, NNE, NE, ENE...)
@@ -2551,198 +3848,107 @@ class Plugin(indigo.PluginBase):
             weather_states_list.append({'key': 'windDIRlong', 'value': wind_dir_long, 'uiValue': wind_dir_long})
 
             # Wind direction (integer: 0 - 359 -- units: degrees)
-            wind_degrees, wind_degrees_ui = self.fixCorruptedData(state_name="windDegrees", val=wind_degrees)
+            wind_degrees, wind_degrees_ui = sanitized['wind_degrees']
             weather_states_list.append({'key': 'windDegrees', 'value': int(wind_degrees), 'uiValue': str(int(wind_degrees))})
 
             # Relative Humidity (string: "80%")
-            relative_humidity, relative_humidity_ui = self.fixCorruptedData(state_name="relativeHumidity", val=str(relative_humidity).strip('%'))
+            relative_humidity, relative_humidity_ui = sanitized['relative_humidity']
             relative_humidity_ui = self.uiFormatPercentage(dev=dev, state_name="relativeHumidity", val=relative_humidity_ui)
             weather_states_list.append({'key': 'relativeHumidity', 'value': relative_humidity, 'uiValue': relative_humidity_ui})
 
-            # Wind Gust (string: "19.3" -- units: kph)
-            wind_gust_kph, wind_gust_kph_ui = self.fixCorruptedData(state_name="windGust (KPH)", val=wind_gust_kph)
-            wind_gust_mph, wind_gust_mph_ui = self.fixCorruptedData(state_name="windGust (MPH)", val=wind_gust_mph)
-            wind_gust_mps, wind_gust_mps_ui = self.fixCorruptedData(state_name="windGust (MPS)", val=int(wind_gust_kph * 0.277778))
-
-            # Wind Gust (string: "19.3" -- units: kph)
-            wind_speed_kph, wind_speed_kph_ui = self.fixCorruptedData(state_name="windGust (KPH)", val=wind_speed_kph)
-            wind_speed_mph, wind_speed_mph_ui = self.fixCorruptedData(state_name="windGust (MPH)", val=wind_speed_mph)
-            wind_speed_mps, wind_speed_mps_ui = self.fixCorruptedData(state_name="windGust (MPS)", val=int(wind_speed_kph * 0.277778))
+            # Wind Gust and Wind Speed (already converted to the device's units.)
+            wind_gust, wind_gust_ui   = sanitized['wind_gust']
+            wind_speed, wind_speed_ui = sanitized['wind_speed']
 
             # History (yesterday's weather).  This code needs its own try/except block because not all possible
             # weather locations support history.
             try:
 
-                history_max_temp_m  = self.nestedLookup(history_data, keys=('maxtempm',))
-                history_max_temp_i  = self.nestedLookup(history_data, keys=('maxtempi',))
-                history_min_temp_m  = self.nestedLookup(history_data, keys=('mintempm',))
-                history_min_temp_i  = self.nestedLookup(history_data, keys=('mintempi',))
-                history_precip_m    = self.nestedLookup(history_data, keys=('precipm',))
-                history_precip_i    = self.nestedLookup(history_data, keys=('precipi',))
                 history_pretty_date = self.nestedLookup(history_data, keys=('date', 'pretty'))
 
                 weather_states_list.append({'key': 'historyDate', 'value': history_pretty_date})
 
-                if config_menu_units in ['M', 'MS', 'I']:
-
-                    history_high, history_high_ui = self.fixCorruptedData(state_name="historyHigh (M)", val=history_max_temp_m)
-                    history_high_ui = self.uiFormatTemperature(dev=dev, state_name="historyHigh (M)", val=history_high_ui)
-                    weather_states_list.append({'key': 'historyHigh', 'value': history_high, 'uiValue': history_high_ui})
+                history_high, history_high_ui = sanitized['history_high']
+                history_high_ui = self.uiFormatTemperature(dev=dev, state_name="historyHigh", val=history_high_ui)
+                weather_states_list.append({'key': 'historyHigh', 'value': history_high, 'uiValue': history_high_ui})
 
-                    history_low, history_low_ui = self.fixCorruptedData(state_name="historyLow (M)", val=history_min_temp_m)
-                    history_low_ui = self.uiFormatTemperature(dev=dev, state_name="historyLow (M)", val=history_low_ui)
-                    weather_states_list.append({'key': 'historyLow', 'value': history_low, 'uiValue': history_low_ui})
+                history_low, history_low_ui = sanitized['history_low']
+                history_low_ui = self.uiFormatTemperature(dev=dev, state_name="historyLow", val=history_low_ui)
+                weather_states_list.append({'key': 'historyLow', 'value': history_low, 'uiValue': history_low_ui})
 
-                if config_menu_units in ['M', 'MS']:
+                history_pop, history_pop_ui = sanitized['history_pop']
+                history_pop_ui = self.uiFormatRain(dev=dev, state_name="historyPop", val=history_pop_ui)
+                weather_states_list.append({'key': 'historyPop', 'value': history_pop, 'uiValue': history_pop_ui})
 
-                    history_pop, history_pop_ui = self.fixCorruptedData(state_name="historyPop (M)", val=history_precip_m)
-                    history_pop_ui = self.uiFormatRain(dev=dev, state_name="historyPop (M)", val=history_pop_ui)
-                    weather_states_list.append({'key': 'historyPop', 'value': history_pop, 'uiValue': history_pop_ui})
+            except IndexError:
+                self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                self.logger.info(u"History data not supported for {0}".format(dev.name))
 
-                if config_menu_units in ['I', 'S']:
+            # Dew Point (integer: -20 -- units: Centigrade or Fahrenheit)
+            dewpoint, dewpoint_ui = sanitized['dewpoint']
+            dewpoint_ui = self.uiFormatTemperature(dev=dev, state_name="dewpoint", val=dewpoint_ui)
+            weather_states_list.append({'key': 'dewpoint', 'value': dewpoint, 'uiValue': dewpoint_ui})
 
-                    history_pop, history_pop_ui = self.fixCorruptedData(state_name="historyPop (I)", val=history_precip_i)
-                    history_pop_ui = self.uiFormatRain(dev=dev, state_name="historyPop (I)", val=history_pop_ui)
-                    weather_states_list.append({'key': 'historyPop', 'value': history_pop, 'uiValue': history_pop_ui})
+            # Feels Like (string: "-20" -- units: Centigrade or Fahrenheit)
+            feelslike, feelslike_ui = sanitized['feelslike']
+            feelslike_ui = self.uiFormatTemperature(dev=dev, state_name="feelslike", val=feelslike_ui)
+            weather_states_list.append({'key': 'feelslike', 'value': feelslike, 'uiValue': feelslike_ui})
 
-                if config_menu_units in ['S']:
-                    history_high, history_high_ui = self.fixCorruptedData(state_name="historyHigh (S)", val=history_max_temp_i)
-                    history_high_ui = self.uiFormatTemperature(dev=dev, state_name="historyHigh (S)", val=history_high_ui)
-                    weather_states_list.append({'key': 'historyHigh', 'value': history_high, 'uiValue': history_high_ui})
+            # Heat Index (string: "20", "NA" -- units: Centigrade or Fahrenheit)
+            heat_index, heat_index_ui = sanitized['heat_index']
+            heat_index_ui = self.uiFormatTemperature(dev=dev, state_name="heatIndex", val=heat_index_ui)
+            weather_states_list.append({'key': 'heatIndex', 'value': heat_index, 'uiValue': heat_index_ui})
 
-                    history_low, history_low_ui = self.fixCorruptedData(state_name="historyLow (S)", val=history_min_temp_i)
-                    history_low_ui = self.uiFormatTemperature(dev=dev, state_name="historyLow (S)", val=history_low_ui)
-                    weather_states_list.append({'key': 'historyLow', 'value': history_low, 'uiValue': history_low_ui})
+            # Wind Chill (string: "17" -- units: Centigrade or Fahrenheit)
+            windchill, windchill_ui = sanitized['windchill']
+            windchill_ui = self.uiFormatTemperature(dev=dev, state_name="windchill", val=windchill_ui)
+            weather_states_list.append({'key': 'windchill', 'value': windchill, 'uiValue': windchill_ui})
 
-            except IndexError:
-                self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                self.logger.info(u"History data not supported for {0}".format(dev.name))
+            # Visibility (string: "16.1" -- units: km or miles)
+            visibility, visibility_ui = sanitized['visibility']
+            weather_states_list.append({'key': 'visibility', 'value': visibility, 'uiValue': u"{0}{1}".format(int(round(visibility)), config_distance_units)})
 
-            # Metric (M), Mixed SI (MS), Mixed (I):
-            if config_menu_units in ['M', 'MS', 'I']:
+            # Barometric Pressure (string: "1039" -- units: mb, or "30.25" -- units: inches of mercury)
+            pressure, pressure_ui = sanitized['pressure']
+            weather_states_list.append({'key': 'pressure', 'value': pressure, 'uiValue': u"{0}{1}".format(pressure_ui, pressure_units)})
 
-                # Dew Point (integer: -20 -- units: Centigrade)
-                dewpoint, dewpoint_ui = self.fixCorruptedData(state_name="dewpointC (M, MS)", val=dew_point_c)
-                dewpoint_ui = self.uiFormatTemperature(dev=dev, state_name="dewpointC (M, MS)", val=dewpoint_ui)
-                weather_states_list.append({'key': 'dewpoint', 'value': dewpoint, 'uiValue': dewpoint_ui})
+            if unit_system['pressure'] == 'in':
+                weather_states_list.append({'key': 'pressureIcon', 'value': pressure_ui.replace('.', '')})
 
-                # Feels Like (string: "-20" -- units: Centigrade)
-                feelslike, feelslike_ui = self.fixCorruptedData(state_name="feelsLikeC (M, MS)", val=feels_like_c)
-                feelslike_ui = self.uiFormatTemperature(dev=dev, state_name="feelsLikeC (M, MS)", val=feelslike_ui)
-                weather_states_list.append({'key': 'feelslike', 'value': feelslike, 'uiValue': feelslike_ui})
+            else:
+                weather_states_list.append({'key': 'pressureIcon', 'value': u"{0}".format(int(round(pressure, 0)))})
 
-                # Heat Index (string: "20", "NA" -- units: Centigrade)
-                heat_index, heat_index_ui = self.fixCorruptedData(state_name="heatIndexC (M, MS)", val=heat_index_c)
-                heat_index_ui = self.uiFormatTemperature(dev=dev, state_name="heatIndexC (M, MS)", val=heat_index_ui)
-                weather_states_list.append({'key': 'heatIndex', 'value': heat_index, 'uiValue': heat_index_ui})
+            # Precipitation Today (string: "0", "2" -- units: mm or inches)
+            precip_today, precip_today_ui = sanitized['precip_today']
+            precip_today_ui = self.uiFormatRain(dev=dev, state_name="precipToday", val=precip_today_ui)
+            weather_states_list.append({'key': 'precip_today', 'value': precip_today, 'uiValue': precip_today_ui})
 
-                # Wind Chill (string: "17" -- units: Centigrade)
-                windchill, windchill_ui = self.fixCorruptedData(state_name="windChillC (M, MS)", val=wind_chill_c)
-                windchill_ui = self.uiFormatTemperature(dev=dev, state_name="windChillC (M, MS)", val=windchill_ui)
-                weather_states_list.append({'key': 'windchill', 'value': windchill, 'uiValue': windchill_ui})
+            # Precipitation Last Hour (string: "0", "2" -- units: mm or inches)
+            precip_1hr, precip_1hr_ui = sanitized['precip_1hr']
+            precip_1hr_ui = self.uiFormatRain(dev=dev, state_name="precipOneHour", val=precip_1hr_ui)
+            weather_states_list.append({'key': 'precip_1hr', 'value': precip_1hr, 'uiValue': precip_1hr_ui})
 
-                # Visibility (string: "16.1" -- units: km)
-                visibility, visibility_ui = self.fixCorruptedData(state_name="visibility (M, MS)", val=visibility_km)
-                weather_states_list.append({'key': 'visibility', 'value': visibility, 'uiValue': u"{0}{1}".format(int(round(visibility)), config_distance_units)})
+            # Report winds in KPH, MPS or MPH depending on user prefs.
+            wind_label = unit_system['wind'].upper()
+            wind_string = u"From the {0} at {1} {2} Gusting to {3} {2}".format(wind_dir, wind_speed, wind_label, wind_gust)
 
-                # Barometric Pressure (string: "1039" -- units: mb)
-                pressure, pressure_ui = self.fixCorruptedData(state_name="pressureMB (M, MS)", val=pressure_mb)
-                weather_states_list.append({'key': 'pressure', 'value': pressure, 'uiValue': u"{0}{1}".format(pressure_ui, pressure_units)})
-                weather_states_list.append({'key': 'pressureIcon', 'value': u"{0}".format(int(round(pressure, 0)))})
+            weather_states_list.append({'key': 'windGust', 'value': wind_gust, 'uiValue': self.uiFormatWind(dev=dev, state_name="windGust", val=wind_gust_ui)})
+            weather_states_list.append({'key': 'windSpeed', 'value': wind_speed, 'uiValue': self.uiFormatWind(dev=dev, state_name="windSpeed", val=wind_speed_ui)})
+            weather_states_list.append({'key': 'windGustIcon', 'value': unicode(round(wind_gust, 1)).replace('.', '')})
+            weather_states_list.append({'key': 'windSpeedIcon', 'value': unicode(round(wind_speed, 1)).replace('.', '')})
+            weather_states_list.append({'key': 'windString', 'value': wind_string})
+            weather_states_list.append({'key': 'windShortString', 'value': u"{0} at {1}".format(wind_dir, wind_speed)})
 
-            # Metric (M), Mixed SI (MS):
-            if config_menu_units in ['M', 'MS']:
-
-                # Precipitation Today (string: "0", "2" -- units: mm)
-                precip_today, precip_today_ui = self.fixCorruptedData(state_name="precipMM (M, MS)", val=precip_today_m)
-                precip_today_ui = self.uiFormatRain(dev=dev, state_name="precipToday (M, MS)", val=precip_today_ui)
-                weather_states_list.append({'key': 'precip_today', 'value': precip_today, 'uiValue': precip_today_ui})
-
-                # Precipitation Last Hour (string: "0", "2" -- units: mm)
-                precip_1hr, precip_1hr_ui = self.fixCorruptedData(state_name="precipOneHourMM (M, MS)", val=precip_1hr_m)
-                precip_1hr_ui = self.uiFormatRain(dev=dev, state_name="precipOneHour (M, MS)", val=precip_1hr_ui)
-                weather_states_list.append({'key': 'precip_1hr', 'value': precip_1hr, 'uiValue': precip_1hr_ui})
-
-                # Report winds in KPH or MPS depending on user prefs. 1 KPH = 0.277778 MPS
-
-                if config_menu_units == 'M':
-
-                    weather_states_list.append({'key': 'windGust', 'value': wind_gust_kph, 'uiValue': self.uiFormatWind(dev=dev, state_name="windGust", val=wind_gust_kph_ui)})
-                    weather_states_list.append({'key': 'windSpeed', 'value': wind_speed_kph, 'uiValue': self.uiFormatWind(dev=dev, state_name="windSpeed", val=wind_speed_kph_ui)})
-                    weather_states_list.append({'key': 'windGustIcon', 'value': unicode(round(wind_gust_kph, 1)).replace('.', '')})
-                    weather_states_list.append({'key': 'windSpeedIcon', 'value': unicode(round(wind_speed_kph, 1)).replace('.', '')})
-                    weather_states_list.append({'key': 'windString', 'value': u"From the {0} at {1} KPH Gusting to {2} KPH".format(wind_dir, wind_speed_kph, wind_gust_kph)})
-                    weather_states_list.append({'key': 'windShortString', 'value': u"{0} at {1}".format(wind_dir, wind_speed_kph)})
-                    weather_states_list.append({'key': 'windStringMetric', 'value': u"From the {0} at {1} KPH Gusting to {2} KPH".format(wind_dir, wind_speed_kph, wind_gust_kph)})
-
-                if config_menu_units == 'MS':
-
-                    weather_states_list.append({'key': 'windGust', 'value': wind_gust_mps, 'uiValue': self.uiFormatWind(dev=dev, state_name="windGust", val=wind_gust_mps_ui)})
-                    weather_states_list.append({'key': 'windSpeed', 'value': wind_speed_mps, 'uiValue': self.uiFormatWind(dev=dev, state_name="windSpeed", val=wind_speed_mps_ui)})
-                    weather_states_list.append({'key': 'windGustIcon', 'value': unicode(round(wind_gust_mps, 1)).replace('.', '')})
-                    weather_states_list.append({'key': 'windSpeedIcon', 'value': unicode(round(wind_speed_mps, 1)).replace('.', '')})
-                    weather_states_list.append({'key': 'windString', 'value': u"From the {0} at {1} MPS Gusting to {2} MPS".format(wind_dir, wind_speed_mps, wind_gust_mps)})
-                    weather_states_list.append({'key': 'windShortString', 'value': u"{0} at {1}".format(wind_dir, wind_speed_mps)})
-                    weather_states_list.append({'key': 'windStringMetric', 'value': u"From the {0} at {1} KPH Gusting to {2} KPH".format(wind_dir, wind_speed_mps, wind_gust_mps)})
-
-            # Mixed (I), Standard (S):
-            if config_menu_units in ['I', 'S']:
-
-                # Precipitation Today (string: "0", "0.5" -- units: inches)
-                precip_today, precip_today_ui = self.fixCorruptedData(state_name="precipToday (I)", val=precip_today_in)
-                precip_today_ui = self.uiFormatRain(dev=dev, state_name="precipToday (I)", val=precip_today_ui)
-                weather_states_list.append({'key': 'precip_today', 'value': precip_today, 'uiValue': precip_today_ui})
-
-                # Precipitation Last Hour (string: "0", "0.5" -- units: inches)
-                precip_1hr, precip_1hr_ui = self.fixCorruptedData(state_name="precipOneHour (I)", val=precip_1hr_in)
-                precip_1hr_ui = self.uiFormatRain(dev=dev, state_name="precipOneHour (I)", val=precip_1hr_ui)
-                weather_states_list.append({'key': 'precip_1hr', 'value': precip_1hr, 'uiValue': precip_1hr_ui})
-
-                weather_states_list.append({'key': 'windGust', 'value': wind_gust_mph, 'uiValue': self.uiFormatWind(dev=dev, state_name="windGust", val=wind_gust_mph_ui)})
-                weather_states_list.append({'key': 'windSpeed', 'value': wind_speed_mph, 'uiValue': self.uiFormatWind(dev=dev, state_name="windSpeed", val=wind_speed_mph_ui)})
-                weather_states_list.append({'key': 'windGustIcon', 'value': unicode(round(wind_gust_mph, 1)).replace('.', '')})
-                weather_states_list.append({'key': 'windSpeedIcon', 'value': unicode(round(wind_speed_mph, 1)).replace('.', '')})
-                weather_states_list.append({'key': 'windString', 'value': u"From the {0} at {1} MPH Gusting to {2} MPH".format(wind_dir, wind_speed_mph, wind_gust_mph)})
-                weather_states_list.append({'key': 'windShortString', 'value': u"{0} at {1}".format(wind_dir, wind_speed_mph)})
+            if unit_system['wind'] == 'mph':
                 weather_states_list.append({'key': 'windStringMetric', 'value': " "})
 
-            # Standard (S):
-            if config_menu_units in ['S']:
-                # Dew Point (integer: -20 -- units: Fahrenheit)
-                dewpoint, dewpoint_ui = self.fixCorruptedData(state_name="dewpointF (S)", val=dew_point_f)
-                dewpoint_ui = self.uiFormatTemperature(dev=dev, state_name="dewpointF (S)", val=dewpoint_ui)
-                weather_states_list.append({'key': 'dewpoint', 'value': dewpoint, 'uiValue': dewpoint_ui})
-
-                # Feels Like (string: "-20" -- units: Fahrenheit)
-                feelslike, feelslike_ui = self.fixCorruptedData(state_name="feelsLikeF (S)", val=feels_like_f)
-                feelslike_ui = self.uiFormatTemperature(dev=dev, state_name="feelsLikeF (S)", val=feelslike_ui)
-                weather_states_list.append({'key': 'feelslike', 'value': feelslike, 'uiValue': feelslike_ui})
-
-                # Heat Index (string: "20", "NA" -- units: Fahrenheit)
-                heat_index, heat_index_ui = self.fixCorruptedData(state_name="heatIndexF (S)", val=heat_index_f)
-                heat_index_ui = self.uiFormatTemperature(dev=dev, state_name="heatIndexF (S)", val=heat_index_ui)
-                weather_states_list.append({'key': 'heatIndex', 'value': heat_index, 'uiValue': heat_index_ui})
-
-                # Wind Chill (string: "17" -- units: Fahrenheit)
-                windchill, windchill_ui = self.fixCorruptedData(state_name="windChillF (S)", val=wind_chill_f)
-                windchill_ui = self.uiFormatTemperature(dev=dev, state_name="windChillF (S)", val=windchill_ui)
-                weather_states_list.append({'key': 'windchill', 'value': windchill, 'uiValue': windchill_ui})
-
-                # Barometric Pressure (string: "30.25" -- units: inches of mercury)
-                pressure, pressure_ui = self.fixCorruptedData(state_name="pressure (S)", val=pressure_in)
-                weather_states_list.append({'key': 'pressure', 'value': pressure, 'uiValue': u"{0}{1}".format(pressure_ui, pressure_units)})
-                weather_states_list.append({'key': 'pressureIcon', 'value': pressure_ui.replace('.', '')})
-
-                # Visibility (string: "16.1" -- units: miles)
-                visibility, visibility_ui = self.fixCorruptedData(state_name="visibility (S)", val=visibility_mi)
-                weather_states_list.append({'key': 'visibility', 'value': visibility, 'uiValue': u"{0}{1}".format(int(round(visibility)), config_distance_units)})
+            else:
+                weather_states_list.append({'key': 'windStringMetric', 'value': wind_string})
 
-            new_props = dev.pluginProps
-            new_props['address'] = station_id
-            dev.replacePluginPropsOnServer(new_props)
+            self.updateDeviceAddress(dev, station_id)
 
-            dev.updateStatesOnServer(weather_states_list)
-            dev.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensorOn)
+            self.updateDeviceStates(dev, weather_states_list)
+            self.updateDeviceImage(dev, indigo.kStateImageSel.TemperatureSensorOn)
 
         except IndexError:
             self.logger.warning(u"Note: List index out of range. This is likely normal.")
@@ -2750,22 +3956,191 @@ class Plugin(indigo.PluginBase):
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Problem parsing weather device data.")
-            dev.updateStateOnServer('onOffState', value=False, uiValue=u" ")
-            dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
+            self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)  # Parse again next cycle.
+            self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u" "}])
+            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
+
+    def payloadHashes(self, response, weather_data):
+        """
+        Fingerprint a location's weather data
+
+        The payloadHashes() method returns an md5 hash of the raw response body and
+        of each feature subtree of the decoded JSON (almanac, current_observation,
+        hourly_forecast, etc.) Devices compare the hashes of the features they use to
+        the hashes from their last successful parse, and are skipped when nothing they
+        depend on has changed (see parseDeviceData()).
+
+        The local time values in current_observation (local_epoch,
+        local_time_rfc822, etc.) are the time of the request and change with every
+        download, so they're left out of its hash. The plugin doesn't use them.
+
+        -----
+
+        :param unicode response:
+        :param dict weather_data:
+        """
+
+        import simplejson
+
+        if isinstance(response, unicode):
+            response = response.encode('utf-8')
+
+        hashes = {'response': hashlib.md5(response).hexdigest()}
+
+        try:
+            for feature, subtree in weather_data.iteritems():
+                if feature == 'current_observation' and isinstance(subtree, dict):
+                    subtree = dict((key, val) for key, val in subtree.iteritems() if not key.startswith('local_'))
+
+                hashes[feature] = hashlib.md5(simplejson.dumps(subtree, sort_keys=True)).hexdigest()
+
+        except (AttributeError, TypeError):
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+
+        return hashes
+
+    def pendingDelta(self, dev):
+        """
+        The device's changes not yet broadcast
+
+        The pendingDelta() method returns the record of changes to the device that
+        haven't been broadcast yet (see broadcastDeltas()), creating it if needed.
+        Returns None if change broadcasts are disabled. Callers should hold the write
+        lock.
+
+        -----
 
-    def refreshWeatherData(self):
+        :param indigo.Device dev:
+        """
+
+        if not self.pluginPrefs.get('broadcastDeltas', False):
+            return None
+
+        return self.pending_deltas.setdefault(dev.id, {'id': dev.id, 'name': dev.name})
+
+    def pendingDeviceWrites(self, dev):
+        """
+        The device's pending write batch
+
+        The pendingDeviceWrites() method returns the batch of writes for the device
+        that haven't been queued yet, creating it if needed. States are kept in the
+        order they were first added (by state name) along with the state image
+        selector, if it has changed. Callers should hold the write lock.
+
+        -----
+
+        :param indigo.Device dev:
+        """
+
+        batch = self.pending_writes.setdefault(dev.id, {'image': None, 'states': collections.OrderedDict()})
+        batch['dev'] = dev
+
+        return batch
+
+    def refreshAlerts(self):
+        """
+        Poll severe weather alerts between regular polls
+
+        The refreshAlerts() method is the alerts lane (plugin config). It downloads
+        only the alerts feature for the locations of weather devices that have Severe
+        Weather Alert triggers. Each call is counted against the daily limit and waits
+        for the per minute limit. When a location's alerts have changed, the alert
+        states of its weather devices are updated (the rest of the data aren't parsed
+        again) and their Severe Weather Alert triggers are fired.
+
+        Locations that haven't been polled yet this cycle are left to the next
+        regular poll.
+
+        -----
+        """
+
+        import requests
+        import simplejson
+
+        if self.pluginPrefs.get('dailyCallLimitReached', False):
+            return
+
+        locations = set()
+
+        for dev_id, dev_triggers in self.masterTriggerDict.items():
+            dev = self.device_registry.get(dev_id)
+
+            if dev is not None and dev.enabled and dev_triggers.get('weatherAlert') and dev.pluginProps.get('isWeatherDevice', False):
+                locations.add(dev.pluginProps.get('location'))
+
+        for location in sorted(locations & set(self.masterWeatherDict.keys())):
+
+            if not self.callRateAvailable():
+                self.logger.debug(u"Per minute call limit reached. Skipping alerts until the next alerts poll.")
+                break
+
+            url = (u"http://api.wunderground.com/api/{0}/alerts_v11/lang:{1}/q/{2}.json?apiref=97986dc4c4b7e764".format(self.pluginPrefs['apiKey'],
+                                                                                                                   self.pluginPrefs['language'],
+                                                                                                                   location))
+
+            self.logger.debug(u"Alerts URL for {0}: {1}".format(location, url))
+
+            try:
+                f = requests.get(url, timeout=20)
+
+            except Exception:
+                self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                self.logger.debug(u"Unable to reach Weather Underground for {0} alerts.".format(location))
+                continue
+
+            # Increment (or reset) the call counter.
+            self.callCount()
+
+            try:
+                alerts_data = simplejson.loads(f.text, encoding="utf-8")['alerts']
+
+            except (KeyError, TypeError, ValueError):
+                self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                self.logger.debug(u"Unable to decode {0} alerts.".format(location))
+                continue
+
+            with self.parse_lock:
+                if location not in self.masterWeatherDict:
+                    continue
+
+                if self.masterWeatherDict[location].get('alerts') == alerts_data:
+                    self.logger.debug(u"Alerts for {0} unchanged.".format(location))
+                    continue
+
+                self.masterWeatherDict[location]['alerts'] = alerts_data
+                self.storeAlerts(location, alerts_data)
+
+                # Only the alert triggers are fired here. Offline and threshold triggers are
+                # left to the regular cycle.
+                for dev in self.registeredDevices(type_id='wunderground', location=location):
+                    self.parseAlertsData(dev)
+                    self.fireAlertTriggers(dev, self.masterDeviceDict.get(dev.id, {}).pop('newAlerts', 0))
+
+    def refreshWeatherData(self, process_triggers=False):
         """
         Refresh data for plugin devices
 
         This method refreshes weather data for all devices based on a WUnderground
         general cycle, Action Item or Plugin Menu call.
 
+        Devices are refreshed one location at a time. For general cycles, the
+        triggers for a location's devices are processed as soon as their states have
+        been written. The triggers for any devices not reached (call limit, Weather
+        Underground offline, etc.) are processed at the end.
+
         -----
+
+        :param bool process_triggers: process triggers (general cycles only)
         """
 
         api_key = self.pluginPrefs['apiKey']
+        processed = set()  # Devices whose triggers have been processed
         daily_call_limit_reached = self.pluginPrefs.get('dailyCallLimitReached', False)
         self.download_interval   = dt.timedelta(seconds=int(self.pluginPrefs.get('downloadInterval', '900')))
+
+        # Refreshes can also be started from the Plugins menu and actions, and settings
+        # changes re-render devices (see renderCachedData), so only one parses at a time.
+        self.parse_lock.acquire()
         self.wuOnline = True
 
         # Check to see if the daily call limit has been reached.
@@ -2778,260 +4153,503 @@ class Plugin(indigo.PluginBase):
                 self.callDay()
 
                 self.masterWeatherDict = {}
+                parsed_count  = 0
+                skipped_count = 0
+                self.write_stats   = {'bytesSkipped': 0, 'statesDeadband': 0, 'statesSent': 0, 'statesSkipped': 0}
 
-                for dev in indigo.devices.itervalues("self"):
+                # Device writes are held until every device has been parsed, and then go to
+                # the writer thread as one batch per device.
+                self.batch_writes = True
 
-                    if not self.wuOnline:
-                        break
+                for location, devices in self.devicesByLocation():
 
-                    if not dev:
-                        # There are no WUnderground devices, so go to sleep.
-                        self.logger.info(u"There aren't any devices to poll yet. Sleeping.")
-
-                    elif not dev.configured:
-                        # A device has been created, but hasn't been fully configured yet.
-                        self.logger.info(u"A device has been created, but is not fully configured. Sleeping for a minute while you finish.")
-
-                    if api_key in ["", "API Key"]:
-                        self.logger.error(u"The plugin requires an API Key. See help for details.")
-                        dev.updateStateOnServer('onOffState', value=False, uiValue=u"{0}".format("No key."))
-                        dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
-
-                    elif not dev.enabled:
-                        self.logger.debug(u"{0}: device communication is disabled. Skipping.".format(dev.name))
-                        dev.updateStateOnServer('onOffState', value=False, uiValue=u"{0}".format("Disabled"))
-                        dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
-
-                    elif dev.enabled:
-                        self.logger.debug(u"Processing device: {0}".format(dev.name))
-
-                        dev.updateStateOnServer('onOffState', value=True, uiValue=u" ")
-
-                        if dev.pluginProps['isWeatherDevice']:
-
-                            location = dev.pluginProps['location']
-
-                            self.getWeatherData(dev)
-
-                            # If we've successfully downloaded data from Weather Underground, let's unpack it and
-                            # assign it to the relevant device.
-                            try:
-                                # If a site location query returns a site unknown (in other words 'querynotfound'
-                                # result, notify the user). Note that if the query is good, the error key won't exist
-                                # in the dict.
-                                response = self.masterWeatherDict[location]['response']['error']['type']
-                                if response == 'querynotfound':
-                                    self.logger.error(u"Location query for {0} not found. Please ensure that device location follows examples precisely.".format(dev.name))
-                                    dev.updateStateOnServer('onOffState', value=False, uiValue=u"Bad Loc")
-                                    dev.updateStateImageOnServer(indigo.kStateImageSel.SensorOff)
-
-                            except (KeyError, Exception) as error:
-                                # Weather device types. There are multiples of these because the names of the device
-                                # models evolved over time.
-                                # If the error key is not present, that's good. Continue.
-                                error = u"{0}".format(error)
-                                if error == "'error'":
-                                    pass
-                                else:
-                                    self.Fogbert.pluginErrorHandler(traceback.format_exc())
-
-                                # Estimated Weather Data (integer: 1 if estimated weather), not present if false.
-                                ignore_estimated = False
-                                try:
-                                    estimated = self.masterWeatherDict[location]['current_observation']['estimated']['estimated']
-                                    if estimated == 1:
-                                        self.logger.error(u"These are estimated conditions. There may be other functioning weather stations nearby. ({0})".format(dev.name))
-                                        dev.updateStateOnServer('estimated', value="true", uiValue=u"True")
+                    for dev in devices:
 
-                                    # If the user wants to skip updates when weather data are estimated.
-                                    if self.pluginPrefs.get('ignoreEstimated', False):
-                                        ignore_estimated = True
+                        if not self.wuOnline:
+                            break
 
-                                except KeyError as error:
+                        if not dev:
+                            # There are no WUnderground devices, so go to sleep.
+                            self.logger.info(u"There aren't any devices to poll yet. Sleeping.")
+
+                        elif not dev.configured:
+                            # A device has been created, but hasn't been fully configured yet.
+                            self.logger.info(u"A device has been created, but is not fully configured. Sleeping for a minute while you finish.")
+
+                        if api_key in ["", "API Key"]:
+                            self.logger.error(u"The plugin requires an API Key. See help for details.")
+                            self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u"{0}".format("No key.")}])
+                            self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
+
+                        else:
+                            # Only started (enabled) devices are registered (see registerDevice.)
+                            self.logger.debug(u"Processing device: {0}".format(dev.name))
+
+                            if not dev.states.get('onOffState', False):
+                                self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': True, 'uiValue': u" "}])
+
+                            if dev.pluginProps['isWeatherDevice']:
+
+                                location = dev.pluginProps['location']
+
+                                self.getWeatherData(dev)
+
+                                # If we've successfully downloaded data from Weather Underground, let's unpack it and
+                                # assign it to the relevant device.
+                                try:
+                                    # If a site location query returns a site unknown (in other words 'querynotfound'
+                                    # result, notify the user). Note that if the query is good, the error key won't exist
+                                    # in the dict.
+                                    response = self.masterWeatherDict[location]['response']['error']['type']
+                                    if response == 'querynotfound':
+                                        self.logger.error(u"Location query for {0} not found. Please ensure that device location follows examples precisely.".format(dev.name))
+                                        self.updateDeviceStates(dev, [{'key': 'onOffState', 'value': False, 'uiValue': u"Bad Loc"}])
+                                        self.updateDeviceImage(dev, indigo.kStateImageSel.SensorOff)
+
+                                except (KeyError, Exception) as error:
+                                    # Weather device types. There are multiples of these because the names of the device
+                                    # models evolved over time.
+                                    # If the error key is not present, that's good. Continue.
                                     error = u"{0}".format(error)
-                                    if error == "'estimated'":
-                                        # The estimated key must not be present. Therefore, we assumed the conditions
-                                        # are not estimated.
-                                        dev.updateStateOnServer('estimated', value="false", uiValue=u"False")
-                                        ignore_estimated = False
+                                    if error == "'error'":
+                                        pass
                                     else:
                                         self.Fogbert.pluginErrorHandler(traceback.format_exc())
 
-                                except Exception:
-                                    self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                                    # Estimated Weather Data (integer: 1 if estimated weather), not present if false.
                                     ignore_estimated = False
-
-                                # Compare last data epoch to the one we just downloaded. Proceed if the data are newer.
-                                # Note: WUnderground have been known to send data that are 5-6 months old. This flag
-                                # helps ensure that known data are retained if the new data is not actually newer that
-                                # what we already have.
-                                try:
-                                    # New devices may not have an epoch value yet.
-                                    device_epoch = dev.states['currentObservationEpoch']
                                     try:
-                                        device_epoch = int(device_epoch)
-                                    except ValueError:
-                                        device_epoch = 0
+                                        estimated = self.masterWeatherDict[location]['current_observation']['estimated']['estimated']
+                                        if estimated == 1:
+                                            self.logger.error(u"These are estimated conditions. There may be other functioning weather stations nearby. ({0})".format(dev.name))
+                                            if dev.states.get('estimated') != "true":
+                                                self.updateDeviceStates(dev, [{'key': 'estimated', 'value': "true", 'uiValue': u"True"}])
+
+                                        # If the user wants to skip updates when weather data are estimated.
+                                        if self.pluginPrefs.get('ignoreEstimated', False):
+                                            ignore_estimated = True
+
+                                    except KeyError as error:
+                                        error = u"{0}".format(error)
+                                        if error == "'estimated'":
+                                            # The estimated key must not be present. Therefore, we assumed the conditions
+                                            # are not estimated.
+                                            if dev.states.get('estimated') != "false":
+                                                self.updateDeviceStates(dev, [{'key': 'estimated', 'value': "false", 'uiValue': u"False"}])
+                                            ignore_estimated = False
+                                        else:
+                                            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+
+                                    except Exception:
+                                        self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                                        ignore_estimated = False
 
-                                    # If we don't know the age of the data, we don't update.
+                                    # Compare last data epoch to the one we just downloaded. Proceed if the data are newer.
+                                    # Note: WUnderground have been known to send data that are 5-6 months old. This flag
+                                    # helps ensure that known data are retained if the new data is not actually newer that
+                                    # what we already have.
                                     try:
-                                        weather_data_epoch = int(self.masterWeatherDict[location]['current_observation']['observation_epoch'])
-                                    except ValueError:
-                                        weather_data_epoch = 0
-
-                                    good_time = device_epoch <= weather_data_epoch
-                                    if not good_time:
-                                        self.logger.info(u"Latest data are older than data we already have. Skipping "
-                                                         u"{0} update.".format(dev.name))
-
-                                except KeyError:
-                                    self.Fogbert.pluginErrorHandler(traceback.format_exc())
-                                    self.logger.info(u"{0} cannot determine age of data. Skipping until next "
-                                                     u"scheduled poll.".format(dev.name))
-                                    good_time = False
-
-                                # If the weather dict is not empty, the data are newer than the data we already have, an
-                                # the user doesn't want to ignore estimated weather conditions, let's update the
-                                # devices.
-                                if self.masterWeatherDict != {} and good_time and not ignore_estimated:
-
-                                    # Almanac devices.
-                                    if dev.model in ['Almanac', 'WUnderground Almanac']:
-                                        self.parseAlmanacData(dev)
-
-                                    # Astronomy devices.
-                                    elif dev.model in ['Astronomy', 'WUnderground Astronomy']:
-                                        self.parseAstronomyData(dev)
-
-                                    # Hourly Forecast devices.
-                                    elif dev.model in ['WUnderground Hourly Forecast', 'Hourly Forecast']:
-                                        self.parseHourlyData(dev)
-
-                                    # Ten Day Forecast devices.
-                                    elif dev.model in ['Ten Day Forecast', 'WUnderground Ten Day Forecast']:
-                                        self.parseTenDayData(dev)
-
-                                    # Tide devices.
-                                    elif dev.model in ['WUnderground Tides', 'Tides']:
-                                        self.parseTidesData(dev)
-
-                                    # Weather devices.
-                                    elif dev.model in ['WUnderground Device', 'WUnderground Weather', 'WUnderground Weather Device', 'Weather Underground', 'Weather']:
-                                        self.parseWeatherData(dev)
-                                        self.parseAlertsData(dev)
-                                        self.parseForecastData(dev)
-
-                                        if self.pluginPrefs.get('updaterEmailsEnabled', False):
-                                            self.emailForecast(dev)
-
-                        # Image Downloader devices.
-                        elif dev.model in ['Satellite Image Downloader', 'WUnderground Satellite Image Downloader']:
-                            self.getSatelliteImage(dev)
-
-                        # WUnderground Radar devices.
-                        elif dev.model in ['WUnderground Radar']:
-                            self.getWUradar(dev)
+                                        # New devices may not have an epoch value yet.
+                                        device_epoch = dev.states['currentObservationEpoch']
+                                        try:
+                                            device_epoch = int(device_epoch)
+                                        except ValueError:
+                                            device_epoch = 0
+
+                                        # If we don't know the age of the data, we don't update.
+                                        try:
+                                            weather_data_epoch = int(self.masterWeatherDict[location]['current_observation']['observation_epoch'])
+                                        except ValueError:
+                                            weather_data_epoch = 0
+
+                                        good_time = device_epoch <= weather_data_epoch
+                                        if not good_time:
+                                            self.logger.info(u"Latest data are older than data we already have. Skipping "
+                                                             u"{0} update.".format(dev.name))
+
+                                    except KeyError:
+                                        self.Fogbert.pluginErrorHandler(traceback.format_exc())
+                                        self.logger.info(u"{0} cannot determine age of data. Skipping until next "
+                                                         u"scheduled poll.".format(dev.name))
+                                        good_time = False
+
+                                    # If the weather dict is not empty, the data are newer than the data we already have, an
+                                    # the user doesn't want to ignore estimated weather conditions, let's update the
+                                    # devices.
+                                    if self.masterWeatherDict != {} and good_time and not ignore_estimated:
+
+                                        if self.parseDeviceData(dev):
+                                            parsed_count += 1
+                                        else:
+                                            skipped_count += 1
+
+                                        # Weather devices.
+                                        if dev.model in ['WUnderground Device', 'WUnderground Weather', 'WUnderground Weather Device', 'Weather Underground', 'Weather']:
+                                            if self.pluginPrefs.get('updaterEmailsEnabled', False):
+                                                self.emailForecast(dev)
+
+                            # Image Downloader devices.
+                            elif dev.model in ['Satellite Image Downloader', 'WUnderground Satellite Image Downloader']:
+                                self.getSatelliteImage(dev)
+
+                            # WUnderground Radar devices.
+                            elif dev.model in ['WUnderground Radar']:
+                                self.getWUradar(dev)
+
+                    if not self.wuOnline:
+                        break
+
+                    # Each location's states are written and its triggers processed as soon as
+                    # its devices have been parsed, so they don't wait on later downloads.
+                    if process_triggers:
+                        self.flushDeviceWrites()
+                        self.triggerProcessing(devices)
+                        processed.update(dev.id for dev in devices)
+
+                self.batch_writes = False
+                self.flushDeviceWrites()
 
                 self.logger.debug(u"{0} locations polled: {1}".format(len(self.masterWeatherDict.keys()), self.masterWeatherDict.keys()))
+                self.logger.debug(u"Devices parsed: {0}. Devices skipped (source data unchanged): {1}".format(parsed_count, skipped_count))
+                self.logger.debug(u"Device states sent: {statesSent}. States unchanged (not sent): {statesSkipped} ({bytesSkipped} bytes). "
+                                  u"States within update thresholds (not sent): {statesDeadband}.".format(**self.write_stats))
 
         except Exception:
             self.Fogbert.pluginErrorHandler(traceback.format_exc())
             self.logger.error(u"Problem parsing Weather data. Dev: {0}".format(dev.name))
 
-    def triggerProcessing(self):
+        finally:
+            try:
+                # Don't leave writes behind if the cycle failed part way through.
+                self.batch_writes = False
+                self.flushDeviceWrites()
+                self.flushSummaryEmails()
+
+                if process_triggers:
+                    unprocessed = [dev for dev in self.registeredDevices() if dev.id not in processed]
+
+                    if unprocessed:
+                        self.triggerProcessing(unprocessed)
+
+            finally:
+                self.parse_lock.release()
+
+    def registerDevice(self, dev):
+        """
+        Add a device to the device registry
+
+        The registerDevice() method adds the device (or replaces the registry's copy
+        of it) and indexes it by device type and location. The registry holds the
+        plugin devices whose communication has been started so that each cycle can
+        use them without enumerating (and copying) every device again.
+
+        The registry is read by the main and writer threads without a lock, so a
+        registered device's copy is swapped in place and it's added to any new index
+        set before it's removed from the old one. It's never missing from the
+        registry or the index while it's being replaced.
+
+        -----
+
+        :param indigo.Device dev:
+        """
+
+        old_dev  = self.device_registry.get(dev.id)
+        location = dev.pluginProps.get('location', '')
+
+        self.device_index['location'].setdefault(location, set()).add(dev.id)
+        self.device_index['type'].setdefault(dev.deviceTypeId, set()).add(dev.id)
+        self.device_registry[dev.id] = dev
+
+        if old_dev is not None:
+            old_location = old_dev.pluginProps.get('location', '')
+
+            if old_location != location:
+                self.device_index['location'].get(old_location, set()).discard(dev.id)
+
+            if old_dev.deviceTypeId != dev.deviceTypeId:
+                self.device_index['type'].get(old_dev.deviceTypeId, set()).discard(dev.id)
+
+    def registeredDevices(self, type_id=None, location=None):
+        """
+        List registered devices
+
+        The registeredDevices() method returns the registered devices (see
+        registerDevice()) in device id order, optionally only those of one device
+        type and/or location.
+
+        -----
+
+        :param str type_id: device type (Devices.xml) or None for all types
+        :param str location: device location or None for all locations
+        """
+
+        dev_ids = set(self.device_registry.keys())
+
+        if type_id is not None:
+            dev_ids &= self.device_index['type'].get(type_id, set())
+
+        if location is not None:
+            dev_ids &= self.device_index['location'].get(location, set())
+
+        devices = [self.device_registry.get(dev_id) for dev_id in sorted(dev_ids)]
+
+        return [dev for dev in devices if dev is not None]
+
+    def renderCachedData(self, devices):
+        """
+        Re-render devices from the weather data we already have
+
+        The renderCachedData() method parses the last weather data downloaded for each
+        device's location again, so that changes to display preferences and device
+        settings show right away without spending API calls. Only the states whose
+        values or formatting change are written (see updateDeviceStates().) Devices
+        without data (no poll since the plugin started) wait for the next poll.
+
+        This is called on Indigo's callback thread. If a refresh (or alert poll) is
+        parsing devices, the devices are left for it (or the next one) to parse rather
+        than waiting for it to finish (see parse_lock.)
+
+        -----
+
+        :param list devices: indigo.Device instances
+        """
+
+        if not self.parse_lock.acquire(False):
+            for dev in devices:
+                self.masterDeviceDict.get(dev.id, {}).pop('featureHashes', None)
+            return
+
+        try:
+            self.batch_writes = True
+
+            for dev in devices:
+                if dev.pluginProps.get('isWeatherDevice', False) and dev.pluginProps.get('location') in self.masterWeatherDict:
+                    self.logger.debug(u"{0}: re-rendering from cached data.".format(dev.name))
+                    self.parseDeviceData(dev, rerender=True)
+
+        finally:
+            self.batch_writes = False
+            self.flushDeviceWrites()
+            self.parse_lock.release()
+
+    def scheduleOfflineDeadlines(self, dev):
+        """
+        Reset the offline deadline for a device
+
+        The scheduleOfflineDeadlines() method pushes the device's offline deadline
+        onto the deadline heap. The runConcurrentThread() loop sleeps no later than
+        the earliest deadline. Any earlier deadline for the device is replaced.
+
+        -----
+
+        :param indigo.Device dev:
+        """
+
+        deadlines = [self.offlineDeadline(dev, trigger) for trigger in self.masterTriggerDict.get(dev.id, {}).get('weatherSiteOffline', {}).values()]
+        deadlines = [deadline for deadline in deadlines if deadline != float('inf')]
+
+        with self.deadline_lock:
+            if not deadlines:
+                self.offline_deadline_index.pop(dev.id, None)
+                return
+
+            deadline = min(deadlines)
+
+            if self.offline_deadline_index.get(dev.id) != deadline:
+                self.offline_deadline_index[dev.id] = deadline
+                heapq.heappush(self.offline_deadlines, (deadline, dev.id))
+
+    def startupReport(self):
+        """
+        Write the startup timings to the plugin log
+
+        The startupReport() method is called once, after the first plugin cycle. It
+        writes the time spent importing modules, in __init__(), in startup(),
+        starting devices and in the first cycle.
+
+        -----
+        """
+
+        self.logger.info(u"{0:{1}^40}".format(' Startup Timings ', '='))
+
+        for phase, seconds in self.startup_timings.iteritems():
+            self.logger.info(u"{0:<16}{1:>10.3f} seconds".format(phase, seconds))
+
+        self.logger.info(u"{0:<16}{1:>10.3f} seconds".format('Total', time.time() - self.startup_stats['time'] + kImportSeconds))
+
+    def storeAlerts(self, location, alerts_data):
+        """
+        Replace the alerts in a location's alert store
+
+        The storeAlerts() method keeps each alert with its expiry time (the alert's
+        expires_epoch) and adds the expiry times to the alert expiry heap (see
+        expireAlerts.) An expiry time already in the heap for the location isn't added
+        again, as the same alerts come with every download. Alerts without a usable
+        expiry time are kept until a later download drops them.
+
+        -----
+
+        :param str location:
+        :param list alerts_data: alert dicts from Weather Underground
+        """
+
+        alerts = []
+
+        for alert in alerts_data or []:
+            try:
+                expires = float(alert['expires_epoch'])
+
+            except (KeyError, TypeError, ValueError):
+                expires = float('inf')
+
+            alerts.append((expires, alert))
+
+            if expires != float('inf') and (expires, location) not in self.alert_expiry_index:
+                self.alert_expiry_index.add((expires, location))
+                heapq.heappush(self.alert_expiries, (expires, location))
+
+        self.masterAlertDict[location] = alerts
+
+    def thresholdRuleValue(self, dev, rule):
+        """
+        Evaluate a Weather Threshold rule
+
+        Returns True or False, or None if the device doesn't have one of the states
+        the rule reads (or the expression can't be evaluated with its values, such as
+        a missing value (--) compared with a number, or an overflow.) Numeric state
+        values are compared as numbers.
+
+        -----
+
+        :param indigo.Device dev:
+        :param dict rule: see compileThresholdRule()
+        """
+
+        names = {}
+
+        for state in rule['states']:
+            value = self.latestDeviceState(dev, state)
+
+            if value is None:
+                return None
+
+            try:
+                names[state] = float(value)
+            except (TypeError, ValueError):
+                names[state] = value
+
+        try:
+            return bool(self.evalExpr.eval_(rule['expression'], names))
+
+        except (ArithmeticError, TypeError, ValueError):
+            return None
+
+    def triggerProcessing(self, devices=None):
         """
         Fire various triggers for plugin devices
 
         Weather Location Offline:
-        The triggerProcessing method will examine the time of the last weather location
-        update and, if the update exceeds the time delta specified in a WUnderground
-        Plugin Weather Location Offline trigger, the trigger will be fired. The plugin
-        examines the value of the latest "currentObservationEpoch" and *not* the Indigo
-        Last Update value.
+        The triggerProcessing method will reset the deadline for each Weather Location
+        Offline trigger from the latest "currentObservationEpoch" (and *not* the Indigo
+        Last Update value.) If the deadline passes before the weather location updates,
+        the trigger will be fired (see fireOfflineDeadlines.)
 
         An additional event that will cause a trigger to be fired is if the weather
         location temperature is less than -55 (Weather Underground will often set a
         value to a variation of -99 (-55 C) to indicate that a data value is invalid.
 
         Severe Weather Alerts:
-        This trigger will fire if a weather location has at least one severe weather
-        alert.
+        This trigger will fire if a weather location has at least one new (or changed)
+        severe weather alert.
+
+        Weather Thresholds:
+        This trigger will fire when its expression over the device's states becomes
+        true. Only expressions that read a state written this cycle are evaluated.
 
         Note that trigger processing will only occur during routine weather update
         cycles and will not be triggered when a data refresh is called from the Indigo
-        Plugins menu.
+        Plugins menu (offline deadlines are checked between cycles.) Triggers are
+        processed for each location as soon as its devices have been parsed (see
+        refreshWeatherData.)
 
         -----
-        """
 
-        time_format = '%Y-%m-%d %H:%M:%S'
+        :param list devices: indigo.Device instances (default: all started devices)
+        """
 
-        # Reconstruct the masterTriggerDict in case it has changed.
-        self.masterTriggerDict = {unicode(trigger.pluginProps['listOfDevices']): (trigger.pluginProps['offlineTimer'], trigger.id) for trigger in indigo.triggers.iter(filter="self.weatherSiteOffline")}
-        self.logger.debug(u"Rebuild Master Trigger Dict: {0}".format(self.masterTriggerDict))
+        if devices is None:
+            devices = self.registeredDevices()
 
-        try:
+        # Triggers look at the device states written this cycle, so wait for the writer
+        # to finish with them.
+        self.write_queue.join()
 
-            # Iterate through all the plugin devices to see if a related trigger should be fired
-            for dev in indigo.devices.itervalues(filter='self'):
+        with self.write_lock:
+            changed_states = {dev.id: self.changed_states.pop(dev.id, set()) for dev in devices}
 
-                # ========================== Weather Location Offline ==========================
-                # If the device is in the masterTriggerDict, it has an offline trigger
-                if str(dev.id) in self.masterTriggerDict.keys():
+        try:
 
-                    # Process the trigger only if the device is enabled
-                    if dev.enabled:
+            # Iterate through the plugin devices to see if a related trigger should be fired
+            for dev in devices:
 
-                        trigger_id = self.masterTriggerDict[str(dev.id)][1]  # Indigo trigger ID
+                # Alerts that are new since the last trigger pass (see parseAlertsData.)
+                new_alerts = self.masterDeviceDict.get(dev.id, {}).pop('newAlerts', 0)
 
-                        if indigo.triggers[trigger_id].pluginTypeId == 'weatherSiteOffline':
+                # Triggers are indexed by device, so most devices are passed over here.
+                dev_triggers = self.masterTriggerDict.get(dev.id)
 
-                            offline_delta = dt.timedelta(minutes=int(self.masterTriggerDict.get(unicode(dev.id), ('60', ''))[0]))
-                            self.logger.debug(u"Offline weather location delta: {0}".format(offline_delta))
+                if not dev_triggers:
+                    continue
 
-                            # Convert currentObservationEpoch to a localized datetime object
-                            current_observation_epoch = float(dev.states['currentObservationEpoch'])
+                # ========================== Weather Location Offline ==========================
+                # Limited to one trigger per device (see validateEventConfigUi).
+                for trigger in dev_triggers.get('weatherSiteOffline', {}).values():
 
-                            current_observation = time.strftime(time_format, time.localtime(current_observation_epoch))
-                            current_observation = dt.datetime.strptime(current_observation, time_format)
+                    # Process the trigger only if the device is enabled
+                    if dev.enabled:
 
-                            # Time elapsed since last observation
-                            diff = indigo.server.getTime() - current_observation
+                        # The age of the observation is checked against the trigger's deadline,
+                        # which fresh data resets (see fireOfflineDeadlines.)
+                        deadline = self.offlineDeadline(dev, trigger)
+                        self.scheduleOfflineDeadlines(dev)
 
-                            # If the observation is older than offline_delta
-                            if diff >= offline_delta:
-                                total_seconds = int(diff.total_seconds())
-                                days, remainder = divmod(total_seconds, 60 * 60 * 24)
-                                hours, remainder = divmod(remainder, 60 * 60)
-                                minutes, seconds = divmod(remainder, 60)
+                        # If the temperature observation is lower than -55. The state may have
+                        # been written this cycle and still be waiting in the write batch.
+                        try:
+                            temp = float(self.latestDeviceState(dev, 'temp'))
+                        except (TypeError, ValueError):
+                            temp = None
 
-                                # Note that we leave seconds off, but it could easily be added if needed.
-                                diff_msg = u'{} days, {} hrs, {} mins'.format(days, hours, minutes)
+                        if deadline > time.time() and temp is not None and temp <= -55.0:
+                            self.fireOfflineTrigger(dev, trigger, u"(ambient temperature lower than -55).")
 
-                                dev.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensor)
-                                dev.updateStateOnServer('onOffState', value='offline')
+                # ============================ Severe Weather Alert ============================
+                self.fireAlertTriggers(dev, new_alerts)
 
-                                if indigo.triggers[trigger_id].enabled:
-                                    self.logger.warning(u"{0} location appears to be offline for {1}".format(dev.name, diff_msg))
-                                    indigo.trigger.execute(trigger_id)
+                # ============================== Weather Threshold =============================
+                # Only the rules that read a state written this cycle are evaluated. A rule
+                # fires when its expression becomes true.
+                threshold_triggers = dev_triggers.get('weatherThreshold', {})
+                rule_ids = set()
 
-                            # If the temperature observation is lower than -55
-                            elif dev.states['temp'] <= -55.0:
-                                dev.updateStateImageOnServer(indigo.kStateImageSel.TemperatureSensor)
-                                dev.updateStateOnServer('onOffState', value='offline')
+                for state in changed_states.get(dev.id, ()):
+                    rule_ids.update(self.threshold_index.get((dev.id, state), ()))
 
-                                if indigo.triggers[trigger_id].enabled:
-                                    self.logger.warning(u"{0} location appears to be offline (ambient temperature lower than -55).".format(dev.name))
-                                    indigo.trigger.execute(trigger_id)
+                for trigger_id in sorted(rule_ids):
+                    rule    = self.threshold_rules.get(trigger_id)
+                    trigger = threshold_triggers.get(trigger_id)
 
-                # ============================ Severe Weather Alert ============================
-                for trigger in indigo.triggers.itervalues('self.weatherAlert'):
+                    if rule is None or trigger is None:
+                        continue
 
-                    if int(trigger.pluginProps['listOfDevices']) == dev.id and dev.states['alertStatus'] == 'true' and trigger.enabled:
+                    value = self.thresholdRuleValue(dev, rule)
 
-                        self.logger.warning(u"{0} location has at least one severe weather alert.".format(dev.name))
+                    if value and rule['value'] is False and trigger.enabled:
+                        self.logger.info(u"{0} weather threshold reached ({1}).".format(dev.name, trigger.pluginProps['expression']))
                         indigo.trigger.execute(trigger.id)
 
+                    rule['value'] = value
+
         except KeyError:
             pass
 
@@ -3209,6 +4827,216 @@ class Plugin(indigo.PluginBase):
         except ValueError:
             return u"{0}".format(val)
 
+    def unindexTrigger(self, trigger_id):
+        """
+        Remove a trigger from the trigger index (and its threshold rule, if any)
+
+        -----
+
+        :param int trigger_id:
+        """
+
+        rule = self.threshold_rules.pop(trigger_id, None)
+
+        if rule is not None:
+            for state in rule['states']:
+                self.threshold_index.get((rule['dev_id'], state), set()).discard(trigger_id)
+
+        for dev_id, dev_triggers in self.masterTriggerDict.items():
+            for type_triggers in dev_triggers.values():
+                type_triggers.pop(trigger_id, None)
+
+            if not any(dev_triggers.values()):
+                del self.masterTriggerDict[dev_id]
+
+    def unregisterDevice(self, dev_id):
+        """
+        Remove a device from the device registry
+
+        -----
+
+        :param int dev_id:
+        """
+
+        dev = self.device_registry.pop(dev_id, None)
+
+        if dev is not None:
+            self.device_index['location'].get(dev.pluginProps.get('location', ''), set()).discard(dev_id)
+            self.device_index['type'].get(dev.deviceTypeId, set()).discard(dev_id)
+
+    def updateDeviceAddress(self, dev, station_id):
+        """
+        Set the device address to the reporting station
+
+        The updateDeviceAddress() method sets the device's address prop to the
+        weather station ID. Replacing plugin props is an expensive round trip to the
+        server (and can fire device updated callbacks), so the props are only
+        replaced when the station ID has changed.
+
+        -----
+
+        :param indigo.Device dev:
+        :param str station_id:
+        """
+
+        if dev.pluginProps.get('address') != station_id:
+            new_props = dev.pluginProps
+            new_props['address'] = station_id
+            dev.replacePluginPropsOnServer(new_props)
+
+    def updateDeviceImage(self, dev, image):
+        """
+        Set the device state image
+
+        The updateDeviceImage() method sets the device's state image selector, but
+        only if it differs from the last selector the plugin set for the device. All
+        state image changes go through this method so that the last selector is
+        always known. The new selector is added to the device's write batch (see
+        updateDeviceStates().)
+
+        -----
+
+        :param indigo.Device dev:
+        :param indigo.kStateImageSel image:
+        """
+
+        device_dict = self.masterDeviceDict.setdefault(dev.id, {})
+
+        if device_dict.get('stateImage') != image:
+            with self.write_lock:
+                self.pendingDeviceWrites(dev)['image'] = image
+            device_dict['stateImage'] = image
+
+        if not self.batch_writes:
+            self.flushDeviceWrites()
+
+    def updateDeviceStates(self, dev, states_list):
+        """
+        Write changed device states to the server
+
+        The updateDeviceStates() method is the write layer for the plugin. It keeps
+        the last state dict written for each device and state, and sends only the
+        states whose value or uiValue differ from what the server already has. Nothing
+        is sent if nothing has changed. onOffState is always sent because Indigo also
+        changes it (when device communication starts and stops.)
+
+        Changed states are added to the device's write batch rather than sent right
+        away. A later value for the same state replaces the earlier one. During a
+        refresh cycle the batches are queued for the writer thread when the cycle
+        ends (see flushDeviceWrites()); at any other time they are queued at once.
+
+        Numeric states in the families listed in kDeadbandStates are also held back
+        when they have moved by no more than the family's update threshold (plugin
+        prefs), unless the state hasn't been written within the maximum interval.
+        Forecast slot states are never held back. States made from a held state
+        (kDeadbandCompanions) are held with it. The number of states and
+        (approximate) bytes not sent are added to the cycle's write statistics.
+
+        -----
+
+        :param indigo.Device dev:
+        :param list states_list: state dicts for updateStatesOnServer()
+        """
+
+        device_dict   = self.masterDeviceDict.setdefault(dev.id, {})
+        written       = device_dict.setdefault('writtenStates', {})
+        written_times = device_dict.setdefault('writtenTimes', {})
+        changed       = []
+        now           = time.time()
+
+        previous_on_off = written.get('onOffState')
+        online_before   = None if previous_on_off is None else previous_on_off.get('value') is True
+
+        deadbands = {}
+        for family in kDeadbandStates:
+            try:
+                deadbands[family] = float(self.pluginPrefs.get('deadband{0}'.format(family.capitalize()), '0'))
+            except ValueError:
+                deadbands[family] = 0.0
+
+        try:
+            max_staleness = float(self.pluginPrefs.get('deadbandMaxStaleness', '60')) * 60
+        except ValueError:
+            max_staleness = 3600.0
+
+        held = set()
+
+        for state in states_list:
+            key      = state['key']
+            previous = written.get(key)
+
+            if key != 'onOffState' and previous == state:
+                self.write_stats['statesSkipped'] += 1
+                self.write_stats['bytesSkipped'] += len(u"{0}{1}{2}".format(key, state.get('value', u""), state.get('uiValue', u"")).encode('utf-8'))
+                continue
+
+            deadband = 0.0 if kDeadbandSlotPattern.search(key) else deadbands.get(kDeadbandFamily.get(key), 0.0)
+
+            if deadband > 0 and previous is not None and (max_staleness == 0 or now - written_times.get(key, 0) < max_staleness):
+                try:
+                    new_value = float(state['value'])
+                    old_value = float(previous['value'])
+
+                    # Missing values (-99) and formatting changes (same value) are always written.
+                    if -99.0 not in (new_value, old_value) and new_value != old_value and abs(new_value - old_value) <= deadband:
+                        self.write_stats['statesDeadband'] += 1
+                        held.add(key)
+                        continue
+
+                except (KeyError, TypeError, ValueError):
+                    pass
+
+            changed.append(state)
+
+        if held:
+            companions = [state for state in changed if held.intersection(kDeadbandCompanions.get(state['key'], ()))]
+            self.write_stats['statesDeadband'] += len(companions)
+            changed = [state for state in changed if state not in companions]
+
+        if changed:
+            with self.write_lock:
+                pending_states = self.pendingDeviceWrites(dev)['states']
+
+                # If the writer can't write the batch, it drops these records so that
+                # everything is sent again (see writeDeviceBatch().)
+                written       = device_dict.setdefault('writtenStates', {})
+                written_times = device_dict.setdefault('writtenTimes', {})
+
+                for state in changed:
+                    pending_states[state['key']] = state
+                    written[state['key']] = state
+                    written_times[state['key']] = now
+
+                # Weather threshold rules that read these states are evaluated in the next
+                # trigger pass.
+                self.changed_states.setdefault(dev.id, set()).update(state['key'] for state in changed)
+                self.snapshot_stale = True
+
+                delta = self.pendingDelta(dev)
+
+                if delta is not None:
+                    delta_states = delta.setdefault('states', {})
+
+                    for state in changed:
+                        # onOffState is written every time, but only broadcast when it changes.
+                        if state['key'] == 'onOffState':
+                            if state == previous_on_off:
+                                continue
+
+                            # Only True means online ('offline' is set by offline triggers.)
+                            online = state.get('value') is True
+
+                            if online_before is not None and online != online_before:
+                                delta['online'] = online
+
+                        delta_states[state['key']] = state.get('value')
+
+                    if not delta_states:
+                        del delta['states']
+
+        if not self.batch_writes:
+            self.flushDeviceWrites()
+
     def verboseWindNames(self, state_name, val):
         """
         Format wind data for Indigo UI
@@ -3253,6 +5081,138 @@ class Plugin(indigo.PluginBase):
             self.logger.debug(u"Error formatting {0} verbose wind names: {1}".format(state_name, val))
             return val
 
+    def writeDeviceBatch(self, batch):
+        """
+        Write one device's batch to the server
+
+        The writeDeviceBatch() method sends the batch's states in a single
+        updateStatesOnServer() call and then sets the state image, if it has
+        changed. If the write fails, the device's write records are dropped so that
+        the device is parsed and written in full with the next data we get. The rest
+        of the device's parse state (alert fingerprints, for example) is kept, so
+        that alerts aren't logged and triggers aren't fired a second time.
+
+        -----
+
+        :param dict batch: {'dev': indigo.Device, 'image': indigo.kStateImageSel or None, 'states': OrderedDict}
+        """
+
+        dev = batch['dev']
+
+        try:
+            if batch['states']:
+                dev.updateStatesOnServer(batch['states'].values())
+
+            if batch['image'] is not None:
+                dev.updateStateImageOnServer(batch['image'])
+
+        except Exception:
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+            self.logger.error(u"Problem writing device states. Dev: {0}".format(dev.name))
+
+            with self.write_lock:
+                device_dict = self.masterDeviceDict.get(dev.id, {})
+                for key in ('featureHashes', 'stateImage', 'writtenStates', 'writtenTimes'):
+                    device_dict.pop(key, None)
+
+    def writeSnapshot(self):
+        """
+        Write a JSON snapshot of the device data
+
+        The writeSnapshot() method writes the states of every running device (as
+        written to the Indigo server) and the active severe weather alerts for each
+        location to one JSON file, so that control pages and dashboards can fetch
+        everything with one request instead of one request per state. By default, the
+        file is written to the Indigo web server static folder
+        (/images/controls/static/wunderground.json.)
+
+        The snapshot is only built when device states have been written since the
+        last one (or last attempt), and the file is only written when its content has
+        changed. It's written to a temporary file which is then renamed, so clients
+        never read a partly written file.
+
+        The file (version 1) holds a dict:
+            version:   1 (kSnapshotVersion)
+            devices:   a dict for each device, by device id:
+                name, type (device type id), location (None for image devices),
+                states (state values) and uiValues (state display values, where
+                they differ from the values)
+            locations: a dict for each weather location:
+                devices (device ids) and alerts (type, description and expires for
+                each active alert)
+
+        -----
+        """
+
+        import simplejson
+
+        if not self.pluginPrefs.get('snapshotEnabled', False) or not self.snapshot_stale:
+            return
+
+        self.snapshot_stale = False
+
+        devices   = {}
+        locations = {}
+
+        with self.write_lock:
+            for dev in self.registeredDevices():
+                written  = self.masterDeviceDict.get(dev.id, {}).get('writtenStates', {})
+                location = dev.pluginProps.get('location') if dev.pluginProps.get('isWeatherDevice', False) else None
+
+                devices[str(dev.id)] = {'name': dev.name,
+                                        'type': dev.deviceTypeId,
+                                        'location': location,
+                                        'states': dict((key, state.get('value')) for key, state in written.iteritems()),
+                                        'uiValues': dict((key, state['uiValue']) for key, state in written.iteritems()
+                                                         if 'uiValue' in state and state['uiValue'] != state.get('value')),
+                                        }
+
+                if location is not None:
+                    locations.setdefault(location, {'devices': [], 'alerts': []})['devices'].append(dev.id)
+
+        for location, location_dict in locations.iteritems():
+            location_dict['alerts'] = [{'type': alert.get('type', u""), 'description': alert.get('description', u""), 'expires': alert.get('expires', u"")}
+                                       for alert in self.activeAlerts(location)]
+
+        try:
+            content = simplejson.dumps({'version': kSnapshotVersion, 'devices': devices, 'locations': locations}, sort_keys=True, separators=(',', ':'))
+
+            if isinstance(content, unicode):
+                content = content.encode('utf-8')
+
+            content_hash = hashlib.md5(content).hexdigest()
+
+            if content_hash == self.snapshot_hash:
+                return
+
+            path = os.path.expanduser(self.pluginPrefs.get('snapshotPath', '').strip())
+
+            if not path:
+                path = os.path.join(indigo.server.getInstallFolderPath(), u"IndigoWebServer/images/controls/static", kSnapshotFileName)
+
+            import tempfile  # Only needed when the snapshot is enabled
+
+            handle, temp_path = tempfile.mkstemp(prefix='.wunderground', suffix='.tmp', dir=os.path.dirname(path))
+
+            try:
+                with os.fdopen(handle, 'wb') as snapshot_file:
+                    snapshot_file.write(content)
+
+                # The web server needs to read the file.
+                os.chmod(temp_path, 0o644)
+                os.rename(temp_path, path)
+
+            except Exception:
+                os.remove(temp_path)
+                raise
+
+            self.snapshot_hash = content_hash
+            self.logger.debug(u"Snapshot written ({0} devices, {1} bytes.)".format(len(devices), len(content)))
+
+        except Exception:
+            self.Fogbert.pluginErrorHandler(traceback.format_exc())
+            self.logger.warning(u"Unable to write the weather snapshot file. Will try again when the weather data are next updated.")
+
     def wundergroundSite(self, values_dict):
         """
         Launch a web browser to register for API
@@ -0,0 +1,229 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the device state write layer, Plugin.updateDeviceStates()
+
+The indigo module is only available inside the Indigo server. When it can't be
+imported, a minimal stand-in providing indigo.PluginBase is installed so that the
+plugin module can be loaded. Run from the repository root with:
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import threading
+import types
+import unittest
+
+kPluginPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Wunderground.indigoPlugin', 'Contents', 'Server Plugin')
+sys.path.insert(0, kPluginPath)
+
+try:
+    import indigo
+except ImportError:
+    indigo = types.ModuleType('indigo')
+
+    class PluginBase(object):
+        def __del__(self):
+            pass
+
+    indigo.PluginBase = PluginBase
+    sys.modules['indigo'] = indigo
+
+import plugin
+
+
+class FakeDevice(object):
+    id   = 1
+    name = u"Weather"
+
+
+class WriteLayerTestCase(unittest.TestCase):
+
+    prefs = {}
+
+    def setUp(self):
+        # Only the state updateDeviceStates() uses is set up. Writes are batched, so
+        # nothing is queued for the writer thread.
+        self.plugin = plugin.Plugin.__new__(plugin.Plugin)
+        self.plugin.pluginPrefs      = dict(self.prefs)
+        self.plugin.masterDeviceDict = {}
+        self.plugin.pending_writes   = {}
+        self.plugin.pending_deltas   = {}
+        self.plugin.changed_states   = {}
+        self.plugin.snapshot_stale   = False
+        self.plugin.batch_writes     = True
+        self.plugin.write_lock       = threading.Lock()
+        self.plugin.write_stats      = {'bytesSkipped': 0, 'statesDeadband': 0, 'statesSent': 0, 'statesSkipped': 0}
+        self.dev = FakeDevice()
+
+    def write(self, *states):
+        """ Write the states and return the names of those sent (then clear the batch.) """
+
+        self.plugin.updateDeviceStates(self.dev, [dict(state) for state in states])
+        batch = self.plugin.pending_writes.pop(self.dev.id, {'states': {}})
+
+        return list(batch['states'])
+
+
+class TestChangedStates(WriteLayerTestCase):
+
+    def test_first_write_sends_everything(self):
+        sent = self.write({'key': 'temp', 'value': 60.0}, {'key': 'weather', 'value': u"Clear"})
+        self.assertEqual(sent, ['temp', 'weather'])
+        self.assertTrue(self.plugin.snapshot_stale)
+        self.assertEqual(self.plugin.changed_states[self.dev.id], set(['temp', 'weather']))
+
+    def test_unchanged_states_are_skipped(self):
+        self.write({'key': 'temp', 'value': 60.0, 'uiValue': u"60.0 °F"}, {'key': 'weather', 'value': u"Clear"})
+
+        sent = self.write({'key': 'temp', 'value': 60.0, 'uiValue': u"60.0 °F"}, {'key': 'weather', 'value': u"Rain"})
+
+        self.assertEqual(sent, ['weather'])
+        self.assertEqual(self.plugin.write_stats['statesSkipped'], 1)
+        self.assertGreater(self.plugin.write_stats['bytesSkipped'], 0)
+
+    def test_nothing_sent_when_nothing_changed(self):
+        self.write({'key': 'temp', 'value': 60.0})
+        self.plugin.changed_states = {}
+
+        self.assertEqual(self.write({'key': 'temp', 'value': 60.0}), [])
+        self.assertEqual(self.plugin.changed_states, {})
+
+    def test_ui_value_change_is_sent(self):
+        self.write({'key': 'temp', 'value': 60.0, 'uiValue': u"60.0 °F"})
+        self.assertEqual(self.write({'key': 'temp', 'value': 60.0, 'uiValue': u"60 °F"}), ['temp'])
+
+    def test_on_off_state_is_always_sent(self):
+        self.write({'key': 'onOffState', 'value': True})
+        self.assertEqual(self.write({'key': 'onOffState', 'value': True}), ['onOffState'])
+
+    def test_later_value_replaces_pending_value(self):
+        self.plugin.updateDeviceStates(self.dev, [{'key': 'temp', 'value': 60.0}])
+        self.plugin.updateDeviceStates(self.dev, [{'key': 'temp', 'value': 61.0}])
+
+        states = self.plugin.pending_writes[self.dev.id]['states']
+        self.assertEqual(list(states), ['temp'])
+        self.assertEqual(states['temp']['value'], 61.0)
+
+    def test_written_states_are_recorded(self):
+        self.write({'key': 'temp', 'value': 60.0})
+        self.assertEqual(self.plugin.latestDeviceState(self.dev, 'temp'), 60.0)
+
+
+class TestDeadbands(WriteLayerTestCase):
+
+    prefs = {'deadbandMaxStaleness': '60', 'deadbandPressure': '0.05', 'deadbandTemperature': '0.5', 'deadbandWind': '2'}
+
+    def test_change_inside_deadband_is_held(self):
+        self.write({'key': 'temp', 'value': 60.0})
+
+        self.assertEqual(self.write({'key': 'temp', 'value': 60.4}), [])
+        self.assertEqual(self.write({'key': 'temp', 'value': 59.5}), [])
+        self.assertEqual(self.plugin.write_stats['statesDeadband'], 2)
+        self.assertEqual(self.plugin.latestDeviceState(self.dev, 'temp'), 60.0)
+
+    def test_change_outside_deadband_is_sent(self):
+        self.write({'key': 'temp', 'value': 60.0})
+
+        self.assertEqual(self.write({'key': 'temp', 'value': 60.6}), ['temp'])
+        self.assertEqual(self.plugin.write_stats['statesDeadband'], 0)
+
+    def test_held_changes_are_measured_from_the_written_value(self):
+        self.write({'key': 'temp', 'value': 60.0})
+        self.write({'key': 'temp', 'value': 60.3})
+
+        self.assertEqual(self.write({'key': 'temp', 'value': 60.6}), ['temp'])
+
+    def test_each_family_has_its_own_deadband(self):
+        self.write({'key': 'pressure', 'value': 29.90}, {'key': 'windSpeed', 'value': 5.0}, {'key': 'weather', 'value': u"Clear"})
+
+        sent = self.write({'key': 'pressure', 'value': 29.92}, {'key': 'windSpeed', 'value': 8.0}, {'key': 'weather', 'value': u"Rain"})
+
+        self.assertEqual(sent, ['windSpeed', 'weather'])
+
+    def test_states_outside_the_families_are_sent(self):
+        self.write({'key': 'uv', 'value': 3.0})
+        self.assertEqual(self.write({'key': 'uv', 'value': 3.1}), ['uv'])
+
+    def test_missing_values_are_sent(self):
+        self.write({'key': 'temp', 'value': -99.0, 'uiValue': u"--"})
+        self.assertEqual(self.write({'key': 'temp', 'value': -98.8}), ['temp'])
+
+    def test_formatting_changes_are_sent(self):
+        self.write({'key': 'temp', 'value': 60.0, 'uiValue': u"60.0 °F"})
+        self.assertEqual(self.write({'key': 'temp', 'value': 60.0, 'uiValue': u"60 °F"}), ['temp'])
+
+    def test_stale_states_are_sent(self):
+        self.write({'key': 'temp', 'value': 60.0})
+        self.plugin.masterDeviceDict[self.dev.id]['writtenTimes']['temp'] -= 3601
+
+        self.assertEqual(self.write({'key': 'temp', 'value': 60.1}), ['temp'])
+
+    def test_no_deadband_by_default(self):
+        self.plugin.pluginPrefs = {}
+        self.write({'key': 'temp', 'value': 60.0})
+
+        self.assertEqual(self.write({'key': 'temp', 'value': 60.1}), ['temp'])
+
+    def test_companions_are_held_with_their_state(self):
+        self.write({'key': 'temp', 'value': 60.0}, {'key': 'tempIcon', 'value': u"600"},
+                   {'key': 'windSpeed', 'value': 5.0}, {'key': 'windSpeedIcon', 'value': u"50"},
+                   {'key': 'windString', 'value': u"From the N at 5.0 MPH"})
+
+        sent = self.write({'key': 'temp', 'value': 60.3}, {'key': 'tempIcon', 'value': u"603"},
+                          {'key': 'windSpeed', 'value': 6.0}, {'key': 'windSpeedIcon', 'value': u"60"},
+                          {'key': 'windString', 'value': u"From the N at 6.0 MPH"})
+
+        self.assertEqual(sent, [])
+        self.assertEqual(self.plugin.write_stats['statesDeadband'], 5)
+        self.assertEqual(self.plugin.latestDeviceState(self.dev, 'tempIcon'), u"600")
+
+    def test_companions_are_sent_with_their_state(self):
+        self.write({'key': 'temp', 'value': 60.0}, {'key': 'tempIcon', 'value': u"600"})
+
+        sent = self.write({'key': 'temp', 'value': 61.0}, {'key': 'tempIcon', 'value': u"610"})
+
+        self.assertEqual(sent, ['temp', 'tempIcon'])
+
+    def test_companions_follow_only_their_own_state(self):
+        self.write({'key': 'temp', 'value': 60.0}, {'key': 'pressureIcon', 'value': u"2990"})
+
+        sent = self.write({'key': 'temp', 'value': 60.3}, {'key': 'pressureIcon', 'value': u"2995"})
+
+        self.assertEqual(sent, ['pressureIcon'])
+
+    def test_companion_with_two_states_is_held_by_either(self):
+        self.write({'key': 'windGust', 'value': 9.0}, {'key': 'windSpeed', 'value': 5.0}, {'key': 'windString', 'value': u"a"})
+
+        sent = self.write({'key': 'windGust', 'value': 12.0}, {'key': 'windSpeed', 'value': 6.0}, {'key': 'windString', 'value': u"b"})
+
+        self.assertEqual(sent, ['windGust'])
+
+    def test_slot_states_are_not_held(self):
+        for key in ('h01_temp', 'd01_high', 'foreHigh1', 'foreLow10'):
+            self.assertTrue(plugin.kDeadbandSlotPattern.search(key), key)
+
+        for key in ('temp', 'windSpeed', 'pressure'):
+            self.assertFalse(plugin.kDeadbandSlotPattern.search(key), key)
+
+        self.write({'key': 'h01_temp', 'value': 60.0}, {'key': 'foreHigh1', 'value': 60.0}, {'key': 'temp', 'value': 60.0})
+
+        sent = self.write({'key': 'h01_temp', 'value': 60.2}, {'key': 'foreHigh1', 'value': 60.2}, {'key': 'temp', 'value': 60.2})
+
+        self.assertEqual(sent, ['h01_temp', 'foreHigh1'])
+
+    def test_family_states_exist_outside_slots(self):
+        for family, states in plugin.kDeadbandStates.items():
+            for state in states:
+                self.assertFalse(plugin.kDeadbandSlotPattern.search(state), state)
+
+        for companion, states in plugin.kDeadbandCompanions.items():
+            for state in states:
+                self.assertIn(state, plugin.kDeadbandFamily, companion)
+
+
+if __name__ == '__main__':
+    unittest.main()
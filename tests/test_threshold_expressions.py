@@ -0,0 +1,173 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the Weather Threshold expression evaluator (DLFramework evalExpr) and
+Plugin.thresholdRuleValue()
+
+The indigo module is only available inside the Indigo server. When it can't be
+imported, a minimal stand-in providing indigo.PluginBase is installed so that the
+plugin module can be loaded. Run from the repository root with:
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import types
+import unittest
+
+kPluginPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Wunderground.indigoPlugin', 'Contents', 'Server Plugin')
+sys.path.insert(0, kPluginPath)
+
+try:
+    import indigo
+except ImportError:
+    indigo = types.ModuleType('indigo')
+
+    class PluginBase(object):
+        def __del__(self):
+            pass
+
+    indigo.PluginBase = PluginBase
+    sys.modules['indigo'] = indigo
+
+import plugin
+import DLFramework.DLFramework as Dave
+
+
+class FakePlugin(object):
+    pluginPrefs = {}
+
+
+class FakeDevice(object):
+    id = 1
+
+    def __init__(self, states):
+        self.states = states
+
+
+def evaluator():
+    return Dave.evalExpr(FakePlugin())
+
+
+def evaluate(expr, names=None):
+    expr_eval = evaluator()
+    node, _ = expr_eval.compile_expr(expr)
+    return expr_eval.eval_(node, names)
+
+
+class TestCompileExpr(unittest.TestCase):
+
+    def test_accepted_expressions(self):
+        for expr in ('temp > 40',
+                     '0 < temp <= 5',
+                     'temp - dewpoint < 2',
+                     'temp * 9 / 5 + 32 >= 100',
+                     '-temp > 3',
+                     'temp > 40 and windSpeed > 10',
+                     'temp < 0 or not windSpeed',
+                     'weather == "Rain"',
+                     'weather != u"Clear"',
+                     ):
+            evaluator().compile_expr(expr)
+
+    def test_rejected_node_types(self):
+        for expr in ('temp ** 2 > 1',
+                     '9 ** 9 ** 9',
+                     'pow(temp, 2)',
+                     'temp.real',
+                     'temp[0]',
+                     '[temp]',
+                     'temp if temp else 0',
+                     'lambda: temp',
+                     '__import__("os")',
+                     ):
+            self.assertRaises(TypeError, evaluator().compile_expr, expr)
+
+    def test_syntax_errors(self):
+        for expr in ('', 'temp >', 'temp = 4'):
+            self.assertRaises(SyntaxError, evaluator().compile_expr, expr)
+
+    def test_names(self):
+        _, names = evaluator().compile_expr('temp > 40 and (windGust - windSpeed > 10 or weather == "Rain")')
+        self.assertEqual(names, set(['temp', 'windGust', 'windSpeed', 'weather']))
+
+    def test_no_names(self):
+        _, names = evaluator().compile_expr('1 + 2 > 2')
+        self.assertEqual(names, set())
+
+
+class TestEvaluate(unittest.TestCase):
+
+    def test_arithmetic(self):
+        self.assertEqual(evaluate('1 + 2 * 3 - 4'), 3)
+        self.assertEqual(evaluate('7 / 2'), 3.5)
+        self.assertEqual(evaluate('-temp', {'temp': 4.0}), -4.0)
+
+    def test_comparisons(self):
+        self.assertTrue(evaluate('temp > 40', {'temp': 41.0}))
+        self.assertFalse(evaluate('temp > 40', {'temp': 40.0}))
+        self.assertTrue(evaluate('0 < temp <= 5', {'temp': 5.0}))
+        self.assertFalse(evaluate('0 < temp <= 5', {'temp': 0.0}))
+
+    def test_boolean_operators(self):
+        names = {'temp': 41.0, 'windSpeed': 5.0}
+        self.assertFalse(evaluate('temp > 40 and windSpeed > 10', names))
+        self.assertTrue(evaluate('temp > 40 or windSpeed > 10', names))
+        self.assertTrue(evaluate('not windSpeed > 10', names))
+
+    def test_strings(self):
+        self.assertTrue(evaluate('weather == "Rain"', {'weather': u"Rain"}))
+        self.assertTrue(evaluate('weather != "Rain"', {'weather': u"Clear"}))
+        self.assertTrue(evaluate('not weather', {'weather': u""}))
+
+    def test_string_compared_with_number(self):
+        self.assertRaises(TypeError, evaluate, 'temp > 40', {'temp': u"--"})
+        self.assertRaises(TypeError, evaluate, '40 < temp', {'temp': u"--"})
+        self.assertRaises(TypeError, evaluate, '0 < temp < "a"', {'temp': 1.0})
+        self.assertRaises(TypeError, evaluate, 'weather == 1', {'weather': u"Rain"})
+
+    def test_string_arithmetic(self):
+        self.assertRaises(TypeError, evaluate, 'temp + 1 > 40', {'temp': u"--"})
+        self.assertRaises(TypeError, evaluate, 'weather + weather == "aa"', {'weather': u"a"})
+        self.assertRaises(TypeError, evaluate, '-temp > 3', {'temp': u"--"})
+
+    def test_unknown_names(self):
+        self.assertRaises(KeyError, evaluate, 'temp > 40', {'windSpeed': 1.0})
+        self.assertRaises(KeyError, evaluate, 'temp > 40')
+
+    def test_division_by_zero(self):
+        self.assertRaises(ZeroDivisionError, evaluate, 'temp / 0 > 1', {'temp': 1.0})
+
+
+class TestThresholdRuleValue(unittest.TestCase):
+
+    def rule_value(self, expr, states):
+        # thresholdRuleValue() only needs the evaluator and the written states.
+        instance = plugin.Plugin.__new__(plugin.Plugin)
+        instance.evalExpr = evaluator()
+        instance.masterDeviceDict = {}
+
+        expression, names = instance.evalExpr.compile_expr(expr)
+        return instance.thresholdRuleValue(FakeDevice(states), {'expression': expression, 'states': names})
+
+    def test_numeric_strings_are_numbers(self):
+        self.assertTrue(self.rule_value('temp > 40', {'temp': u"40.5"}))
+        self.assertFalse(self.rule_value('temp > 40', {'temp': u"39"}))
+
+    def test_missing_value_is_unknown(self):
+        self.assertIsNone(self.rule_value('temp > 40', {'temp': u"--"}))
+
+    def test_unknown_state_is_unknown(self):
+        self.assertIsNone(self.rule_value('temp > 40', {'windSpeed': 1.0}))
+
+    def test_arithmetic_errors_are_unknown(self):
+        self.assertIsNone(self.rule_value('temp / windSpeed > 1', {'temp': 1.0, 'windSpeed': 0.0}))
+
+    def test_string_states(self):
+        self.assertTrue(self.rule_value('weather == "Rain"', {'weather': u"Rain"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
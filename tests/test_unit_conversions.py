@@ -0,0 +1,155 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the unit conversion tables and Plugin.convertUnits()
+
+The indigo module is only available inside the Indigo server. When it can't be
+imported, a minimal stand-in providing indigo.PluginBase is installed so that the
+plugin module can be loaded. Run from the repository root with:
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import types
+import unittest
+
+kPluginPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'Wunderground.indigoPlugin', 'Contents', 'Server Plugin')
+sys.path.insert(0, kPluginPath)
+
+try:
+    import indigo
+except ImportError:
+    indigo = types.ModuleType('indigo')
+
+    class PluginBase(object):
+        def __del__(self):
+            pass
+
+    indigo.PluginBase = PluginBase
+    sys.modules['indigo'] = indigo
+
+import plugin
+
+
+def convert(sanitized, quantities, units, english=None):
+    # convertUnits() doesn't use any plugin state, so the plugin isn't initialized.
+    instance = plugin.Plugin.__new__(plugin.Plugin)
+    return instance.convertUnits(sanitized=sanitized, quantities=quantities, units=units, english=english)
+
+
+class TestUnitTables(unittest.TestCase):
+
+    def test_every_target_is_canonical_or_converted(self):
+        canonical = plugin.kUnitSystems['M']
+
+        for units, unit_system in plugin.kUnitSystems.items():
+            self.assertEqual(set(unit_system), set(canonical), units)
+
+            for quantity, unit in unit_system.items():
+                if unit != canonical[quantity]:
+                    self.assertIn((quantity, unit), plugin.kUnitConversions, "{0} {1}".format(units, quantity))
+
+    def test_conversions_have_english_or_metric_targets(self):
+        for (quantity, unit), (multiplier, offset, places) in plugin.kUnitConversions.items():
+            self.assertTrue(unit in plugin.kEnglishUnits or unit == 'mps', unit)
+            self.assertGreater(multiplier, 0)
+            self.assertIn(places, (0, 1, 2))
+
+    def test_reference_points(self):
+        reference = {('distance', 'mi'):      (100.0, 62.1),
+                     ('precipitation', 'in'): (25.4, 1.0),
+                     ('pressure', 'in'):      (1013.25, 29.92),
+                     ('snow', 'in'):          (2.54, 1.0),
+                     ('temperature', 'F'):    (100.0, 212.0),
+                     ('wind', 'mph'):         (100.0, 62.1),
+                     ('wind', 'mps'):         (36.0, 10.0),
+                     }
+
+        self.assertEqual(set(reference), set(plugin.kUnitConversions))
+
+        for (quantity, unit), (metric, expected) in reference.items():
+            multiplier, offset, places = plugin.kUnitConversions[(quantity, unit)]
+            self.assertEqual(round(metric * multiplier + offset, places), expected, "{0} {1}".format(quantity, unit))
+
+    def test_freezing_point(self):
+        multiplier, offset, places = plugin.kUnitConversions[('temperature', 'F')]
+        self.assertEqual(round(0.0 * multiplier + offset, places), 32.0)
+        self.assertEqual(round(-40.0 * multiplier + offset, places), -40.0)
+
+
+class TestConvertUnits(unittest.TestCase):
+
+    quantities = {'pressure': 'pressure', 'qpf': 'precipitation', 'temp': 'temperature', 'wind': 'wind'}
+
+    # WU rounds these metric fields to whole numbers.
+    metric = {'humidity': (45.0, '45.0'),
+              'pressure': (1013.0, '1013.0'),
+              'qpf':      (0.0, '0.0'),
+              'temp':     (19.0, '19.0'),
+              'wind':     (16.0, '16.0'),
+              }
+
+    english = {'pressure': (29.92, '29.92'),
+               'qpf':      (0.01, '0.01'),
+               'temp':     (66.0, '66.0'),
+               'wind':     (10.0, '10.0'),
+               }
+
+    def test_metric_passes_through(self):
+        self.assertEqual(convert(self.metric, self.quantities, 'M', self.english), self.metric)
+
+    def test_standard_uses_english_values(self):
+        result = convert(self.metric, self.quantities, 'S', self.english)
+
+        self.assertEqual(result['temp'], (66.0, '66.0'))
+        self.assertEqual(result['qpf'], (0.01, '0.01'))
+        self.assertEqual(result['pressure'], (29.92, '29.92'))
+        self.assertEqual(result['wind'], (10.0, '10.0'))
+        self.assertEqual(result['humidity'], (45.0, '45.0'))
+
+    def test_mixed_uses_english_values_for_english_targets_only(self):
+        result = convert(self.metric, self.quantities, 'I', self.english)
+
+        self.assertEqual(result['temp'], (19.0, '19.0'))
+        self.assertEqual(result['pressure'], (1013.0, '1013.0'))
+        self.assertEqual(result['qpf'], (0.01, '0.01'))
+        self.assertEqual(result['wind'], (10.0, '10.0'))
+
+    def test_mixed_si_converts_metric_wind(self):
+        result = convert(self.metric, self.quantities, 'MS', self.english)
+        self.assertEqual(result['wind'], (4.4, '4.4'))
+
+    def test_english_values_are_rounded(self):
+        result = convert({'temp': (19.0, '19.0')}, {'temp': 'temperature'}, 'S', {'temp': (66.04, '66.04')})
+        self.assertEqual(result['temp'], (66.0, '66.0'))
+
+    def test_converts_metric_without_english_values(self):
+        result = convert(self.metric, self.quantities, 'S')
+
+        self.assertEqual(result['temp'], (66.2, '66.2'))
+        self.assertEqual(result['pressure'], (29.91, '29.91'))
+        self.assertEqual(result['qpf'], (0.0, '0.0'))
+        self.assertEqual(result['wind'], (9.9, '9.9'))
+
+    def test_missing_english_value_stays_missing(self):
+        result = convert({'qpf': (0.0, '0.0')}, {'qpf': 'precipitation'}, 'S', {'qpf': (-99.0, u"--")})
+        self.assertEqual(result['qpf'], (-99.0, u"--"))
+
+    def test_missing_metric_value_stays_missing(self):
+        result = convert({'temp': (-99.0, u"--")}, {'temp': 'temperature'}, 'S')
+        self.assertEqual(result['temp'], (-99.0, u"--"))
+
+    def test_unknown_units_are_standard(self):
+        self.assertEqual(convert(self.metric, self.quantities, '', self.english), convert(self.metric, self.quantities, 'S', self.english))
+
+    def test_input_is_not_changed(self):
+        metric = dict(self.metric)
+        convert(metric, self.quantities, 'S', self.english)
+        self.assertEqual(metric, self.metric)
+
+
+if __name__ == '__main__':
+    unittest.main()